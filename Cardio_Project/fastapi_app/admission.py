@@ -0,0 +1,261 @@
+"""
+Admission control and deadline-aware load shedding.
+
+The request threadpool is a fixed set of threads; once it is busy, further
+requests wait in an unbounded queue until the client gives up, and are then
+served anyway. ``AdmissionController`` caps how many requests run at once,
+overall (``capacity``, the threadpool size) and per class:
+
+  predict  single-patient predictions and explanations: cheap, may use
+           every slot and are admitted first when slots free up
+  bulk     batch, stream, columnar, sweep and batch-explanation calls
+  report   /send-report, which renders PDFs and sends email
+
+Requests over the limit wait in a bounded FIFO per class, for at most
+``max_wait`` seconds. Clients may send their remaining budget in the
+``X-Request-Deadline-Ms`` header (milliseconds); a request then only waits
+while the budget still covers the class's typical service time (a moving
+average of recent requests), so work the client will not wait for is never
+started. A request that cannot be admitted in time, or arrives to a full
+queue, is answered 503 with Retry-After right away.
+
+Each waiter is woken on its own event loop, so one controller can serve
+several loops (test clients on threads, for instance).
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+DEADLINE_HEADER = b"x-request-deadline-ms"
+# Weight of the latest request in the per-class service time average
+SERVICE_TIME_WEIGHT = 0.2
+
+
+@dataclass(frozen=True)
+class AdmissionClass:
+    name: str
+    priority: int  # lower is admitted first when a slot frees up
+    limit: int  # requests of this class running at once
+    max_queue: int  # requests waiting before new ones are shed
+    max_wait: float  # seconds a request may wait for a slot
+    retry_after: int  # Retry-After seconds sent with a 503
+
+
+class Shed(Exception):
+    """A request refused by admission control"""
+
+    def __init__(self, reason: str, message: str, retry_after: int):
+        super().__init__(message)
+        self.reason = reason  # queue_full, timeout or deadline
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("future", "granted")
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.granted = False
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class AdmissionController:
+    """Concurrency limits per request class with bounded, deadline-aware waiting"""
+
+    def __init__(self, classes: Iterable[AdmissionClass], capacity: int):
+        """
+        Args:
+            classes: Request classes; each has its own limit, queue and Retry-After
+            capacity: Requests of all classes running at once
+        """
+        self.classes = {cls.name: cls for cls in classes}
+        self.capacity = capacity
+        self._order = sorted(self.classes.values(), key=lambda cls: cls.priority)
+        self._waiting: Dict[str, deque] = {name: deque() for name in self.classes}
+        self._active = dict.fromkeys(self.classes, 0)
+        self._running = 0
+        self._lock = threading.Lock()
+        self.admitted = dict.fromkeys(self.classes, 0)
+        self.shed = {name: {"queue_full": 0, "timeout": 0, "deadline": 0} for name in self.classes}
+        self.queue_seconds = dict.fromkeys(self.classes, 0.0)
+        self.service_seconds = dict.fromkeys(self.classes, 0.0)
+
+    async def acquire(self, name: str, deadline: Optional[float] = None) -> None:
+        """
+        Wait for a slot of class ``name``; pair every successful call with ``release``
+
+        Args:
+            name: Request class
+            deadline: ``time.monotonic()`` after which the client no longer waits
+
+        Raises:
+            Shed: The queue is full, no slot freed up in time or the deadline leaves too little time
+        """
+        cls = self.classes[name]
+        now = time.monotonic()
+        if deadline is not None:
+            # Latest start that still finishes in time, going by recent requests
+            deadline -= self.service_seconds[name]
+            if deadline <= now:
+                self._refuse(cls, "deadline", "Request deadline leaves too little time to serve it")
+
+        with self._lock:
+            if self._has_slot(cls):
+                self._grant(cls)
+                self.admitted[name] += 1
+                return
+            waiting = self._waiting[name]
+            if len(waiting) >= cls.max_queue:
+                self._refuse(cls, "queue_full", f"Server busy: {len(waiting)} {name} requests already waiting")
+            waiter = _Waiter(asyncio.get_running_loop().create_future())
+            waiting.append(waiter)
+
+        timeout = cls.max_wait if deadline is None else min(cls.max_wait, deadline - now)
+        try:
+            await asyncio.wait((waiter.future,), timeout=timeout)
+        except asyncio.CancelledError:
+            # The client disconnected while waiting
+            self._abandon(cls, waiter)
+            raise
+        waited = time.monotonic() - now
+
+        with self._lock:
+            self.queue_seconds[name] += waited
+            # A slot granted just as the wait timed out is still taken
+            granted = waiter.granted
+            if not granted:
+                self._waiting[name].remove(waiter)
+        if not granted:
+            if deadline is not None and time.monotonic() >= deadline:
+                self._refuse(cls, "deadline", f"Request deadline ran out after {waited * 1000:.0f} ms in the queue")
+            self._refuse(cls, "timeout", f"Server busy: no {name} slot within {cls.max_wait:g} s")
+        if deadline is not None and time.monotonic() >= deadline:
+            # Admitted too late for the answer to reach the client in time
+            self.release(name)
+            self._refuse(cls, "deadline", f"Request deadline ran out after {waited * 1000:.0f} ms in the queue")
+        with self._lock:
+            self.admitted[name] += 1
+
+    def release(self, name: str, seconds: Optional[float] = None) -> None:
+        """
+        Free a slot of class ``name`` and admit waiters, highest priority first
+
+        Args:
+            name: Request class
+            seconds: How long the request ran, folded into the class's service time average
+        """
+        with self._lock:
+            if seconds is not None:
+                average = self.service_seconds[name]
+                self.service_seconds[name] = seconds if not average else average + SERVICE_TIME_WEIGHT * (seconds - average)
+            self._active[name] -= 1
+            self._running -= 1
+            self._dispatch()
+
+    def _has_slot(self, cls: AdmissionClass) -> bool:
+        return self._running < self.capacity and self._active[cls.name] < cls.limit
+
+    def _grant(self, cls: AdmissionClass) -> None:
+        self._active[cls.name] += 1
+        self._running += 1
+
+    def _dispatch(self) -> None:
+        # Called with the lock held; the slot is taken here and the waiter woken on its own loop
+        for cls in self._order:
+            waiting = self._waiting[cls.name]
+            while waiting and self._has_slot(cls):
+                waiter = waiting.popleft()
+                self._grant(cls)
+                waiter.granted = True
+                waiter.future.get_loop().call_soon_threadsafe(_wake, waiter.future)
+            if self._running >= self.capacity:
+                return
+
+    def _abandon(self, cls: AdmissionClass, waiter: "_Waiter") -> None:
+        """Stop waiting: leave the queue, or hand on a slot granted after the wait gave up"""
+        with self._lock:
+            if not waiter.granted:
+                self._waiting[cls.name].remove(waiter)
+                return
+        self.release(cls.name)
+
+    def _refuse(self, cls: AdmissionClass, reason: str, message: str):
+        self.shed[cls.name][reason] += 1
+        raise Shed(reason, message, cls.retry_after)
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "running": self._running,
+            "classes": {
+                name: {
+                    "limit": cls.limit,
+                    "running": self._active[name],
+                    "waiting": len(self._waiting[name]),
+                    "admitted": self.admitted[name],
+                    "shed": dict(self.shed[name]),
+                    "queue_seconds": round(self.queue_seconds[name], 6),
+                    "service_ms": round(self.service_seconds[name] * 1000, 3),
+                }
+                for name, cls in self.classes.items()
+            },
+        }
+
+
+def request_deadline(scope) -> Optional[float]:
+    """Monotonic deadline from the X-Request-Deadline-Ms header; None when absent or malformed"""
+    for key, value in scope["headers"]:
+        if key == DEADLINE_HEADER:
+            try:
+                budget = float(value)
+            except ValueError:
+                return None
+            return time.monotonic() + budget / 1000 if math.isfinite(budget) else None
+    return None
+
+
+class AdmissionMiddleware:
+    """ASGI middleware admitting requests to ``routes`` through an ``AdmissionController``"""
+
+    def __init__(self, app, controller: AdmissionController, routes: Dict[Tuple[str, str], str]):
+        """
+        Args:
+            app: ASGI application
+            controller: Slots and queues per request class
+            routes: (method, path) -> request class; other requests pass straight through
+        """
+        self.app = app
+        self.controller = controller
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        name = self.routes.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire(name, request_deadline(scope))
+        except Shed as e:
+            response = JSONResponse(
+                {"detail": str(e), "reason": e.reason}, status_code=503,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(name, time.monotonic() - start)
@@ -0,0 +1,309 @@
+"""
+Model artifact fetching.
+
+Artifacts are downloaded to ``<name>.part`` and only renamed into place once
+complete and verified, so a crashed download can never be mistaken for a
+good file. When a manifest is available every file is checked against its
+SHA-256 and size.
+
+Interrupted downloads resume with an HTTP Range request, but only when the
+result can be proven right: the file has a SHA-256 in the manifest, the
+request carries ``If-Range`` with the validator (ETag or Last-Modified)
+recorded next to the ``.part``, and the ``Content-Range`` of the answer
+continues exactly where the ``.part`` ends. Anything else starts over. One
+process at a time downloads a given file (``<name>.lock``).
+
+Sources can be the Hugging Face URLs, any HTTP mirror, or a local directory
+(``file://`` URL or plain path) for offline starts. Usage:
+
+    python artifacts.py manifest models/ > models_manifest.json
+    python artifacts.py fetch
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Optional
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+CHUNK_SIZE = 1024 * 1024
+# Download bookkeeping that lives next to the artifacts but is not one
+SCRATCH_SUFFIXES = (".part", ".part.meta", ".lock")
+
+
+class ArtifactError(RuntimeError):
+    """An artifact could not be fetched or failed verification"""
+
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_manifest(path: Optional[str]) -> Dict[str, dict]:
+    """Return ``{filename: {"sha256": ..., "size": ...}}``, or {} when there is no manifest"""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get("files", {})
+
+
+def build_manifest(directory: str) -> dict:
+    """Describe every file in ``directory`` by SHA-256 and size"""
+    files = {}
+    for filename in sorted(os.listdir(directory)):
+        path = os.path.join(directory, filename)
+        if os.path.isfile(path) and not filename.endswith(SCRATCH_SUFFIXES):
+            files[filename] = {"sha256": sha256_file(path), "size": os.path.getsize(path)}
+    return {"files": files}
+
+
+def fingerprint(hashes: Dict[str, str]) -> str:
+    """Short version id for a set of artifacts given as ``{filename: sha256}``"""
+    h = hashlib.sha256()
+    for filename in sorted(hashes):
+        h.update(f"{filename}:{hashes[filename]};".encode())
+    return h.hexdigest()[:12]
+
+
+def verify_file(path: str, expected: Optional[dict]) -> bool:
+    """True if ``path`` exists and matches ``expected`` size/SHA-256 (when given)"""
+    if not os.path.exists(path):
+        return False
+    if not expected:
+        return True
+    if "size" in expected and os.path.getsize(path) != expected["size"]:
+        return False
+    return "sha256" not in expected or sha256_file(path) == expected["sha256"]
+
+
+def _local_path(url: str) -> Optional[str]:
+    parsed = urlparse(url)
+    if parsed.scheme == "file":
+        return url2pathname(parsed.path)
+    if parsed.scheme == "":
+        return url
+    return None
+
+
+@contextmanager
+def _download_lock(path: str):
+    """Hold an exclusive lock on ``path`` while it is downloaded; yields the ``.part`` path to write"""
+    if fcntl is None:
+        # No flock: a per-process .part keeps concurrent starts apart, at the cost of never resuming
+        yield f"{path}.{os.getpid()}.part"
+        return
+    with open(path + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield path + ".part"
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _discard(part_path: str) -> None:
+    for p in (part_path, part_path + ".meta"):
+        if os.path.exists(p):
+            os.remove(p)
+
+
+def _read_part_meta(part_path: str) -> dict:
+    try:
+        with open(part_path + ".meta") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_part_meta(part_path: str, url: str, response: requests.Response) -> None:
+    """Record what a resume has to match: the source, its validator and its total size"""
+    length = response.headers.get("Content-Length")
+    with open(part_path + ".meta", "w") as f:
+        json.dump({
+            "url": url,
+            "validator": response.headers.get("ETag") or response.headers.get("Last-Modified"),
+            "size": int(length) if length is not None else None,
+        }, f)
+
+
+def _content_range(header: Optional[str]) -> tuple:
+    """``"bytes 100-199/200"`` -> (100, 200); (None, None) when missing or malformed"""
+    try:
+        _, _, spec = header.partition(" ")
+        span, _, total = spec.partition("/")
+        return int(span.split("-")[0]), int(total)
+    except (AttributeError, ValueError):
+        return None, None
+
+
+def _fetch_to_part(url: str, part_path: str, timeout: float, expected_size: Optional[int] = None) -> int:
+    """Append the rest of ``url`` to ``part_path``, resuming from its current size; returns bytes read"""
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    local = _local_path(url)
+
+    if local is not None:
+        size = os.path.getsize(local)
+        if offset >= size:  # a longer (or equal) .part cannot be a prefix of this file
+            _discard(part_path)
+            offset = 0
+        with open(local, "rb") as src, open(part_path, "ab" if offset else "wb") as dst:
+            src.seek(offset)
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        return size - offset
+
+    meta = _read_part_meta(part_path) if offset else {}
+    if offset and (meta.get("url") != url or not meta.get("validator") or meta.get("size") is None):
+        # Nothing proves the server still has the file this .part came from
+        offset = 0
+    headers = {"Range": f"bytes={offset}-", "If-Range": meta["validator"]} if offset else {}
+    with requests.get(url, stream=True, timeout=timeout, headers=headers) as r:
+        if r.status_code == 416:
+            if offset == meta["size"] and expected_size in (None, offset):
+                return 0  # the .part is already complete
+            _discard(part_path)
+            raise ArtifactError(f"{url}: server refused to resume at byte {offset}")
+        r.raise_for_status()
+
+        if r.status_code == 206:
+            start, total = _content_range(r.headers.get("Content-Range"))
+            if start != offset or total != meta["size"] or expected_size not in (None, total):
+                _discard(part_path)
+                raise ArtifactError(
+                    f"{url}: Content-Range {r.headers.get('Content-Range')!r} does not continue "
+                    f"a {offset}-byte part of a {meta['size']}-byte file"
+                )
+        else:
+            # A 200 means the server ignored the Range or the file changed (If-Range): start over
+            _write_part_meta(part_path, url, r)
+
+        read = 0
+        with open(part_path, "ab" if r.status_code == 206 else "wb") as dst:
+            for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                if chunk:
+                    dst.write(chunk)
+                    read += len(chunk)
+
+        expected = r.headers.get("Content-Length")
+        if expected is not None and read != int(expected):
+            raise ArtifactError(f"{url}: connection closed after {read} of {expected} bytes")
+        return read
+
+
+def fetch_artifact(filename: str, url: str, dest_dir: str,
+                   expected: Optional[dict] = None, offline: bool = False,
+                   timeout: float = 600, retries: int = 3) -> dict:
+    """
+    Make sure ``dest_dir/filename`` is present and verified
+
+    Args:
+        filename: Artifact file name
+        url: Source URL (http(s), file:// or local path)
+        dest_dir: Directory the artifact is served from
+        expected: Manifest entry with sha256/size, if known
+        offline: Refuse network sources; only local files and mirrors are used
+        timeout: Per-request timeout in seconds
+        retries: Download attempts before giving up
+
+    Returns:
+        dict: Fetch stats (source, bytes, resumed_from, seconds)
+    """
+    path = os.path.join(dest_dir, filename)
+    start = time.perf_counter()
+
+    if verify_file(path, expected):
+        return {"source": "local", "bytes": 0, "resumed_from": 0, "seconds": time.perf_counter() - start}
+
+    os.makedirs(dest_dir, exist_ok=True)
+    with _download_lock(path) as part_path:
+        if verify_file(path, expected):  # another process fetched it while we waited
+            return {"source": "local", "bytes": 0, "resumed_from": 0, "seconds": time.perf_counter() - start}
+
+        if os.path.exists(path):
+            print(f"[VERIFY] {filename} does not match the manifest, fetching again")
+            os.remove(path)
+
+        if offline and _local_path(url) is None:
+            raise ArtifactError(f"{filename} is missing or invalid and MODEL_OFFLINE forbids downloading {url}")
+
+        if os.path.exists(part_path) and not (expected or {}).get("sha256"):
+            print(f"[VERIFY] {filename}: no checksum to check a resumed download against, starting over")
+            _discard(part_path)
+
+        resumed_from = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        read = 0
+        for attempt in range(1, retries + 1):
+            try:
+                read += _fetch_to_part(url, part_path, timeout, (expected or {}).get("size"))
+                if verify_file(part_path, expected):
+                    os.replace(part_path, path)
+                    _discard(part_path)
+                    return {
+                        "source": url,
+                        "bytes": read,
+                        "resumed_from": resumed_from,
+                        "seconds": time.perf_counter() - start,
+                    }
+                # Complete but wrong content: a resume cannot fix that
+                print(f"[VERIFY] {filename} checksum mismatch (attempt {attempt}/{retries})")
+                _discard(part_path)
+            except (requests.RequestException, OSError, ArtifactError) as e:
+                print(f"[RETRY] {filename}: {e} (attempt {attempt}/{retries})")
+            if attempt < retries:
+                time.sleep(min(2 ** attempt, 10))
+
+    raise ArtifactError(f"Could not fetch a verified copy of {filename} from {url}")
+
+
+def fetch_all(files: Dict[str, str], dest_dir: str, manifest: Dict[str, dict],
+              offline: bool = False, max_workers: int = 5) -> Dict[str, dict]:
+    """Fetch every ``{filename: url}`` concurrently; returns per-file stats"""
+    os.makedirs(dest_dir, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            name: pool.submit(fetch_artifact, name, url, dest_dir, manifest.get(name), offline)
+            for name, url in files.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Model artifact tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    manifest = sub.add_parser("manifest", help="Print a SHA-256 manifest for a directory of artifacts")
+    manifest.add_argument("directory")
+    sub.add_parser("fetch", help="Fetch and verify all model artifacts into MODEL_DIR")
+    args = parser.parse_args(argv)
+
+    if args.command == "manifest":
+        json.dump(build_manifest(args.directory), sys.stdout, indent=2)
+        print()
+        return 0
+
+    import main as app
+
+    stats = fetch_all(app.MODEL_FILES, app.MODEL_DIR, load_manifest(app.MODEL_MANIFEST),
+                      app.MODEL_OFFLINE, app.ARTIFACT_WORKERS)
+    for name, s in stats.items():
+        print(f"[OK] {name}: {s['bytes']} bytes from {s['source']} in {s['seconds']:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,480 @@
+"""
+Append-only prediction audit log.
+
+Every prediction the API serves is recorded with its inputs, model, model
+version, probability and prediction as served, and time. Writing to disk per request would put disk
+latency on every prediction, so ``AuditLog.record`` only appends to an
+in-memory buffer. A writer thread flushes the buffer once ``flush_rows``
+records wait or every ``flush_seconds``, as one zstd-compressed record
+batch in an Apache Arrow IPC stream.
+
+Segments rotate by size or age and are named
+``audit-<UTC start>-<pid>-<seq>.arrows``, so several server processes can
+share a directory. Stream segments need no footer. A segment cut short by
+a crash still reads up to its last flushed batch, and only the unflushed
+buffer is lost. ``close`` flushes and closes the open segment on graceful
+shutdown.
+
+The buffer is bounded. When it is full, ``record`` waits up to its timeout
+for the writer, then raises ``AuditFullError``. The API answers 503 rather
+than serve a prediction it could not audit. Failed writes stay buffered
+and are retried, so a full disk turns into back-pressure, not lost records.
+
+``scan`` and ``query`` read segments one record batch at a time, with
+time and equality filters:
+
+    python audit.py audit_logs/ --since 2026-10-01 --model "Random Forest" -o audit.csv
+
+Requires pyarrow.
+"""
+
+import argparse
+import glob
+import itertools
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Collection, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = pc = None
+
+SEGMENT_PATTERN = "audit-*.arrows"
+COMPRESSION = "zstd"
+
+Timestamp = Union[datetime, float, str, None]
+
+
+class AuditFullError(RuntimeError):
+    """The audit buffer stayed full (or the log is closed); the prediction must not be served"""
+
+
+def audit_schema(input_fields: Sequence[str], integer_fields: Collection[str] = ()) -> "pa.Schema":
+    """Columns of an audit segment: time, endpoint, model and version, the inputs, then the outcome"""
+    return pa.schema(
+        [
+            ("ts", pa.timestamp("us", tz="UTC")),
+            ("endpoint", pa.string()),
+            ("model", pa.string()),
+            ("model_version", pa.string()),
+        ]
+        + [(name, pa.int64() if name in integer_fields else pa.float64()) for name in input_fields]
+        + [("probability", pa.float64()), ("prediction", pa.int8())]
+    )
+
+
+class AuditLog:
+    """Bounded in-memory buffer of prediction records, flushed to rotated Arrow segments by a writer thread"""
+
+    def __init__(self, directory: str, input_fields: Sequence[str], integer_fields: Collection[str] = (),
+                 flush_rows: int = 5000, flush_seconds: float = 1.0, max_pending_rows: int = 100_000,
+                 max_wait: float = 0.1, rotate_bytes: int = 64 * 2 ** 20, rotate_seconds: float = 3600.0,
+                 fsync: bool = False):
+        """
+        Args:
+            directory: Where segments are written (created if missing)
+            input_fields: Names of the input columns, in the order record() receives them
+            integer_fields: Input columns stored as integers; the others are float64
+            flush_rows: Buffered records that trigger a flush before flush_seconds pass
+            flush_seconds: Longest a record waits in memory
+            max_pending_rows: Buffered records before record() waits for the writer
+            max_wait: Default seconds record() waits for buffer space before raising AuditFullError
+            rotate_bytes: Segment size that starts a new segment
+            rotate_seconds: Segment age that starts a new segment
+            fsync: fsync each flush, not just hand it to the OS
+        """
+        if pa is None:
+            raise RuntimeError("The audit log needs pyarrow (pip install pyarrow)")
+        self.directory = directory
+        self.input_fields = tuple(input_fields)
+        self.schema = audit_schema(self.input_fields, integer_fields)
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.max_pending_rows = max_pending_rows
+        self.max_wait = max_wait
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+
+        self._entries: list = []
+        self._rows = 0
+        # A plain lock on the recording path; the condition only for callers waiting for buffer space
+        self._lock = threading.Lock()
+        self._space = threading.Condition(self._lock)
+        self._flush_now = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+        self._file = None
+        self._writer = None
+        self._segment: Optional[str] = None
+        self._opened_at = 0.0
+        self._seq = 0
+        self.rows_written = 0
+        self.segments_written = 0
+        self.rejected = 0
+        self.write_errors = 0
+
+    def _start(self) -> None:
+        # The writer starts with the first record, so importing the app spawns no threads
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    # --------------------------------------------------
+    # RECORDING
+    # --------------------------------------------------
+
+    def record(self, endpoint: str, model_version: Optional[str], inputs: Sequence[float],
+               results: Sequence[Tuple[str, float, int]], timeout: Optional[float] = None) -> None:
+        """
+        Buffer the predictions served for one patient
+
+        Args:
+            endpoint: Route that served them
+            model_version: Model version that produced them
+            inputs: The patient's values in ``input_fields`` order
+            results: ``(model, probability, prediction)`` per model, as served; recorded together or not at all
+            timeout: Seconds to wait for buffer space (default ``max_wait``; 0 never waits)
+
+        Raises:
+            AuditFullError: The buffer stayed full for ``timeout`` seconds, or the log is closed
+        """
+        now = time.time()
+        rows = [(now, endpoint, model, model_version, tuple(inputs), probability, prediction)
+                for model, probability, prediction in results]
+        self._append(rows, len(rows), timeout)
+
+    def record_batch(self, endpoint: str, model: str, model_version: Optional[str], inputs: np.ndarray,
+                     probabilities: np.ndarray, predictions: np.ndarray, timeout: Optional[float] = None) -> None:
+        """
+        Buffer one model's predictions for a batch of patients
+
+        Args:
+            inputs: (N, len(input_fields)) patient matrix; must not be modified afterwards
+            probabilities: (N,) probabilities as served
+            predictions: (N,) predictions as served (0/1), not derived from the possibly rounded probabilities
+
+        Raises:
+            AuditFullError: As for ``record``
+        """
+        if len(inputs):
+            self._append((time.time(), endpoint, model, model_version, inputs, probabilities, predictions),
+                         len(inputs), timeout)
+
+    def _append(self, entry, rows: int, timeout: Optional[float]) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._start()
+            if self._rows + rows > self.max_pending_rows and self._rows:
+                # Wake the writer and wait for it to take the buffer (an oversized batch needs it empty)
+                deadline = time.monotonic() + (self.max_wait if timeout is None else timeout)
+                self._flush_now.set()
+                while self._rows + rows > self.max_pending_rows and self._rows and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += rows
+                        raise AuditFullError(f"Audit buffer is full ({self._rows} records waiting to be written)")
+                    self._space.wait(remaining)
+            if self._closed:
+                self.rejected += rows
+                raise AuditFullError("Audit log is closed")
+            if isinstance(entry, list):
+                self._entries.extend(entry)
+            else:
+                self._entries.append(entry)
+            self._rows += rows
+            flush = self._rows >= self.flush_rows
+        if flush and not self._flush_now.is_set():
+            self._flush_now.set()
+
+    # --------------------------------------------------
+    # WRITING
+    # --------------------------------------------------
+
+    def _run(self) -> None:
+        while True:
+            self._flush_now.wait(self.flush_seconds)
+            self._flush_now.clear()
+            with self._lock:
+                entries, rows = self._entries, self._rows
+                self._entries, self._rows = [], 0
+                closed = self._closed
+                self._space.notify_all()
+            if entries and not self._write(entries, rows) and not closed:
+                time.sleep(self.flush_seconds)
+            if closed:
+                return
+
+    def _write(self, entries: list, rows: int) -> bool:
+        """Append ``entries`` to the open segment; on failure they go back to the front of the buffer"""
+        try:
+            batch = self._to_batch(entries)
+            if self._writer is None or self._due_rotation():
+                self._rotate()
+            self._writer.write_batch(batch)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.rows_written += rows
+            return True
+        except Exception as e:
+            self.write_errors += 1
+            print(f"[AUDIT] Could not write {rows} records, keeping them buffered: {e}")
+            # A partly written batch would corrupt the rest of the stream: continue in a new segment
+            self._close_segment()
+            with self._lock:
+                self._entries[:0] = entries
+                self._rows += rows
+            return False
+
+    def _to_batch(self, entries: list) -> "pa.RecordBatch":
+        """One record batch of the buffered single rows and batch blocks, in arrival order"""
+        labels = {name: [] for name in ("endpoint", "model", "model_version")}
+        ts, inputs, probability, prediction = [], [], [], []
+        singles: list = []
+
+        def add_singles():
+            if singles:
+                at, *names, values, probs, preds = zip(*singles)
+                ts.append(np.array(at))
+                for column, chunks in zip(names, labels.values()):
+                    chunks.append(pa.array(column, type=pa.string()))
+                inputs.append(np.fromiter(itertools.chain.from_iterable(values), np.float64,
+                                          count=len(values) * len(self.input_fields)).reshape(len(values), -1))
+                probability.append(np.array(probs, dtype=np.float64))
+                prediction.append(np.array(preds, dtype=np.int8))
+                singles.clear()
+
+        # Entries are (time, endpoint, model, version, inputs, probability, prediction) tuples;
+        # record_batch() buffers a whole block as one, with a patient matrix and value arrays
+        for entry in entries:
+            if not isinstance(entry[4], np.ndarray):
+                singles.append(entry)
+                continue
+            add_singles()
+            at, matrix, probs = entry[0], entry[4], entry[5]
+            ts.append(np.full(len(matrix), at))
+            for value, chunks in zip(entry[1:4], labels.values()):
+                chunks.append(pa.repeat(pa.scalar(value, type=pa.string()), len(matrix)))
+            inputs.append(np.asarray(matrix, dtype=np.float64))
+            probability.append(np.asarray(probs, dtype=np.float64))
+            prediction.append(np.asarray(entry[6], dtype=np.int8))
+        add_singles()
+
+        matrix = np.concatenate(inputs)
+        probability = np.concatenate(probability)
+        columns = [pa.array((np.concatenate(ts) * 1e6).astype(np.int64), type=self.schema.field("ts").type)]
+        columns += [pa.concat_arrays(chunks) for chunks in labels.values()]
+        for j, name in enumerate(self.input_fields):
+            field_type = self.schema.field(name).type
+            values = matrix[:, j]
+            columns.append(pa.array(values.astype(np.int64) if pa.types.is_integer(field_type) else values,
+                                    type=field_type))
+        columns += [pa.array(probability), pa.array(np.concatenate(prediction))]
+        return pa.RecordBatch.from_arrays(columns, schema=self.schema)
+
+    def _due_rotation(self) -> bool:
+        return (self._file.tell() >= self.rotate_bytes
+                or time.monotonic() - self._opened_at >= self.rotate_seconds)
+
+    def _rotate(self) -> None:
+        self._close_segment()
+        self._seq += 1
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        self._segment = os.path.join(self.directory, f"audit-{stamp}-{os.getpid()}-{self._seq:06d}.arrows")
+        self._file = open(self._segment, "wb")
+        options = pa.ipc.IpcWriteOptions(compression=COMPRESSION)
+        self._writer = pa.ipc.new_stream(self._file, self.schema, options=options)
+        self._opened_at = time.monotonic()
+        self.segments_written += 1
+
+    def _close_segment(self) -> None:
+        if self._file is None:
+            return
+        try:
+            self._writer.close()
+            self._file.close()
+        except Exception as e:
+            print(f"[AUDIT] Could not close segment {self._segment}: {e}")
+        self._file = self._writer = None
+
+    def close(self, timeout: float = 30.0) -> None:
+        """Stop accepting records, write the buffer and close the open segment"""
+        with self._lock:
+            self._closed = True
+            self._space.notify_all()
+            thread = self._thread
+        self._flush_now.set()
+        if thread is not None:
+            thread.join(timeout)
+        with self._lock:
+            entries, rows = self._entries, self._rows
+            self._entries, self._rows = [], 0
+        if entries:
+            self._write(entries, rows)
+        self._close_segment()
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = self._rows
+        return {
+            "directory": self.directory,
+            "pending_rows": pending,
+            "rows_written": self.rows_written,
+            "segments_written": self.segments_written,
+            "segment": os.path.basename(self._segment) if self._segment else None,
+            "rejected": self.rejected,
+            "write_errors": self.write_errors,
+        }
+
+# --------------------------------------------------
+# QUERIES
+# --------------------------------------------------
+
+def segments(directory: str) -> List[str]:
+    """Segment paths in start-time order"""
+    return sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN)), key=os.path.basename)
+
+
+def read_segment(path: str) -> Iterator["pa.RecordBatch"]:
+    """Record batches of one segment, stopping quietly at a truncated tail (segment being written, or a crash)"""
+    with open(path, "rb") as f:
+        try:
+            reader = pa.ipc.open_stream(f)
+        except (pa.ArrowInvalid, OSError):
+            return
+        while True:
+            try:
+                yield reader.read_next_batch()
+            except StopIteration:
+                return
+            except (pa.ArrowInvalid, OSError):
+                return
+
+
+def _timestamp(value: Timestamp) -> Optional["pa.Scalar"]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif not isinstance(value, datetime):
+        value = datetime.fromtimestamp(value, timezone.utc)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return pa.scalar(value, type=pa.timestamp("us", tz="UTC"))
+
+
+def _segment_start(path: str) -> datetime:
+    stamp = os.path.basename(path).split("-")[1]
+    return datetime.strptime(stamp, "%Y%m%dT%H%M%S%fZ").replace(tzinfo=timezone.utc)
+
+
+def scan(directory: str, since: Timestamp = None, until: Timestamp = None,
+         columns: Optional[Sequence[str]] = None, **equals) -> Iterator["pa.RecordBatch"]:
+    """
+    Stream the matching audit records, one record batch at a time
+
+    Args:
+        directory: Audit log directory
+        since: Earliest timestamp (inclusive): datetime, epoch seconds or ISO string (UTC if naive)
+        until: Latest timestamp (exclusive)
+        columns: Columns to return (default: all)
+        **equals: Column equality filters, e.g. ``model="Random Forest", model_version="v2"``
+
+    Yields:
+        pa.RecordBatch: Matching records of one flush, non-empty
+    """
+    since, until = _timestamp(since), _timestamp(until)
+    for path in segments(directory):
+        if until is not None and _segment_start(path) >= until.as_py():
+            continue
+        for batch in read_segment(path):
+            conditions = []
+            if since is not None:
+                conditions.append(pc.greater_equal(batch.column("ts"), since))
+            if until is not None:
+                conditions.append(pc.less(batch.column("ts"), until))
+            conditions += [pc.equal(batch.column(name), value) for name, value in equals.items()]
+            mask = None
+            for condition in conditions:
+                mask = condition if mask is None else pc.and_(mask, condition)
+            if mask is not None:
+                batch = batch.filter(mask)
+            if columns is not None:
+                batch = batch.select(list(columns))
+            if batch.num_rows:
+                yield batch
+
+
+def query(directory: str, since: Timestamp = None, until: Timestamp = None,
+          columns: Optional[Sequence[str]] = None, limit: Optional[int] = None, **equals) -> "pa.Table":
+    """``scan`` collected into one table, stopping after ``limit`` rows"""
+    batches, rows = [], 0
+    for batch in scan(directory, since, until, columns, **equals):
+        if limit is not None and rows + batch.num_rows >= limit:
+            batches.append(batch.slice(0, limit - rows))
+            break
+        batches.append(batch)
+        rows += batch.num_rows
+    if batches:
+        return pa.Table.from_batches(batches)
+    paths = segments(directory)
+    if not paths:
+        return pa.table({})
+    with open(paths[0], "rb") as f:
+        table = pa.ipc.open_stream(f).schema.empty_table()
+    return table.select(list(columns)) if columns else table
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import pyarrow.csv as pacsv
+
+    parser = argparse.ArgumentParser(description="Export or count prediction audit records")
+    parser.add_argument("directory", help="Audit log directory (AUDIT_DIR)")
+    parser.add_argument("-o", "--output", default="-", help="CSV output file, or - for stdout (default)")
+    parser.add_argument("--since", help="Earliest timestamp, ISO 8601 (UTC if no offset)")
+    parser.add_argument("--until", help="Latest timestamp (exclusive)")
+    parser.add_argument("--endpoint")
+    parser.add_argument("--model", help='e.g. "Random Forest" or "Logistic Regression"')
+    parser.add_argument("--model-version")
+    parser.add_argument("--count", action="store_true", help="Only print the number of matching records")
+    args = parser.parse_args(argv)
+
+    equals = {name: value for name, value in (
+        ("endpoint", args.endpoint), ("model", args.model), ("model_version", args.model_version),
+    ) if value is not None}
+    batches = scan(args.directory, args.since, args.until, **equals)
+
+    rows = 0
+    if args.count:
+        rows = sum(batch.num_rows for batch in batches)
+        print(rows)
+        return 0
+
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    writer = None
+    try:
+        for batch in batches:
+            if writer is None:
+                writer = pacsv.CSVWriter(out, batch.schema)
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+        if out is not sys.stdout.buffer:
+            out.close()
+    print(f"[AUDIT] Exported {rows} records", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Micro-batching of concurrent single-row predictions.
+
+Scoring one row through sklearn's ``predict_proba`` costs almost as much as
+scoring a few dozen: the per-call overhead (input validation, the
+per-estimator loop, joblib dispatch) dominates. ``MicroBatcher`` queues the
+rows of concurrent callers, and a collector thread scores them with one
+batched call once ``max_rows`` rows are waiting or ``max_wait`` seconds
+have passed since the first one. Each caller blocks only until its own
+probability is ready.
+
+The collector does not wait out the window when every caller currently in
+``submit`` is already in the batch, so a lone request is not delayed.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Sequence
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row scoring calls into batched model calls"""
+
+    def __init__(self, score_batch: Callable[[Any, np.ndarray], np.ndarray],
+                 max_rows: int = 64, max_wait: float = 0.002):
+        """
+        Args:
+            score_batch: ``score_batch(models, raw)`` returning one probability per row of ``raw``
+            max_rows: Largest batch handed to ``score_batch``
+            max_wait: Seconds the first row of a batch may wait for company
+        """
+        self.score_batch = score_batch
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._inflight = 0
+        self.batches = 0
+        self.rows = 0
+        self.largest = 0
+
+    def submit(self, models: Any, row: Sequence[float]) -> float:
+        """Score one raw patient row with ``models``; blocks until its batch has run"""
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._collect, name="micro-batcher", daemon=True)
+                self._thread.start()
+            self._inflight += 1
+        try:
+            self._queue.put((models, row, future, time.monotonic()))
+            return future.result()
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+    def _collect(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = batch[0][3] + self.max_wait
+            while len(batch) < self.max_rows:
+                # Rows already queued always join; only wait for more while the window is open
+                # and some caller in submit() has not queued its row yet
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0 and len(batch) < self._inflight:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._run(batch)
+
+    def _run(self, batch: List[tuple]) -> None:
+        # A model reload can land mid-batch: score each bundle's rows with that bundle
+        groups = {}
+        for item in batch:
+            groups.setdefault(id(item[0]), []).append(item)
+
+        for items in groups.values():
+            try:
+                raw = np.array([item[1] for item in items], dtype=np.float64)
+                probs = self.score_batch(items[0][0], raw)
+            except Exception as e:
+                for item in items:
+                    item[2].set_exception(e)
+                continue
+            for item, prob in zip(items, probs):
+                item[2].set_result(float(prob))
+
+        with self._lock:
+            self.batches += 1
+            self.rows += len(batch)
+            self.largest = max(self.largest, len(batch))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_rows": self.max_rows,
+                "max_wait_ms": self.max_wait * 1000,
+                "batches": self.batches,
+                "rows": self.rows,
+                "mean_batch": round(self.rows / self.batches, 2) if self.batches else 0.0,
+                "largest_batch": self.largest,
+            }
@@ -0,0 +1,195 @@
+"""
+Admission control: shedding rules and goodput under overload.
+
+Checks first, in process: a full queue and an expired deadline are answered
+503 with Retry-After at once (with CORS headers), a freed slot goes to a
+waiting prediction before a waiting bulk request, and a request whose
+deadline passes in the queue is never run.
+
+Then starts the API under uvicorn with ADMISSION_CONTROL=0 and =1 on
+stand-in artifacts (cache off) and overloads it: single-patient clients on
+/predict/randomforest and /predict/compare next to clients posting
+200-patient /predict/batch calls. Every client sends
+X-Request-Deadline-Ms and gives up when it runs out; a shed client backs
+off for a short while before retrying. Reports goodput (answers that came
+back within the deadline, per second), p50/p99 of those answers and the
+shed/timed-out counts per endpoint.
+
+    python benchmarks/bench_admission.py [--seconds 10] [--deadline-ms 2000]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import requests
+
+from common import install_standin_models, start_api, stop_api, synthetic_patients, write_standin_artifacts
+
+import admission
+import main
+from fastapi.testclient import TestClient
+
+PORT = 8765
+URL = f"http://127.0.0.1:{PORT}"
+SHED_BACKOFF = 0.05
+
+
+def check_controller():
+    async def scenario():
+        controller = admission.AdmissionController((
+            admission.AdmissionClass("predict", 0, limit=1, max_queue=2, max_wait=1.0, retry_after=1),
+            admission.AdmissionClass("bulk", 1, limit=1, max_queue=1, max_wait=1.0, retry_after=5),
+        ), capacity=1)
+        await controller.acquire("bulk")
+        order = []
+
+        async def waiter(name, deadline=None):
+            try:
+                await controller.acquire(name, deadline)
+            except admission.Shed as e:
+                order.append((name, e.reason))
+                return
+            order.append((name, "admitted"))
+            await asyncio.sleep(0.01)
+            controller.release(name)
+
+        bulk = asyncio.ensure_future(waiter("bulk"))
+        await asyncio.sleep(0)
+        expiring = asyncio.ensure_future(waiter("predict", time.monotonic() + 0.02))
+        predict = asyncio.ensure_future(waiter("predict"))
+        await asyncio.sleep(0)
+
+        try:
+            await controller.acquire("bulk")
+        except admission.Shed as e:
+            assert e.reason == "queue_full" and e.retry_after == 5
+        else:
+            raise AssertionError("full bulk queue admitted a request")
+
+        await asyncio.sleep(0.05)
+        controller.release("bulk")
+        await asyncio.gather(bulk, expiring, predict)
+        assert order == [("predict", "deadline"), ("predict", "admitted"), ("bulk", "admitted")], order
+        stats = controller.stats()
+        assert stats["running"] == 0 and stats["classes"]["predict"]["shed"]["deadline"] == 1
+
+    asyncio.run(scenario())
+
+    install_standin_models()
+    client = TestClient(main.app)
+    patient = synthetic_patients(1, seed=1)[0]
+    r = client.post("/predict/logistic", json=patient,
+                    headers={"X-Request-Deadline-Ms": "0", "Origin": "https://cardiosense.netlify.app"})
+    assert r.status_code == 503 and r.json()["reason"] == "deadline", r.text
+    assert r.headers["retry-after"] == "1" and "access-control-allow-origin" in r.headers
+    assert client.post("/predict/logistic", json=patient, headers={"X-Request-Deadline-Ms": "5000"}).status_code == 200
+    print("[OK] Full queue and expired deadline shed with 503 + Retry-After; predictions admitted before bulk; "
+          "requests expired in the queue never run")
+
+
+def client_loop(path, payloads, deadline_ms, stop, outcome):
+    session = requests.Session()
+    headers = {"X-Request-Deadline-Ms": str(deadline_ms)}
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            r = session.post(f"{URL}{path}", json=payloads[i % len(payloads)], headers=headers,
+                             timeout=deadline_ms / 1000)
+        except requests.Timeout:
+            outcome["timeout"] += 1
+            session = requests.Session()
+            continue
+        finally:
+            i += 1
+        elapsed = time.perf_counter() - start
+        if r.status_code == 200:
+            outcome["latencies"].append(elapsed)
+        elif r.status_code == 503:
+            outcome["shed"] += 1
+            time.sleep(SHED_BACKOFF)
+        else:
+            outcome["errors"] += 1
+
+
+def overload(seconds, deadline_ms, clients):
+    patients = synthetic_patients(2000, seed=3)
+    batches = [{"patients": patients[i:i + 200], "model": "compare"} for i in range(0, 2000, 200)]
+    payloads = {"/predict/randomforest": patients, "/predict/compare": patients, "/predict/batch": batches}
+    outcomes = {path: {"latencies": [], "shed": 0, "timeout": 0, "errors": 0} for path in clients}
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=client_loop, args=(path, payloads[path], deadline_ms, stop, outcomes[path]))
+        for path, n in clients.items() for _ in range(n)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    health = requests.get(f"{URL}/health", timeout=30).json()
+
+    results = {}
+    for path, o in outcomes.items():
+        latencies = np.asarray(o["latencies"]) * 1000
+        p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (float("nan"),) * 2
+        results[path] = {"goodput": len(latencies) / seconds, "p50_ms": p50, "p99_ms": p99,
+                         "shed": o["shed"], "timeout": o["timeout"], "errors": o["errors"]}
+    return results, health["admission"]
+
+
+def run(seconds, deadline_ms, clients):
+    check_controller()
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact_dir = os.path.join(tmp, "artifacts")
+        write_standin_artifacts(artifact_dir, n_train=20_000)
+        print(f"\nOverload for {seconds:g}s, deadline {deadline_ms} ms, clients: "
+              + ", ".join(f"{n} on {path}" for path, n in clients.items()))
+        print(f"{'admission':<11}{'endpoint':<24}{'goodput/s':>10}{'p50 ms':>9}{'p99 ms':>9}"
+              f"{'shed':>7}{'timeout':>9}{'errors':>8}")
+        for control in ("0", "1"):
+            server = start_api({
+                "MODEL_DIR": os.path.join(tmp, f"models-{control}"),
+                "MODEL_BASE_URL": artifact_dir,
+                "MODEL_OFFLINE": "1",
+                "MODEL_MANIFEST": os.path.join(tmp, "none"),
+                "PREDICTION_CACHE_SIZE": "0",
+                "DRIFT_MONITOR": "0",
+                "ADMISSION_CONTROL": control,
+                # Sized to the one or two cores this runs on, not the 40-thread default
+                "ADMISSION_CAPACITY": "8",
+                "ADMISSION_BULK_LIMIT": "2",
+            }, PORT)
+            try:
+                results, control_stats = overload(seconds, deadline_ms, clients)
+            finally:
+                stop_api(server)
+            for path, r in results.items():
+                print(f"{'on' if control == '1' else 'off':<11}{path:<24}{r['goodput']:>10.1f}{r['p50_ms']:>9.1f}"
+                      f"{r['p99_ms']:>9.1f}{r['shed']:>7}{r['timeout']:>9}{r['errors']:>8}")
+                assert not r["errors"], f"{path}: unexpected error responses"
+            if control_stats:
+                print("  server: " + "; ".join(
+                    f"{name} shed {sum(c['shed'].values())} ({', '.join(f'{k} {v}' for k, v in c['shed'].items() if v)}), "
+                    f"service {c['service_ms']:.0f} ms" for name, c in control_stats["classes"].items() if c["admitted"]
+                ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--deadline-ms", type=int, default=2000)
+    parser.add_argument("--predict-clients", type=int, default=32)
+    parser.add_argument("--bulk-clients", type=int, default=8)
+    args = parser.parse_args()
+    run(args.seconds, args.deadline_ms, {
+        "/predict/randomforest": args.predict_clients // 2,
+        "/predict/compare": args.predict_clients - args.predict_clients // 2,
+        "/predict/batch": args.bulk_clients,
+    })
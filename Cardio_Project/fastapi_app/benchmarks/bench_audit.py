@@ -0,0 +1,244 @@
+"""
+Prediction audit log: completeness, durability, back-pressure and overhead.
+
+  completeness   every endpoint (single, compare, batch, stream, columnar,
+                 sweep, explanations) is audited with the inputs and
+                 probabilities it served
+  durability     a segment cut short mid-write still reads up to its last
+                 complete batch; close() writes what is buffered
+  back-pressure  a stalled writer makes record() raise after its timeout and
+                 the API answer 503; failed writes are retried, not lost
+  overhead       record() cost, /predict/logistic and /predict/batch p50/p99
+                 with the audit log on vs. off, writer rows/s, bytes/record
+  queries        scan rows/s over 1M records and the Arrow memory it holds
+
+    python benchmarks/bench_audit.py
+"""
+
+import io
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pyarrow as pa
+
+from common import install_standin_models, latency_percentiles, synthetic_matrix, synthetic_patients
+
+import audit
+import main
+from cache import PredictionCache
+from fastapi.testclient import TestClient
+
+
+def new_log(directory, **kwargs):
+    kwargs.setdefault("integer_fields", [f for f in main.PATIENT_FIELDS if main.PatientData.model_fields[f].annotation is int])
+    return audit.AuditLog(directory, main.PATIENT_FIELDS, **kwargs)
+
+
+def check_completeness(client, directory):
+    main.audit_log = new_log(directory)
+    patients = synthetic_patients(20, seed=1)
+    served = [client.post("/predict/logistic", json=p).json() for p in patients[:10]]
+    served += [client.post("/predict/randomforest", json=p).json() for p in patients[10:]]
+    compare = client.post("/predict/compare", json=patients[0]).json()
+    batch = client.post("/predict/batch", json={"patients": synthetic_patients(300, seed=2), "model": "compare"})
+    csv = "age;gender;height;weight;ap_hi;ap_lo;cholesterol;gluc;smoke;alco;active\n" + "\n".join(
+        ";".join(str(p[f]) for f in main.PATIENT_FIELDS) for p in synthetic_patients(200, seed=3)
+    )
+    stream = client.post("/predict/stream?model=logistic", files={"file": ("x.csv", csv)})
+    buffer = io.BytesIO()
+    np.save(buffer, synthetic_matrix(500, seed=4))
+    columnar = client.post("/predict/columnar?model=randomforest", content=buffer.getvalue(),
+                           headers={"Content-Type": "application/x-npy"})
+    sweep = client.post("/predict/sweep", json={"patient": patients[0], "model": "logistic",
+                                                 "axes": [{"feature": "ap_hi", "start": 110, "stop": 170, "steps": 7}]})
+    explained = client.post("/explain?model=randomforest", json=patients[1])
+    explained_batch = client.post("/explain/batch", json={"patients": patients[:5], "model": "compare"})
+    assert batch.status_code == stream.status_code == columnar.status_code == 200
+    assert sweep.status_code == explained.status_code == explained_batch.status_code == 200
+    main.close_audit_log()
+
+    table = audit.query(directory)
+    counts = {}
+    for endpoint, model in zip(table["endpoint"].to_pylist(), table["model"].to_pylist()):
+        counts[endpoint, model] = counts.get((endpoint, model), 0) + 1
+    assert counts == {
+        ("/predict/logistic", "Logistic Regression"): 10,
+        ("/predict/randomforest", "Random Forest"): 10,
+        ("/predict/compare", "Random Forest"): 1,
+        ("/predict/compare", "Logistic Regression"): 1,
+        ("/predict/batch", "Random Forest"): 300,
+        ("/predict/batch", "Logistic Regression"): 300,
+        ("/predict/stream", "Logistic Regression"): 200,
+        ("/predict/columnar", "Random Forest"): 500,
+        ("/predict/sweep", "Logistic Regression"): 7,
+        ("/explain", "Random Forest"): 1,
+        ("/explain/batch", "Random Forest"): 5,
+        ("/explain/batch", "Logistic Regression"): 5,
+    }, counts
+
+    singles = audit.query(directory, endpoint="/predict/logistic")
+    assert singles["probability"].to_pylist() == [r["probability"] for r in served[:10]]
+    assert singles["ap_hi"].to_pylist() == [p["ap_hi"] for p in patients[:10]]
+    assert singles.schema.field("cholesterol").type == pa.int64()
+    lr = audit.query(directory, endpoint="/predict/compare", model="Logistic Regression")
+    assert lr["probability"][0].as_py() == compare["logistic_regression"]["probability"]
+    rf = audit.query(directory, endpoint="/predict/batch", model="Random Forest", columns=["probability", "prediction"])
+    assert rf["probability"].to_pylist() == [r["random_forest"]["probability"] for r in batch.json()["results"]]
+    assert rf["prediction"].to_pylist() == [r["random_forest"]["prediction"] for r in batch.json()["results"]]
+    curve = audit.query(directory, endpoint="/predict/sweep")
+    assert curve["probability"].to_pylist() == sweep.json()["logistic_regression"]
+    assert curve["ap_hi"].to_pylist() == [110, 120, 130, 140, 150, 160, 170]
+    explanation = audit.query(directory, endpoint="/explain")
+    assert explanation["probability"][0].as_py() == explained.json()["random_forest"]["probability"]
+    # 0.49996 is served as probability 0.5 with prediction 0; the log must not turn that into a 1
+    boundary = os.path.join(directory, "boundary")
+    log = new_log(boundary)
+    log.record_batch("/bench", "Random Forest", "v1", synthetic_matrix(1, seed=9), np.array([0.5]), np.array([0]))
+    log.close()
+    assert audit.query(boundary)["prediction"].to_pylist() == [0], "audit re-derived the prediction"
+    print(f"[OK] {table.num_rows} records from 12 endpoint/model pairs, inputs and served probabilities and predictions match")
+
+
+def check_durability(directory):
+    log = new_log(directory, flush_rows=100, flush_seconds=0.05)
+    raw = synthetic_matrix(1000, seed=5)
+    for start in range(0, 1000, 100):
+        log.record_batch("/bench", "Random Forest", "v1", raw[start:start + 100], np.full(100, 0.5), np.ones(100))
+        time.sleep(0.1)  # one flush per block
+    path = audit.segments(directory)[0]
+
+    # Crash mid-write: the open segment has no end-of-stream marker and a torn tail
+    with open(path, "rb") as f:
+        data = f.read()
+    torn = os.path.join(directory, "audit-29990101T000000000000Z-1-000001.arrows")
+    with open(torn, "wb") as f:
+        f.write(data[:len(data) - 300])
+    batches = list(audit.read_segment(torn))
+    assert sum(b.num_rows for b in batches) == 900, "torn segment lost more than its last batch"
+    os.remove(torn)
+
+    log.record("/bench", "v1", raw[0], [("Random Forest", 0.25, 0)])
+    log.close()
+    assert audit.query(directory).num_rows == 1001, "close() did not write the buffer"
+    print("[OK] Torn segment reads up to its last complete batch; close() writes the buffer")
+
+
+class StalledLog(audit.AuditLog):
+    """Writer that blocks until released, then fails its first two writes"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = threading.Event()
+        self.failures = 2
+
+    def _rotate(self):
+        self.release.wait()
+        if self.failures:
+            self.failures -= 1
+            raise OSError("No space left on device")
+        super()._rotate()
+
+
+def check_backpressure(client, directory):
+    log = main.audit_log = StalledLog(directory, main.PATIENT_FIELDS, flush_rows=10, flush_seconds=0.01,
+                                      max_pending_rows=50, max_wait=0.05)
+    patient = synthetic_patients(1, seed=6)[0]
+    statuses = [client.post("/predict/logistic", json=patient).status_code for _ in range(120)]
+    rejected = client.post("/predict/logistic", json=patient)
+    assert statuses.count(200) < 120 and rejected.status_code == 503, statuses
+    assert rejected.headers["retry-after"] == "1"
+    served = statuses.count(200)
+
+    log.release.set()
+    deadline = time.time() + 10
+    while log.rows_written < served and time.time() < deadline:
+        time.sleep(0.05)
+    main.close_audit_log()
+    assert log.write_errors == 2 and audit.query(directory).num_rows == served, "records lost across write errors"
+    print(f"[OK] Stalled writer: {served} served then 503 + Retry-After; "
+          f"{log.write_errors} failed writes retried, all {served} records on disk")
+
+
+def timed_pair(fn, calls, log):
+    on, off = [], []
+    for _ in range(5):
+        main.audit_log = log
+        on.append(latency_percentiles(fn, calls))
+        main.audit_log = None
+        off.append(latency_percentiles(fn, calls))
+    main.audit_log = log
+    best = lambda runs: {k: min(r[k] for r in runs) for k in ("p50_ms", "p99_ms")}
+    return best(on), best(off)
+
+
+def check_overhead(directory):
+    main.prediction_cache = PredictionCache(max_entries=0)
+    log = new_log(directory)
+    patient = main.PatientData(**synthetic_patients(1)[0])
+    values = main.patient_values(patient)
+
+    calls = 200_000
+    start = time.perf_counter()
+    for _ in range(calls):
+        log.record("/bench", "v1", values, [("Logistic Regression", 0.5, 1)])
+    while log.stats()["pending_rows"]:
+        time.sleep(0.01)
+    per_call = (time.perf_counter() - start) / calls
+    print(f"\nrecord(): {per_call * 1e9:.0f} ns per record, including the background writes")
+
+    batch = main.BatchPredictionRequest(patients=synthetic_patients(1000, seed=2), model="logistic")
+    print(f"{'handler':<28}{'p50 off':>10}{'p50 on':>10}{'p99 off':>10}{'p99 on':>10}  (ms)")
+    for name, fn, n in (
+        ("/predict/logistic", lambda: main.predict_logistic(patient), 2000),
+        ("/predict/batch (1k rows)", lambda: main.predict_batch(batch), 100),
+    ):
+        on, off = timed_pair(fn, n, log)
+        print(f"{name:<28}{off['p50_ms']:>10.4f}{on['p50_ms']:>10.4f}{off['p99_ms']:>10.4f}{on['p99_ms']:>10.4f}")
+
+    raw = synthetic_matrix(10_000, seed=7)
+    probs = np.random.default_rng(7).random(len(raw))
+    start = time.perf_counter()
+    for _ in range(100):
+        log.record_batch("/bench", "Random Forest", "v1", raw, probs, probs >= 0.5, timeout=60)
+    log.close()
+    rate = 100 * len(raw) / (time.perf_counter() - start)
+    size = sum(os.path.getsize(p) for p in audit.segments(directory))
+    print(f"writer: {rate:,.0f} rows/s for 10k-row blocks; {size / log.rows_written:.1f} bytes/record on disk "
+          f"({log.rows_written:,} records, {len(audit.segments(directory))} segments)")
+    main.audit_log = None
+
+
+def check_queries(directory):
+    log = new_log(directory, rotate_bytes=4 * 2 ** 20)
+    raw = synthetic_matrix(10_000, seed=8)
+    probs = np.random.default_rng(8).random(len(raw))
+    for i in range(100):
+        log.record_batch("/bench", ("Random Forest", "Logistic Regression")[i % 2], "v1", raw, probs, probs >= 0.5,
+                         timeout=60)
+    log.close()
+
+    peak, rows = 0, 0
+    start = time.perf_counter()
+    for batch in audit.scan(directory, model="Random Forest", columns=["ts", "age", "probability"]):
+        rows += batch.num_rows
+        peak = max(peak, pa.total_allocated_bytes())
+    seconds = time.perf_counter() - start
+    assert rows == 500_000
+    print(f"scan: 1,000,000 records in {len(audit.segments(directory))} segments, {rows:,} matched in "
+          f"{seconds:.2f}s ({1_000_000 / seconds:,.0f} records/s), peak Arrow memory {peak / 2 ** 20:.1f} MB")
+
+
+def run():
+    install_standin_models()
+    client = TestClient(main.app)
+    for check in (lambda d: check_completeness(client, d), check_durability,
+                  lambda d: check_backpressure(client, d), check_overhead, check_queries):
+        with tempfile.TemporaryDirectory() as directory:
+            check(directory)
+
+
+if __name__ == "__main__":
+    run()
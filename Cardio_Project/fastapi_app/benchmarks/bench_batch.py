@@ -0,0 +1,60 @@
+"""
+Rows/second of /predict/batch against the single-row endpoints.
+
+Handlers are called in-process (request validation included, HTTP excluded)
+so the numbers isolate preprocessing and model cost. Single-row throughput
+at large N is measured on a capped sample since it is linear in N.
+
+    python benchmarks/bench_batch.py
+"""
+
+import orjson
+
+from common import install_standin_models, rows_per_second, synthetic_patients
+
+import main
+from cache import PredictionCache
+
+SIZES = (1, 100, 10_000)
+SINGLE_ROW_SAMPLE = 200
+
+# The Random Forest and compare handlers are async; call the sync code they run in the threadpool
+SINGLE_ENDPOINTS = {
+    "randomforest": lambda data: main.random_forest_result(data, main.active_models()),
+    "logistic": main.predict_logistic,
+    "compare": lambda data: main.compare_result(data, main.active_models()),
+}
+
+
+def check_equivalence(payloads):
+    batch = orjson.loads(main.predict_batch(main.BatchPredictionRequest(model="compare", patients=payloads)).body)
+    for payload, result in zip(payloads, batch["results"]):
+        assert result == SINGLE_ENDPOINTS["compare"](main.PatientData(**payload))
+
+
+def run():
+    install_standin_models()
+    # Single-row calls repeat the same sample; measure model cost, not cache hits
+    main.prediction_cache = PredictionCache(max_entries=0)
+    check_equivalence(synthetic_patients(50, seed=1))
+
+    print(f"{'model':<14}{'N':>8}{'single rows/s':>16}{'batch rows/s':>16}{'speedup':>10}")
+    for model, endpoint in SINGLE_ENDPOINTS.items():
+        for n in SIZES:
+            payloads = synthetic_patients(n, seed=n)
+            sample = payloads[:SINGLE_ROW_SAMPLE]
+
+            single = rows_per_second(
+                lambda: [endpoint(main.PatientData(**p)) for p in sample], len(sample)
+            )
+            batch = rows_per_second(
+                lambda: main.predict_batch(
+                    main.BatchPredictionRequest(model=model, patients=payloads)
+                ),
+                n,
+            )
+            print(f"{model:<14}{n:>8}{single:>16,.0f}{batch:>16,.0f}{batch / single:>9.1f}x")
+
+
+if __name__ == "__main__":
+    run()
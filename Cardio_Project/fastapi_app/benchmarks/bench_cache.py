@@ -0,0 +1,72 @@
+"""
+Prediction cache: hit vs. miss latency and throughput under repeat traffic.
+
+Replays a request stream where a given share of requests repeat earlier
+patients (kiosk resubmissions, client retries) through /predict/compare
+with and without the cache.
+
+    python benchmarks/bench_cache.py
+"""
+
+import time
+
+import numpy as np
+
+from common import install_standin_models, latency_percentiles, synthetic_patients
+
+import main
+from cache import PredictionCache
+
+REQUESTS = 2000
+REPEAT_SHARES = (0.0, 0.5, 0.9)
+
+
+def request_stream(repeat_share: float, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    unique = [main.PatientData(**p) for p in synthetic_patients(REQUESTS, seed=seed)]
+    stream, seen = [], 0
+    for _ in range(REQUESTS):
+        if seen and rng.random() < repeat_share:
+            stream.append(unique[rng.integers(seen)])
+        else:
+            stream.append(unique[seen])
+            seen += 1
+    return stream
+
+
+def compare(patient):
+    # What the async /predict/compare handler runs in the threadpool
+    return main.compare_result(patient, main.active_models())
+
+
+def replay(stream):
+    start = time.perf_counter()
+    for patient in stream:
+        compare(patient)
+    return len(stream) / (time.perf_counter() - start)
+
+
+def run():
+    install_standin_models()
+    patient = main.PatientData(**synthetic_patients(1)[0])
+
+    main.prediction_cache = PredictionCache(max_entries=10_000)
+    compare(patient)
+    hit = latency_percentiles(lambda: compare(patient), 2000)
+    main.prediction_cache = PredictionCache(max_entries=0)
+    miss = latency_percentiles(lambda: compare(patient), 200)
+    print(f"/predict/compare p50: miss {miss['p50_ms']:.3f} ms, hit {hit['p50_ms'] * 1000:.1f} us")
+
+    print(f"\n{'repeat share':>12}{'no cache req/s':>16}{'cache req/s':>14}{'hit rate':>10}")
+    for share in REPEAT_SHARES:
+        stream = request_stream(share)
+        main.prediction_cache = PredictionCache(max_entries=0)
+        baseline = replay(stream)
+        main.prediction_cache = PredictionCache(max_entries=10_000)
+        cached = replay(stream)
+        print(f"{share:>12.0%}{baseline:>16,.0f}{cached:>14,.0f}"
+              f"{main.prediction_cache.stats()['hit_rate']:>10.0%}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,173 @@
+"""
+End-to-end rows/second of the JSON, CSV/NDJSON and columnar scoring paths.
+
+Scores the same synthetic patients through /predict/batch (JSON, in
+MAX_BATCH_SIZE requests), /predict/stream (CSV and NDJSON) and
+/predict/columnar (.npy, Arrow IPC, msgpack), in-process through the ASGI
+app. Each timing covers encoding the request on the client, the request
+itself and decoding the response. Before timing, it checks that every
+format returns the same probabilities, and that the vectorized Field checks
+reject exactly the rows pydantic rejects, with the same messages. Formats
+whose package is not installed are skipped.
+
+    python benchmarks/bench_columnar.py [--rows 100000]
+"""
+
+import argparse
+import csv
+import io
+import json
+
+import numpy as np
+import orjson
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from common import install_standin_models, rows_per_second, synthetic_matrix
+
+import columnar
+import main
+
+FIELDS = main.PATIENT_FIELDS
+INT_FIELDS = {"gender", "cholesterol", "gluc", "smoke", "alco", "active"}
+
+
+def patient_dicts(raw: np.ndarray) -> list:
+    return [
+        {f: int(v) if f in INT_FIELDS else v for f, v in zip(FIELDS, row)}
+        for row in raw.tolist()
+    ]
+
+
+# --------------------------------------------------
+# CLIENTS: encode request, send, decode rf probabilities
+# --------------------------------------------------
+
+def via_json(client, raw):
+    patients = patient_dicts(raw)
+    probs = []
+    for start in range(0, len(patients), main.MAX_BATCH_SIZE):
+        body = orjson.dumps({"model": "compare", "patients": patients[start:start + main.MAX_BATCH_SIZE]})
+        r = client.post("/predict/batch", content=body, headers={"content-type": "application/json"})
+        probs += [result["random_forest"]["probability"] for result in orjson.loads(r.content)["results"]]
+    return np.array(probs)
+
+
+def via_stream(fmt):
+    def score(client, raw):
+        if fmt == "csv":
+            text = io.StringIO()
+            writer = csv.writer(text, lineterminator="\n")
+            writer.writerow(FIELDS)
+            writer.writerows(raw.tolist())
+            body = text.getvalue()
+        else:
+            body = b"".join(orjson.dumps(p, option=orjson.OPT_APPEND_NEWLINE) for p in patient_dicts(raw))
+        r = client.post("/predict/stream", files={"file": (f"patients.{fmt}", body)},
+                        params={"chunk_size": main.MAX_BATCH_SIZE})
+        if fmt == "csv":
+            return np.array([float(row["rf_probability"]) for row in csv.DictReader(io.StringIO(r.text))])
+        return np.array([orjson.loads(line)["rf_probability"] for line in r.text.splitlines()])
+    return score
+
+
+def via_columnar(fmt):
+    def score(client, raw):
+        r = client.post("/predict/columnar", content=encode_request(raw, fmt),
+                        headers={"content-type": columnar.MEDIA_TYPES[fmt]})
+        assert r.status_code == 200, r.text
+        if fmt == "npy":
+            return np.load(io.BytesIO(r.content))["rf_probability"]
+        if fmt == "arrow":
+            return columnar.pa.ipc.open_stream(r.content).read_all().column("rf_probability").to_numpy()
+        return np.array(columnar.msgpack.unpackb(r.content)["rf_probability"])
+    return score
+
+
+def encode_request(raw: np.ndarray, fmt: str) -> bytes:
+    if fmt == "npy":
+        buffer = io.BytesIO()
+        np.save(buffer, raw)
+        return buffer.getvalue()
+    if fmt == "arrow":
+        pa = columnar.pa
+        table = pa.table({f: raw[:, i] for i, f in enumerate(FIELDS)})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    return columnar.msgpack.packb({f: raw[:, i].tobytes() for i, f in enumerate(FIELDS)})
+
+
+# --------------------------------------------------
+# CHECKS
+# --------------------------------------------------
+
+def pydantic_errors(raw: np.ndarray) -> dict:
+    errors = {}
+    for row, values in enumerate(raw.tolist()):
+        try:
+            main.PatientData(**dict(zip(FIELDS, values)))
+        except ValidationError as e:
+            errors[row] = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+    return errors
+
+
+def check_validation(n: int = 20_000):
+    # Push random cells past their bounds (and half-integers into integer fields)
+    raw = synthetic_matrix(n, seed=7)
+    rng = np.random.default_rng(7)
+    cells = rng.integers(0, raw.size, n // 10)
+    raw.flat[cells] = rng.choice([-5.0, 0.0, 0.5, 1.5, 3.5, 30.0, 50.0, 120.0, 1e4], len(cells))
+
+    valid, errors = main.patient_fields.validate(raw.copy())
+    expected = pydantic_errors(raw)
+    assert errors == expected, "vectorized checks disagree with pydantic"
+    assert valid.sum() == n - len(expected)
+    print(f"[OK] Vectorized Field checks match pydantic on {n} rows ({len(expected)} invalid)")
+
+
+def check_formats(client, clients: dict, raw: np.ndarray):
+    reference = via_columnar("npy")(client, raw)
+    for name, score in clients.items():
+        probs = score(client, raw)
+        # JSON, CSV and NDJSON round to 4 decimals
+        assert np.abs(probs - reference).max() <= 5e-5, f"{name} probabilities differ"
+    print(f"[OK] All formats return the same probabilities on {len(raw)} rows")
+
+
+def run(n: int):
+    install_standin_models()
+    client = TestClient(main.app)
+    check_validation()
+
+    clients = {"json (batch)": via_json, "csv (stream)": via_stream("csv"), "ndjson (stream)": via_stream("ndjson")}
+    for fmt in ("npy", "arrow", "msgpack"):
+        if columnar.available(fmt):
+            clients[f"{fmt} (columnar)"] = via_columnar(fmt)
+        else:
+            print(f"[SKIP] {fmt}: {columnar.DEPENDENCIES[fmt]} is not installed")
+    check_formats(client, clients, synthetic_matrix(2000, seed=3))
+
+    raw = synthetic_matrix(n, seed=11)
+    results = {name: rows_per_second(lambda: score(client, raw), n) for name, score in clients.items()}
+    base = results["json (batch)"]
+    print(f"\n{n:,} rows, model=compare, end to end (client encode + request + client decode)")
+    print(f"{'format':<20}{'rows/s':>12}{'vs JSON':>10}")
+    for name, rate in results.items():
+        print(f"{name:<20}{rate:>12,.0f}{rate / base:>9.1f}x")
+
+    body = main.predict_batch(main.BatchPredictionRequest(
+        model="compare", patients=patient_dicts(raw[:main.MAX_BATCH_SIZE])
+    )).body
+    payload = orjson.loads(body)
+    stdlib = rows_per_second(lambda: json.dumps(payload).encode(), main.MAX_BATCH_SIZE)
+    fast = rows_per_second(lambda: orjson.dumps(payload), main.MAX_BATCH_SIZE)
+    print(f"\n/predict/batch response encoding: json {stdlib:,.0f} rows/s, orjson {fast:,.0f} rows/s "
+          f"({fast / stdlib:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    run(parser.parse_args().rows)
@@ -0,0 +1,132 @@
+"""
+Artifact size, load time and scoring throughput of the pickled vs compact forest.
+
+Pickles two forests on the stand-in features: the fully grown stand-in
+(pure 0/1 leaves, like a default RandomForestClassifier) and one with
+min_samples_leaf=20, whose leaves hold fractional rates. Each is compacted
+with forest_compact at 8/16/32-bit node values, with and without pruning.
+For each variant it reports nodes, file size, load time and rows/second for
+batches of 1, 100 and 10k rows, and runs the accuracy guardrail on held-out
+synthetic patients. Checks that the float32 variant matches the pickle to
+float precision, that the default 16-bit variant stays within
+forest_compact's default tolerance, that an over-tight tolerance is
+refused, and that the API loads and explains the compact artifact with
+FOREST_ARTIFACT=compact.
+
+    python benchmarks/bench_compact.py [--trees 100]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+os.environ["FOREST_ARTIFACT"] = "compact"  # read when main is imported
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from common import build_standin_bundle, rows_per_second, synthetic_matrix, write_standin_artifacts
+
+import explain
+import forest_compact
+import main
+from forest_engine import FlatForest
+
+SIZES = (1, 100, 10_000)
+DEFAULT_TOLERANCE = 1e-3
+VARIANTS = {
+    "float32": (32, 0.0),
+    "uint16": (16, 0.0),
+    "uint8": (8, 0.0),
+    "uint16 pruned 0.05": (16, 0.05),
+}
+
+
+def timed_load(loader, path, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model = loader(path)
+        best = min(best, time.perf_counter() - start)
+    return model, best
+
+
+def report_row(name, path, loader, n_nodes, X):
+    model, load_seconds = timed_load(loader, path)
+    rates = [rows_per_second(lambda: model.predict_proba(X[:n]), n) for n in SIZES]
+    print(f"{name:<28}{n_nodes:>10,}{os.path.getsize(path) / 2 ** 20:>10.2f}{load_seconds * 1000:>10.1f}"
+          + "".join(f"{rate:>14,.0f}" for rate in rates))
+    return model
+
+
+def check_api(model_dir):
+    bundle = main.load_bundle(model_dir, base_url=model_dir, manifest_path=None)
+    assert bundle.rf_model is None and isinstance(bundle.rf_engine, FlatForest), "compact forest not served"
+    assert bundle.rf_engine.leaf_value.dtype == np.uint16
+
+    raw = synthetic_matrix(500, seed=21)
+    features = main.preprocess_batch(raw, bundle)
+    explainer = explain.ForestExplainer(bundle.rf_engine)
+    total = explainer.base_value + explainer.contributions(features).sum(axis=1)
+    assert np.abs(total - main.score_random_forest(features, bundle)).max() < 1e-9, "contributions do not add up"
+    print("[OK] FOREST_ARTIFACT=compact loads the .npz; explanations still add up")
+
+
+def compare(name, rf_model, X, model_dir):
+    """Size/load/throughput table and guardrail reports for one pickled forest"""
+    pickle_path = os.path.join(model_dir, f"{name}.pkl")
+    joblib.dump(rf_model, pickle_path)
+    flat = FlatForest.from_sklearn(rf_model)
+
+    print(f"\n{name}")
+    print(f"{'artifact':<28}{'nodes':>10}{'MB':>10}{'load ms':>10}"
+          + "".join(f"{f'rows/s @{n}':>14}" for n in SIZES))
+    report_row("pickle (sklearn)", pickle_path, joblib.load, flat.n_nodes, X)
+
+    reports = {}
+    for variant, (bits, prune) in VARIANTS.items():
+        compacted = forest_compact.compact(flat, bits, prune)
+        reports[variant] = forest_compact.check_accuracy(rf_model, compacted, X, tolerance=1.0)
+        path = os.path.join(model_dir, f"{name}-{variant.replace(' ', '_')}.npz")
+        forest_compact.save(path, compacted)
+        report_row(f"compact {variant}", path, forest_compact.load, compacted.n_nodes, X)
+
+    print(f"{'variant':<28}{'max |dp|':>10}{'mean |dp|':>10}{'flips':>10}")
+    for variant, report in reports.items():
+        print(f"{variant:<28}{report['max_abs_error']:>10.1e}{report['mean_abs_error']:>10.1e}"
+              f"{report['label_flips']:>10}")
+
+    assert reports["float32"]["max_abs_error"] < 1e-6, "float32 variant differs from the pickle"
+    assert reports["uint16"]["max_abs_error"] <= DEFAULT_TOLERANCE, "16-bit variant exceeds the default tolerance"
+    return flat
+
+
+def run(n_trees: int):
+    bundle, raw, y = build_standin_bundle(n_estimators=n_trees)
+    features = main.preprocess_batch(raw, bundle)
+    regularized = RandomForestClassifier(n_estimators=n_trees, min_samples_leaf=20, random_state=42)
+    # Held-out reference patients (the stand-ins train on seed 42)
+    X = main.preprocess_batch(synthetic_matrix(20_000, seed=8), bundle)
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        compare("fully grown", bundle.rf_model, X, model_dir)
+        flat = compare("min_samples_leaf=20", regularized.fit(features, y), X, model_dir)
+
+        try:
+            forest_compact.check_accuracy(regularized, forest_compact.compact(flat, 8), X, tolerance=1e-6)
+            raise AssertionError("guardrail accepted the 8-bit forest at tolerance 1e-6")
+        except forest_compact.GuardrailError as e:
+            print(f"\n[OK] Guardrail refuses an over-tight tolerance: {e}")
+
+        write_standin_artifacts(model_dir, n_estimators=n_trees)
+        flat = FlatForest.from_sklearn(joblib.load(os.path.join(model_dir, "random_forest_model.pkl")))
+        forest_compact.save(os.path.join(model_dir, forest_compact.COMPACT_FILE), forest_compact.compact(flat))
+        check_api(model_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--trees", type=int, default=100)
+    run(parser.parse_args().trees)
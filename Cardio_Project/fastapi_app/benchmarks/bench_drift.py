@@ -0,0 +1,142 @@
+"""
+Drift monitor: score correctness and overhead on the prediction path.
+
+Feeds synthetic patients drawn like the stand-in training set, checks the
+streamed mean/std against NumPy and that no feature drifts; then freezes
+them as baseline and feeds a shifted population (systolic pressure +15 mmHg,
+more high cholesterol), which must be flagged on exactly those features.
+
+Overhead: cost of one observe() call, p50/p99 latency of the cheapest
+handler (/predict/logistic, cache off) and of /predict/batch with the
+monitor on vs off, and the rows/second the background fold sustains.
+
+    python benchmarks/bench_drift.py
+"""
+
+import time
+
+import numpy as np
+
+from common import install_standin_models, latency_percentiles, rows_per_second, synthetic_matrix, synthetic_patients
+
+import main
+from cache import PredictionCache
+
+
+def monitor() -> "main.drift.DriftMonitor":
+    m = main.drift.DriftMonitor(main.DRIFT_NUMERIC, main.DRIFT_CATEGORIES, main.drift_features,
+                                main.patients_to_array, max_pending=1_000_000)
+    m.set_reference(*main.drift_reference(main.active_models()), version="standin", normal=main.DRIFT_NORMAL)
+    return m
+
+
+def feed(m, raw, batch=500):
+    for start in range(0, len(raw), batch):
+        m.observe(raw[start:start + batch])
+
+
+def check_scores():
+    m = monitor()
+    # Mixed inputs: matrices from the bulk paths and single patients
+    patients = [main.PatientData(**row) for row in synthetic_patients(200, seed=4)]
+    raw = np.vstack([synthetic_matrix(50_000, seed=5), main.patients_to_array(patients)])
+    feed(m, raw[:-len(patients)])
+    for patient in patients:
+        m.observe(patient)
+
+    report = m.report()
+    numeric = np.hstack(main.unscaled_features(raw))
+    assert report["rows"] == len(raw)
+    for j, name in enumerate(main.DRIFT_NUMERIC):
+        f = report["features"][name]
+        assert abs(f["mean"] - numeric[:, j].mean()) < 1e-3 and abs(f["std"] - numeric[:, j].std()) < 1e-3, name
+    print_features("training-like inputs vs training statistics", report)
+    for name in ("age", "ap_hi", "ap_lo", "bmi"):
+        assert report["features"][name]["drift"] != "significant", f"{name} flagged without a shift"
+        assert abs(report["features"][name]["z_shift"]) < 0.1
+
+    m.reset(baseline=True)
+    feed(m, synthetic_matrix(20_000, seed=6))
+    stable = m.report()
+    assert all(f["drift"] == "none" for f in [*stable["features"].values(), *stable["categories"].values()]), \
+        "drift against a baseline from the same population"
+
+    m.reset()
+    shifted = synthetic_matrix(20_000, seed=7)
+    shifted[:, 4] += 15
+    shifted[:, 6] = np.random.default_rng(7).choice([1, 2, 3], len(shifted), p=[0.5, 0.25, 0.25])
+    feed(m, shifted)
+    report = m.report()
+    print_features("shifted inputs vs baseline", report)
+    flagged = {name for name, f in [*report["features"].items(), *report["categories"].items()]
+               if f["drift"] == "significant"}
+    assert flagged == {"ap_hi", "cholesterol"}, flagged
+    print("[OK] Streamed mean/std match NumPy; only ap_hi and cholesterol flagged after the shift")
+
+
+def print_features(title, report):
+    print(f"\n{title} ({report['rows']:,} rows, reference: {report['reference']})")
+    print(f"{'feature':<14}{'mean':>10}{'train':>10}{'z_shift':>10}{'psi':>10}  drift")
+    for name, f in report["features"].items():
+        psi = "-" if f["psi"] is None else f"{f['psi']:.4f}"
+        print(f"{name:<14}{f['mean']:>10.2f}{f['train_mean']:>10.2f}{f['z_shift']:>10.3f}{psi:>10}  {f['drift'] or '-'}")
+    for name, f in report["categories"].items():
+        psi = "-" if f["psi"] is None else f"{f['psi']:.4f}"
+        print(f"{name:<14}{'':>30}{psi:>10}  {f['drift'] or '-'}")
+
+
+def timed_pair(fn, calls):
+    """Latency of ``fn`` with the monitor on and off, interleaved in rounds to share machine noise"""
+    active = main.drift_monitor
+    on, off = [], []
+    for _ in range(5):
+        main.drift_monitor = active
+        on.append(latency_percentiles(fn, calls))
+        main.drift_monitor = None
+        off.append(latency_percentiles(fn, calls))
+    main.drift_monitor = active
+    best = lambda runs: {k: min(r[k] for r in runs) for k in ("p50_ms", "p99_ms")}
+    return best(on), best(off)
+
+
+def check_overhead():
+    main.prediction_cache = PredictionCache(max_entries=0)
+    main.drift_monitor = monitor()
+    patient = main.PatientData(**synthetic_patients(1)[0])
+
+    calls = 200_000
+    start = time.perf_counter()
+    for _ in range(calls):
+        main.drift_monitor.observe(patient)
+    main.drift_monitor.fold()
+    per_call = (time.perf_counter() - start) / calls
+    print(f"\nobserve(): {per_call * 1e9:.0f} ns per call, including the background folds")
+
+    batch = main.BatchPredictionRequest(patients=synthetic_patients(1000, seed=2), model="logistic")
+    print(f"{'handler':<28}{'p50 off':>10}{'p50 on':>10}{'p99 off':>10}{'p99 on':>10}  (ms)")
+    for name, fn, calls in (
+        ("/predict/logistic", lambda: main.predict_logistic(patient), 2000),
+        ("/predict/batch (1k rows)", lambda: main.predict_batch(batch), 100),
+    ):
+        on, off = timed_pair(fn, calls)
+        print(f"{name:<28}{off['p50_ms']:>10.4f}{on['p50_ms']:>10.4f}{off['p99_ms']:>10.4f}{on['p99_ms']:>10.4f}")
+        assert on["p50_ms"] - off["p50_ms"] < max(0.01, 0.1 * off["p50_ms"]), f"monitor slows {name}"
+
+    m = monitor()
+    raw = synthetic_matrix(100_000, seed=9)
+
+    def fold():
+        feed(m, raw)
+        m.fold()
+
+    print(f"background fold: {rows_per_second(fold, len(raw)):,.0f} rows/s (matrices of 500 rows)")
+
+
+def run():
+    install_standin_models()
+    check_scores()
+    check_overhead()
+
+
+if __name__ == "__main__":
+    run()
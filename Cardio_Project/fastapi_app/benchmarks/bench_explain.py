@@ -0,0 +1,84 @@
+"""
+Explanations/second of the tree-path and closed-form logistic explainers.
+
+Checks on held-out patients that the forest contributions add up, with the
+base value, to the forest's probability, and that the logistic ones add up
+to its log-odds. Then reports explanations/second for batches of 1, 100
+and 10k patients: per model in-process, and through /explain/batch with
+the cache cold and warm. For scale it adds a naive perturbation explainer
+that re-scores the forest once per feature, with the feature set to its
+mean.
+
+    python benchmarks/bench_explain.py
+"""
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from common import install_standin_models, rows_per_second, synthetic_matrix, synthetic_patients
+
+import explain
+import main
+from cache import PredictionCache
+
+SIZES = (1, 100, 10_000)
+PERTURBATION_SAMPLE = 100
+
+
+def check_additivity(models):
+    raw = synthetic_matrix(2000, seed=9)
+    features = main.preprocess_batch(raw, models)
+
+    explainer = main.forest_explainer(models)
+    rf = explainer.base_value + explainer.contributions(features).sum(axis=1)
+    assert np.abs(rf - main.score_random_forest(features, models)).max() < 1e-9, "forest contributions do not add up"
+
+    lr_explainer = explain.LogisticExplainer(models.scaler_num, models.scaler_int, models.lr_weights, models.lr_bias)
+    values = explain.original_units(features, models.scaler_num, models.scaler_int)
+    log_odds = lr_explainer.base_value + lr_explainer.contributions(values).sum(axis=1)
+    lr = main.score_logistic(raw, models)
+    assert np.abs(log_odds - np.log(lr / (1 - lr))).max() < 1e-9, "logistic contributions do not add up"
+    print(f"[OK] Contributions add up to the forest probability and logistic log-odds on {len(raw)} rows")
+
+
+def perturbation_explain(raw, models):
+    # Occlusion: one extra forest evaluation per feature, that feature replaced by its mean
+    features = main.preprocess_batch(raw, models)
+    base = main.score_random_forest(features, models)
+    contributions = np.empty_like(features)
+    for j in range(features.shape[1]):
+        occluded = features.copy()
+        occluded[:, j] = features[:, j].mean()
+        contributions[:, j] = base - main.score_random_forest(occluded, models)
+    return contributions
+
+
+def run():
+    install_standin_models()
+    models = main.active_models()
+    check_additivity(models)
+    client = TestClient(main.app)
+
+    print(f"\n{'N':>7}{'forest':>12}{'logistic':>12}{'compare':>12}{'endpoint cold':>15}{'endpoint warm':>15}")
+    for n in SIZES:
+        raw = synthetic_matrix(n, seed=n)
+        rates = [rows_per_second(lambda: main.explain_rows(raw, model, models), n)
+                 for model in ("randomforest", "logistic", "compare")]
+
+        body = {"model": "compare", "patients": synthetic_patients(n, seed=n)}
+        main.prediction_cache = PredictionCache(max_entries=0)
+        cold = rows_per_second(lambda: client.post("/explain/batch", json=body), n)
+        main.prediction_cache = PredictionCache(max_entries=20_000)
+        client.post("/explain/batch", json=body)
+        warm = rows_per_second(lambda: client.post("/explain/batch", json=body), n)
+        print(f"{n:>7}" + "".join(f"{rate:>12,.0f}" for rate in rates) + f"{cold:>15,.0f}{warm:>15,.0f}")
+
+    raw = synthetic_matrix(PERTURBATION_SAMPLE, seed=1)
+    naive = rows_per_second(lambda: perturbation_explain(raw, models), PERTURBATION_SAMPLE)
+    tree_path = rows_per_second(lambda: main.explain_rows(raw, "randomforest", models), PERTURBATION_SAMPLE)
+    print(f"\nForest, {PERTURBATION_SAMPLE} rows: perturbation {naive:,.0f} explanations/s, "
+          f"tree-path {tree_path:,.0f} explanations/s ({tree_path / naive:.1f}x)")
+
+
+if __name__ == "__main__":
+    run()
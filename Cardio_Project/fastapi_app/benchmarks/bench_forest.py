@@ -0,0 +1,46 @@
+"""
+Flat forest engine vs. sklearn ``predict_proba``: equivalence and latency.
+
+Equivalence is checked on a held-out synthetic sample before timing; the
+script exits non-zero if any probability differs beyond float rounding.
+
+    python benchmarks/bench_forest.py
+"""
+
+import numpy as np
+
+from common import install_standin_models, latency_percentiles, synthetic_matrix
+
+import main
+from forest_engine import FlatForest
+
+BATCH_SIZES = (1, 100, 1000)
+CALLS = {1: 1000, 100: 200, 1000: 50}
+
+
+def check_equivalence(engine, features):
+    expected = main.active_models().rf_model.predict_proba(features)
+    actual = engine.predict_proba(features)
+    worst = np.abs(expected - actual).max()
+    assert np.allclose(expected, actual, rtol=0, atol=1e-12), f"max abs diff {worst}"
+    print(f"[OK] Flat forest matches predict_proba on {len(features)} held-out rows (max abs diff {worst:.1e})")
+
+
+def run():
+    install_standin_models()
+    rf_model = main.active_models().rf_model
+    engine = FlatForest.from_sklearn(rf_model)
+    holdout = main.preprocess_batch(synthetic_matrix(5000, seed=7))
+    check_equivalence(engine, holdout)
+
+    print(f"{'batch':>6}{'backend':>10}{'p50 ms':>10}{'p99 ms':>10}{'rows/s':>12}")
+    for size in BATCH_SIZES:
+        rows = holdout[:size]
+        for name, backend in (("sklearn", rf_model), ("flat", engine)):
+            stats = latency_percentiles(lambda: backend.predict_proba(rows), CALLS[size])
+            print(f"{size:>6}{name:>10}{stats['p50_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+                  f"{size / stats['p50_ms'] * 1000:>12,.0f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,147 @@
+"""
+Prediction traffic across a hot model reload and rollback.
+
+Client threads keep calling /predict/compare while version B is loaded in
+the background, swapped in, and rolled back to version A. Asserts that
+every request succeeds, that each response was scored by a single version,
+and that requests started after a swap see the new version; reports p50/p99
+latency before, during and after the reload.
+
+    python benchmarks/bench_hot_swap.py [--threads 4]
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+ADMIN_TOKEN = "bench-admin"
+
+# The reload may slow requests down (it shares the CPU) but must not stall them
+MAX_P99_RATIO = 3.0
+
+
+def client_loop(client, patients, stop, log):
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        r = client.post("/predict/compare", json=patients[i % len(patients)])
+        end = time.perf_counter()
+        body = r.json()
+        versions = {body.get("model_version"),
+                    body.get("random_forest", {}).get("model_version"),
+                    body.get("logistic_regression", {}).get("model_version")}
+        log.append((start, end, r.status_code, versions))
+        i += 1
+
+
+def percentiles(log, lo, hi) -> tuple:
+    """(p50 ms, p99 ms, count) of requests started in [lo, hi)"""
+    samples = [(end - start) * 1000 for start, end, _, _ in log if lo <= start < hi]
+    if not samples:
+        return float("nan"), float("nan"), 0
+    p50, p99 = np.percentile(samples, [50, 99])
+    return p50, p99, len(samples)
+
+
+def run(threads: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            "MODEL_DIR": os.path.join(tmp, "models"),
+            "MODEL_OFFLINE": "1",
+            "MODEL_MANIFEST": os.path.join(tmp, "none"),
+            "ADMIN_TOKEN": ADMIN_TOKEN,
+        })
+        from fastapi.testclient import TestClient
+
+        from common import synthetic_patients, write_standin_artifacts
+
+        import main
+        from cache import PredictionCache
+
+        dir_a, dir_b = os.path.join(tmp, "a"), os.path.join(tmp, "b")
+        write_standin_artifacts(dir_a, n_train=30_000, seed=1)
+        write_standin_artifacts(dir_b, n_train=30_000, seed=2)
+
+        # Every request runs the models instead of hitting the cache
+        main.prediction_cache = PredictionCache(max_entries=0)
+        main.model_registry.activate(main.load_bundle(dir_a, dir_a, None), reason="startup")
+        version_a = main.model_registry.active.version
+
+        client = TestClient(main.app)
+        admin = {"X-Admin-Token": ADMIN_TOKEN}
+        assert client.post("/admin/models/rollback").status_code == 401
+        assert client.post("/admin/models/rollback", headers=admin).status_code == 409
+
+        patients = synthetic_patients(500, seed=5)
+        stop = threading.Event()
+        logs = [[] for _ in range(threads)]
+        workers = [threading.Thread(target=client_loop, args=(client, patients, stop, log)) for log in logs]
+        for w in workers:
+            w.start()
+
+        time.sleep(2)
+        reload_start = time.perf_counter()
+        r = client.post("/admin/models/reload", json={"source": dir_b}, headers=admin)
+        reload_returned = time.perf_counter() - reload_start
+        assert r.status_code == 202, r.text
+        assert client.post("/admin/models/reload", json={"source": dir_b}, headers=admin).status_code == 409
+
+        main.model_registry.wait()
+        swapped_at = time.perf_counter()
+        version_b = main.model_registry.active.version
+        assert version_b != version_a, "reload did not swap in the new models"
+
+        time.sleep(2)
+        rollback_at = time.perf_counter()
+        r = client.post("/admin/models/rollback", headers=admin)
+        assert r.status_code == 200 and r.json()["active"]["version"] == version_a, r.text
+        rollback_done = time.perf_counter()
+
+        time.sleep(1)
+        stop.set()
+        for w in workers:
+            w.join()
+        end = time.perf_counter()
+
+    log = [entry for thread_log in logs for entry in thread_log]
+    errors = [entry for entry in log if entry[2] != 200]
+    assert not errors, f"{len(errors)} failed requests, e.g. status {errors[0][2]}"
+    mixed = [entry for entry in log if len(entry[3]) != 1]
+    assert not mixed, f"{len(mixed)} responses mixed model versions: {mixed[0][3]}"
+
+    def version_of(entry):
+        return next(iter(entry[3]))
+
+    assert all(version_of(e) == version_a for e in log if e[1] < reload_start)
+    assert all(version_of(e) == version_b for e in log if swapped_at < e[0] and e[1] < rollback_at)
+    assert all(version_of(e) == version_a for e in log if e[0] > rollback_done)
+    finished_on_old = sum(1 for e in log if e[0] < swapped_at < e[1] and version_of(e) == version_a)
+
+    print(f"[OK] {len(log)} requests on {threads} threads, no errors, no mixed versions")
+    print(f"[OK] {version_a} -> {version_b} (reload call returned in {reload_returned * 1000:.0f} ms, "
+          f"background load {swapped_at - reload_start:.2f}s) -> rollback to {version_a}")
+    print(f"     {finished_on_old} requests in flight at the swap finished on {version_a}\n")
+
+    phases = (
+        ("before reload", 0, reload_start),
+        ("during load", reload_start, swapped_at),
+        ("after swap", swapped_at, rollback_at),
+        ("after rollback", rollback_done, end),
+    )
+    stats = {name: percentiles(log, lo, hi) for name, lo, hi in phases}
+    print(f"{'phase':<16}{'p50 ms':>10}{'p99 ms':>10}{'reqs':>8}")
+    for name, (p50, p99, count) in stats.items():
+        print(f"{name:<16}{p50:>10.2f}{p99:>10.2f}{count:>8}")
+
+    baseline, during = stats["before reload"][1], stats["during load"][1]
+    assert during <= MAX_P99_RATIO * baseline, f"p99 during load {during:.1f} ms vs {baseline:.1f} ms before"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=4)
+    run(parser.parse_args().threads)
@@ -0,0 +1,123 @@
+"""
+Forest scoring throughput vs. inference worker processes.
+
+Starts the API under uvicorn on stand-in artifacts, first with the default
+threadpool backend (sklearn, then FOREST_BACKEND=flat: the engine the
+workers use) and then with INFERENCE_BACKEND=process and a growing number
+of INFERENCE_PROCESSES (prediction cache disabled). For each it
+drives concurrent single-patient /predict/randomforest clients and
+1000-row /predict/batch clients and reports requests/s, rows/s and p99.
+Checks that the pool's probabilities match the threadpool backend's, and
+that a pool refuses to start when its workers map a store other than the
+one the API loaded.
+
+Throughput can only scale up to the number of cores the host has.
+
+    python benchmarks/bench_inference_pool.py [--processes 1 2 4] [--seconds 5]
+"""
+
+import argparse
+import os
+import tempfile
+
+import requests
+
+from common import http_load, start_api, stop_api, synthetic_patients, write_standin_artifacts
+
+PORT = 8766
+URL = f"http://127.0.0.1:{PORT}"
+CLIENTS = 32
+BATCH_ROWS = 1000
+BATCH_CLIENTS = 4
+
+
+def pool_ready(health: dict) -> bool:
+    inference = health.get("inference", {})
+    return health["models_loaded"] and (inference.get("backend") != "process" or inference.get("pool") is not None)
+
+
+def probabilities(patients) -> list:
+    r = requests.post(f"{URL}/predict/batch", json={"model": "randomforest", "patients": patients})
+    assert r.status_code == 200, r.text
+    return [result["probability"] for result in r.json()["results"]]
+
+
+def check_store_identity(tmp: str, artifact_dir: str):
+    import model_store
+    from inference_pool import InferencePool
+
+    store_dir = os.path.join(tmp, "store")
+    meta = model_store.convert(artifact_dir, store_dir)
+    InferencePool(store_dir, "v1", meta["version"], processes=1).start().shutdown()
+
+    # The store was rebuilt from other artifacts after the API loaded it
+    stale = InferencePool(store_dir, "v1", "0" * 12, processes=1)
+    try:
+        stale.start()
+    except RuntimeError as e:
+        print(f"[OK] Pool refuses a store other than the one loaded: {e}")
+    else:
+        raise AssertionError("pool started on a store other than the one the API loaded")
+    finally:
+        stale.shutdown()
+
+
+def run(process_counts, seconds: float, n_estimators: int):
+    patients = synthetic_patients(4000, seed=31)
+    batches = [{"model": "randomforest", "patients": patients[i:i + BATCH_ROWS]}
+               for i in range(0, len(patients), BATCH_ROWS)]
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact_dir = os.path.join(tmp, "artifacts")
+        write_standin_artifacts(artifact_dir, n_train=30_000, n_estimators=n_estimators)
+        check_store_identity(tmp, artifact_dir)
+        reference = None
+
+        configs = [("threads", {"FOREST_BACKEND": "sklearn"}), ("threads/flat", {"FOREST_BACKEND": "flat"})]
+        configs += [(f"{n} proc", {"INFERENCE_BACKEND": "process", "INFERENCE_PROCESSES": str(n)})
+                    for n in process_counts]
+
+        for label, overrides in configs:
+            env = {
+                "MODEL_DIR": os.path.join(tmp, "models"),
+                "MODEL_BASE_URL": artifact_dir,
+                "MODEL_OFFLINE": "1",
+                "MODEL_MANIFEST": os.path.join(tmp, "none"),
+                "PREDICTION_CACHE_SIZE": "0",
+                **overrides,
+            }
+            server = start_api(env, PORT, ready=pool_ready)
+            try:
+                probs = probabilities(patients[:2000])
+                if reference is None:
+                    reference = probs
+                else:
+                    worst = max(abs(a - b) for a, b in zip(probs, reference))
+                    # Responses are rounded to 4 decimals; the flat engine matches sklearn to ~1e-12
+                    assert worst <= 1e-4, f"{label}: probabilities differ by up to {worst}"
+
+                http_load(f"{URL}/predict/randomforest", patients, CLIENTS, 0.5)  # warm-up
+                single = http_load(f"{URL}/predict/randomforest", patients, CLIENTS, seconds)
+                batch = http_load(f"{URL}/predict/batch", batches, BATCH_CLIENTS, seconds)
+            finally:
+                stop_api(server)
+            results.append((label, single, batch))
+            print(f"[OK] {label}: probabilities match the threadpool backend")
+
+    print(f"\n{n_estimators}-tree forest, {os.cpu_count()} CPU(s), {seconds:.0f}s per run, prediction cache off")
+    print(f"{'backend':<14}{'single req/s':>14}{'single p99 ms':>15}{'batch rows/s':>15}{'batch p99 ms':>14}")
+    for label, single, batch in results:
+        print(f"{label:<14}{single['rps']:>14.1f}{single['p99_ms']:>15.1f}"
+              f"{batch['rps'] * BATCH_ROWS:>15,.0f}{batch['p99_ms']:>14.1f}")
+
+
+if __name__ == "__main__":
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--processes", type=int, nargs="+",
+                        default=sorted({1, 2, *(n for n in (4, 8, 16) if n <= cpus), cpus}))
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--trees", type=int, default=100)
+    args = parser.parse_args()
+    run(args.processes, args.seconds, args.trees)
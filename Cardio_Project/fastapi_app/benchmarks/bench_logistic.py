@@ -0,0 +1,107 @@
+"""
+Fused logistic engine vs. the preprocess() + sigmoid() pipeline.
+
+Checks that both the scalar and the batched paths of FusedLogistic match
+the reference pipeline, that scalers fit without centring or scaling are
+folded in the way StandardScaler.transform applies them, and that a batch
+allocates only its output, then reports single-row latency and batch rows/s.
+
+    python benchmarks/bench_logistic.py
+"""
+
+import tracemalloc
+
+import numpy as np
+
+from sklearn.preprocessing import StandardScaler
+
+from common import install_standin_models, latency_percentiles, synthetic_matrix, synthetic_patients
+
+import explain
+import main
+import model_store
+
+BATCH_SIZES = (100, 10_000)
+
+
+def reference_single(patient):
+    models = main.active_models()
+    features = main.preprocess(patient, models)
+    return main.sigmoid(np.dot(features, models.lr_weights) + models.lr_bias)[0]
+
+
+def reference_batch(raw):
+    models = main.active_models()
+    return main.sigmoid(np.dot(main.preprocess_batch(raw, models), models.lr_weights) + models.lr_bias)
+
+
+def check_equivalence(patients, raw):
+    engine = main.active_models().lr_engine
+    expected = reference_batch(raw)
+    batched = engine.predict_raw(raw)
+    scalar = np.array([engine.score_one(p) for p in patients])
+    single = np.array([reference_single(p) for p in patients])
+
+    assert np.allclose(expected, single, rtol=0, atol=1e-12)
+    assert np.allclose(expected, batched, rtol=0, atol=1e-12), np.abs(expected - batched).max()
+    assert np.allclose(expected, scalar, rtol=0, atol=1e-12), np.abs(expected - scalar).max()
+    print(f"[OK] Fused scalar and batched paths match preprocess + sigmoid on {len(patients)} rows "
+          f"(max abs diff {max(np.abs(expected - batched).max(), np.abs(expected - scalar).max()):.1e})")
+
+
+def check_scaler_options(raw):
+    """with_mean/with_std=False scalers: engine, memory-mapped store and explanations follow transform()"""
+    models = main.active_models()
+    num = main.preprocess_batch(raw, models)[:, :4] * models.scaler_num.scale_ + models.scaler_num.mean_
+    for with_mean, with_std in ((False, True), (True, False), (False, False)):
+        scaler = StandardScaler(with_mean=with_mean, with_std=with_std).fit(num)
+        mean, scale = main.scaler_params(scaler)
+        assert np.allclose((num - mean) / scale, scaler.transform(num), rtol=0, atol=1e-12)
+        stored = model_store.StoredScaler(*model_store._scaler_arrays(scaler))
+        assert np.allclose(stored.transform(num), scaler.transform(num), rtol=0, atol=1e-12)
+        units = explain.original_units(np.hstack([scaler.transform(num), np.zeros((len(num), 9))]),
+                                       scaler, models.scaler_int)
+        assert np.allclose(units[:, :4], num, rtol=0, atol=1e-9)
+    print("[OK] Scalers fit with with_mean/with_std=False are applied as StandardScaler.transform applies them")
+
+
+def check_allocations():
+    engine = main.active_models().lr_engine
+    raw = synthetic_matrix(100_000, seed=4)  # spans many scoring blocks
+    assert np.allclose(engine.predict_raw(raw), reference_batch(raw), rtol=0, atol=1e-12)
+
+    tracemalloc.start()
+    out = engine.predict_raw(raw)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak <= out.nbytes + 4096, f"{peak:,} bytes allocated for a {out.nbytes:,}-byte output"
+    print(f"[OK] 100k-row batch allocates {peak:,} bytes at peak for its {out.nbytes:,}-byte output")
+
+
+def run():
+    install_standin_models(n_estimators=10)
+    patients = [main.PatientData(**p) for p in synthetic_patients(2000, seed=3)]
+    check_equivalence(patients, main.patients_to_array(patients))
+    check_scaler_options(main.patients_to_array(patients))
+    check_allocations()
+
+    patient = patients[0]
+    engine = main.active_models().lr_engine
+    print(f"{'path':<26}{'p50 us':>10}{'p99 us':>10}")
+    for name, fn in (
+        ("preprocess + sigmoid", lambda: reference_single(patient)),
+        ("fused score_one", lambda: engine.score_one(patient)),
+    ):
+        stats = latency_percentiles(fn, 5000)
+        print(f"{name:<26}{stats['p50_ms'] * 1000:>10.1f}{stats['p99_ms'] * 1000:>10.1f}")
+
+    print(f"\n{'batch':>8}{'reference rows/s':>20}{'fused rows/s':>16}")
+    for size in BATCH_SIZES:
+        raw = main.patients_to_array((patients * (size // len(patients) + 1))[:size])
+        ref = latency_percentiles(lambda: reference_batch(raw), 50)["p50_ms"]
+        fused = latency_percentiles(lambda: engine.predict_raw(raw), 50)["p50_ms"]
+        print(f"{size:>8}{size / ref * 1000:>20,.0f}{size / fused * 1000:>16,.0f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,100 @@
+"""
+Cost of the request/stage instrumentation and the sampling profiler.
+
+Measures single-prediction latency and /predict/batch throughput with
+metrics enabled, disabled (``metrics_registry.enabled = False``) and with
+the sampling profiler running, then checks that /metrics is well-formed
+Prometheus text: every sample line parses, histogram buckets are cumulative
+and ``_count`` equals the ``+Inf`` bucket.
+
+    python benchmarks/bench_metrics.py [--calls 1000]
+"""
+
+import argparse
+import os
+import re
+from collections import defaultdict
+
+os.environ["ADMIN_TOKEN"] = "bench-admin"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from common import install_standin_models, latency_percentiles, rows_per_second, synthetic_patients  # noqa: E402
+
+import main  # noqa: E402
+
+SAMPLE_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})? (-?[0-9.e+-]+|\+Inf|NaN)$')
+ADMIN = {"X-Admin-Token": "bench-admin"}
+
+
+def check_exposition(text: str):
+    buckets = defaultdict(list)
+    counts = {}
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        match = SAMPLE_LINE.match(line)
+        assert match, f"unparseable sample line: {line!r}"
+        name, labels, value = match.groups()
+        if name.endswith("_bucket"):
+            series = re.sub(r',?le="[^"]*"', "", labels)
+            buckets[name[:-len("_bucket")], series].append(float(value))
+        elif name.endswith("_count"):
+            counts[name[:-len("_count")], labels or "{}"] = float(value)
+
+    for (name, series), values in buckets.items():
+        assert values == sorted(values), f"{name}{series} buckets are not cumulative"
+        assert counts[name, series] == values[-1], f"{name}{series} _count != +Inf bucket"
+    print(f"[OK] /metrics: {len(text.splitlines())} lines parse, {len(buckets)} histogram series consistent")
+
+
+def measure(client, patients, calls: int) -> dict:
+    i = iter(range(10 ** 9))
+    single = latency_percentiles(
+        lambda: client.post("/predict/randomforest", json=patients[next(i) % len(patients)]), calls
+    )
+    body = {"model": "compare", "patients": patients[:1000]}
+    batch = rows_per_second(lambda: client.post("/predict/batch", json=body), 1000, repeat=5)
+    return {**single, "batch_rows_per_s": batch}
+
+
+def run(calls: int):
+    install_standin_models(n_estimators=20)
+    main.prediction_cache = main.PredictionCache(max_entries=0)
+    client = TestClient(main.app)
+    patients = synthetic_patients(2000, seed=13)
+
+    results = {}
+    for mode in ("disabled", "enabled", "profiling", "disabled", "enabled"):
+        main.metrics_registry.enabled = mode != "disabled"
+        if mode == "profiling":
+            assert client.post("/admin/profiler/start", headers=ADMIN, json={"interval_ms": 5}).status_code == 200
+        stats = measure(client, patients, calls)
+        if mode == "profiling":
+            client.post("/admin/profiler/stop", headers=ADMIN)
+        # Two rounds of on/off; keep each mode's best to damp noise
+        best = results.setdefault(mode, stats)
+        results[mode] = {
+            "p50_ms": min(best["p50_ms"], stats["p50_ms"]),
+            "p99_ms": min(best["p99_ms"], stats["p99_ms"]),
+            "batch_rows_per_s": max(best["batch_rows_per_s"], stats["batch_rows_per_s"]),
+        }
+
+    main.metrics_registry.enabled = True
+    check_exposition(client.get("/metrics").text)
+    top = client.get("/admin/profiler", headers=ADMIN, params={"limit": 3}).json()
+    print(f"[OK] Profiler took {top['samples']} samples; hottest frames: "
+          + ", ".join(f["frame"] for f in top["top_frames"]))
+
+    base = results["disabled"]
+    print(f"\n{'mode':<12}{'p50 ms':>10}{'p99 ms':>10}{'batch rows/s':>15}{'p50 overhead':>15}")
+    for mode in ("disabled", "enabled", "profiling"):
+        r = results[mode]
+        overhead = (r["p50_ms"] / base["p50_ms"] - 1) * 100
+        print(f"{mode:<12}{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}{r['batch_rows_per_s']:>15,.0f}{overhead:>14.1f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000)
+    run(parser.parse_args().calls)
@@ -0,0 +1,92 @@
+"""
+Load test of /predict/randomforest with and without micro-batching.
+
+Starts the API under uvicorn twice on stand-in artifacts, once with
+MICROBATCH=0 and once with MICROBATCH=1 (prediction cache disabled, so
+every call reaches the forest), and drives it with concurrent single-patient
+clients. Checks that both servers return identical responses, then reports
+throughput and p50/p99 latency per concurrency level, plus the mean batch
+size the coalescer achieved.
+
+    python benchmarks/bench_microbatch.py [--seconds 5] [--concurrency 1 16 64]
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from common import http_load, start_api, stop_api, synthetic_patients, write_standin_artifacts
+
+PORT = 8765
+URL = f"http://127.0.0.1:{PORT}"
+
+
+def concurrent_responses(patients) -> list:
+    """Responses for ``patients`` sent 32 at a time, in input order"""
+    local = threading.local()
+
+    def call(patient):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        r = local.session.post(f"{URL}/predict/randomforest", json=patient)
+        assert r.status_code == 200, r.text
+        return r.json()
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        return list(pool.map(call, patients))
+
+
+def run(seconds: float, concurrency_levels, n_estimators: int):
+    patients = synthetic_patients(2000, seed=21)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact_dir = os.path.join(tmp, "artifacts")
+        write_standin_artifacts(artifact_dir, n_train=20_000, n_estimators=n_estimators)
+
+        reference = None
+        for microbatch in (False, True):
+            server = start_api({
+                "MODEL_DIR": os.path.join(tmp, "models-microbatch" if microbatch else "models"),
+                "MODEL_BASE_URL": artifact_dir,
+                "MODEL_OFFLINE": "1",
+                "MODEL_MANIFEST": os.path.join(tmp, "none"),
+                "PREDICTION_CACHE_SIZE": "0",
+                "MICROBATCH": "1" if microbatch else "0",
+            }, PORT)
+            try:
+                responses = concurrent_responses(patients[:500])
+                if reference is None:
+                    reference = responses
+                else:
+                    assert responses == reference, "micro-batched responses differ"
+                    print(f"[OK] Micro-batched responses match unbatched ones on {len(responses)} concurrent calls")
+                for concurrency in concurrency_levels:
+                    http_load(f"{URL}/predict/randomforest", patients, concurrency, 0.5)  # warm-up
+                    results[microbatch, concurrency] = http_load(f"{URL}/predict/randomforest", patients,
+                                                                 concurrency, seconds)
+                batching = requests.get(f"{URL}/health").json()["microbatch"]
+            finally:
+                stop_api(server)
+
+    print(f"\n{n_estimators}-tree forest, {seconds:.0f}s per level, prediction cache off")
+    print(f"{'clients':>8}{'mode':>12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for concurrency in concurrency_levels:
+        for microbatch in (False, True):
+            stats = results[microbatch, concurrency]
+            mode = "batched" if microbatch else "single"
+            print(f"{concurrency:>8}{mode:>12}{stats['rps']:>10.1f}{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+    print(f"\nCoalescer: {batching['batches']} batches, mean {batching['mean_batch']} rows, "
+          f"largest {batching['largest_batch']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--trees", type=int, default=100)
+    args = parser.parse_args()
+    run(args.seconds, args.concurrency, args.trees)
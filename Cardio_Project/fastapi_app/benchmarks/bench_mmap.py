@@ -0,0 +1,176 @@
+"""
+Per-worker memory with pickled vs. memory-mapped models.
+
+Starts N worker processes at once, each loading the models the way a
+gunicorn/uvicorn worker would (MODEL_FORMAT=pickle or mmap) and scoring a
+batch so the forest pages are touched. While all workers are alive each
+one reports RSS, PSS (shared pages divided between the processes mapping
+them) and USS (private memory). Linux only (/proc/self/smaps_rollup).
+
+Checks first that an existing store is rebuilt, not served, once the
+artifacts it was converted from change (with and without a manifest), and
+that a reader opening the store while it is replaced never finds it
+missing.
+
+    python benchmarks/bench_mmap.py [--workers 4]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def memory_mb() -> dict:
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def worker():
+    sys.path.insert(0, APP_DIR)
+    import main
+    from common import synthetic_matrix
+
+    main.load_models()
+    main.score_random_forest(main.preprocess_batch(synthetic_matrix(500, seed=1)))
+    print("ready", flush=True)
+    sys.stdin.readline()  # wait until every worker is loaded
+    print(json.dumps(memory_mb()), flush=True)
+
+
+def measure(env: dict, workers: int) -> list:
+    procs = [
+        subprocess.Popen([sys.executable, "-W", "ignore", __file__, "--worker"],
+                         env={**os.environ, **env}, stdin=subprocess.PIPE,
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        for _ in range(workers)
+    ]
+    for p in procs:
+        while p.stdout.readline().strip() != "ready":
+            pass
+    results = []
+    for p in procs:
+        p.stdin.write("go\n")
+        p.stdin.flush()
+        results.append(json.loads(p.stdout.readline()))
+    for p in procs:
+        p.wait()
+    return results
+
+
+def check_stale_store():
+    sys.path.insert(0, APP_DIR)
+    import numpy as np
+
+    import artifacts
+    import main
+    from common import write_standin_artifacts
+
+    main.MODEL_FORMAT = "mmap"
+    with tempfile.TemporaryDirectory() as tmp:
+        model_dir = os.path.join(tmp, "models")
+        write_standin_artifacts(model_dir, n_train=5_000)
+        manifest_path = os.path.join(tmp, "models_manifest.json")
+        with open(manifest_path, "w") as f:
+            json.dump(artifacts.build_manifest(model_dir), f)
+        first = main.load_bundle(model_dir, model_dir, manifest_path)
+
+        # A new logistic model and manifest next to the store built for the old one
+        weights = np.load(os.path.join(model_dir, "logistic_weights.npy")) * 2
+        np.save(os.path.join(model_dir, "logistic_weights.npy"), weights)
+        with open(manifest_path, "w") as f:
+            json.dump(artifacts.build_manifest(model_dir), f)
+        second = main.load_bundle(model_dir, model_dir, manifest_path)
+        assert second.version != first.version and np.allclose(second.lr_weights, weights), "stale store served"
+
+        # Same without a manifest: the local artifacts are hashed instead
+        np.save(os.path.join(model_dir, "logistic_weights.npy"), weights * 2)
+        third = main.load_bundle(model_dir, model_dir, os.path.join(tmp, "none"))
+        assert third.version != second.version and np.allclose(third.lr_weights, weights * 2), "stale store served"
+        assert main.load_bundle(model_dir, model_dir, os.path.join(tmp, "none")).version == third.version
+    print("[OK] Existing store rebuilt when its artifacts change (manifest and local hashes); reused otherwise\n")
+
+
+def check_atomic_replace():
+    sys.path.insert(0, APP_DIR)
+    import threading
+
+    import model_store
+    from common import write_standin_artifacts
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_standin_artifacts(os.path.join(tmp, "a"), n_train=2_000, n_estimators=5, seed=1)
+        write_standin_artifacts(os.path.join(tmp, "b"), n_train=2_000, n_estimators=5, seed=2)
+        store_dir = os.path.join(tmp, "models", "store")
+        versions = {model_store.convert(os.path.join(tmp, "a"), store_dir)["version"]}
+        stop, failures, loads = threading.Event(), [], [0]
+
+        def reader():
+            while not stop.is_set():
+                try:
+                    store = model_store.load_store(store_dir)
+                    assert store["meta"]["version"] in versions
+                    loads[0] += 1
+                except Exception as e:
+                    failures.append(repr(e))
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        for i in range(20):
+            versions.add(model_store.convert(os.path.join(tmp, "ab"[i % 2]), store_dir)["version"])
+        stop.set()
+        thread.join()
+        assert not failures, failures[:3]
+        assert len(os.listdir(os.path.dirname(store_dir))) == 2, "old store versions left behind"
+    print(f"[OK] {loads[0]} loads during 20 store replacements, none found the store missing\n")
+
+
+def run(workers: int):
+    from common import write_standin_artifacts
+
+    check_stale_store()
+    check_atomic_replace()
+    with tempfile.TemporaryDirectory() as tmp:
+        model_dir = os.path.join(tmp, "models")
+        write_standin_artifacts(model_dir, n_train=30_000)
+        base = {"MODEL_DIR": model_dir, "MODEL_OFFLINE": "1", "MODEL_MANIFEST": os.path.join(tmp, "none")}
+
+        import model_store
+        model_store.convert(model_dir, os.path.join(model_dir, "store"))
+        size_mb = os.path.getsize(os.path.join(model_dir, "random_forest_model.pkl")) / 2 ** 20
+        print(f"Forest pickle: {size_mb:.0f} MB, {workers} concurrent workers\n")
+
+        print(f"{'format':<26}{'RSS MB':>10}{'PSS MB':>10}{'USS MB':>10}{'total PSS MB':>14}")
+        for name, env in (
+            ("pickle (sklearn)", {"MODEL_FORMAT": "pickle"}),
+            ("pickle + flat engine", {"MODEL_FORMAT": "pickle", "FOREST_BACKEND": "flat"}),
+            ("mmap store", {"MODEL_FORMAT": "mmap"}),
+        ):
+            stats = measure({**base, **env}, workers)
+            avg = {k: sum(s[k] for s in stats) / workers for k in ("rss", "pss", "uss")}
+            print(f"{name:<26}{avg['rss']:>10.0f}{avg['pss']:>10.0f}{avg['uss']:>10.0f}"
+                  f"{sum(s['pss'] for s in stats):>14.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        worker()
+    else:
+        run(args.workers)
@@ -0,0 +1,292 @@
+"""
+Precompiled report template vs. the per-call report builder.
+
+Renders the same reports with both, checks the PDFs are byte-identical
+(reportlab's invariant mode pins document ids and dates), then reports
+reports/second and the traced memory allocated per report.
+
+    python benchmarks/bench_pdf.py [--reports 200]
+"""
+
+import argparse
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from io import BytesIO
+
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from common import synthetic_patients
+
+import main
+
+FIXED_TIME = datetime(2026, 1, 5, 12, 30, 45)
+
+
+def legacy_report(patient_name, patient_data, model_type, prediction_result, timestamp=None) -> BytesIO:
+    """
+    The per-call report builder that ReportTemplate replaced, kept as the baseline
+
+    Args:
+        patient_name: Patient's full name
+        patient_data: Patient health metrics
+        model_type: Type of model used (randomforest, logistic, compare)
+        prediction_result: Prediction results from the model
+        timestamp: Report date (default: now)
+    
+    Returns:
+        BytesIO: PDF file in memory
+    """
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, 
+                           rightMargin=72, leftMargin=72,
+                           topMargin=72, bottomMargin=18)
+    
+    # Container for PDF elements
+    elements = []
+    styles = getSampleStyleSheet()
+    
+    # Custom styles
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor('#4A148C'),
+        spaceAfter=30,
+        alignment=TA_CENTER
+    )
+    
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=14,
+        textColor=colors.HexColor('#6A1B9A'),
+        spaceAfter=12,
+        spaceBefore=12
+    )
+    
+    # Title
+    title = Paragraph("CardioSense Health Report", title_style)
+    elements.append(title)
+    elements.append(Spacer(1, 0.2*inch))
+    
+    # Report metadata
+    timestamp = (timestamp or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+    meta_data = [
+        ["Report Date:", timestamp],
+        ["Patient Name:", patient_name],
+        ["Model Type:", model_type.replace("_", " ").title()],
+    ]
+    
+    meta_table = Table(meta_data, colWidths=[2*inch, 4*inch])
+    meta_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ]))
+    elements.append(meta_table)
+    elements.append(Spacer(1, 0.3*inch))
+    
+    # Patient Information Section
+    elements.append(Paragraph("Patient Health Metrics", heading_style))
+    
+    bmi = patient_data.weight / ((patient_data.height / 100) ** 2)
+    
+    patient_info = [
+        ["Metric", "Value"],
+        ["Age", f"{patient_data.age} years"],
+        ["Gender", "Male" if patient_data.gender == 2 else "Female"],
+        ["Height", f"{patient_data.height} cm"],
+        ["Weight", f"{patient_data.weight} kg"],
+        ["BMI", f"{bmi:.2f}"],
+        ["Systolic BP", f"{patient_data.ap_hi} mmHg"],
+        ["Diastolic BP", f"{patient_data.ap_lo} mmHg"],
+        ["Cholesterol", ["Normal", "Above Normal", "Well Above Normal"][patient_data.cholesterol-1]],
+        ["Glucose", ["Normal", "Above Normal", "Well Above Normal"][patient_data.gluc-1]],
+        ["Smoking", "Yes" if patient_data.smoke else "No"],
+        ["Alcohol", "Yes" if patient_data.alco else "No"],
+        ["Physical Activity", "Yes" if patient_data.active else "No"],
+    ]
+    
+    patient_table = Table(patient_info, colWidths=[2.5*inch, 3.5*inch])
+    patient_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6A1B9A')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F3E5F5')]),
+    ]))
+    elements.append(patient_table)
+    elements.append(Spacer(1, 0.3*inch))
+    
+    # Prediction Results Section
+    elements.append(Paragraph("Prediction Results", heading_style))
+    
+    # Single model mode - use PredictionResult fields directly
+    results_data = [
+        ["Metric", "Value"],
+        ["Model", model_type.replace("_", " ").title()],
+        ["Risk Level", prediction_result.risk_level],
+        ["Probability", f"{prediction_result.probability * 100:.2f}%"],
+    ]
+    
+    results_table = Table(results_data, colWidths=[2.5*inch, 3.5*inch])
+    
+    # Color based on risk level
+    is_high_risk = "High" in prediction_result.risk_level
+    header_color = colors.HexColor('#D32F2F') if is_high_risk else colors.HexColor('#388E3C')
+    
+    table_style = [
+        ('BACKGROUND', (0, 0), (-1, 0), header_color),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+    ]
+    
+    results_table.setStyle(TableStyle(table_style))
+    elements.append(results_table)
+    elements.append(Spacer(1, 0.3*inch))
+    
+    # Recommendations Section
+    elements.append(Paragraph("Medical Recommendations", heading_style))
+    
+    if is_high_risk:
+        recommendations = [
+            "• Consult a cardiologist for comprehensive evaluation",
+            "• Monitor blood pressure and cholesterol regularly",
+            "• Adopt a heart-healthy diet low in sodium and saturated fats",
+            "• Engage in regular physical activity (150 minutes/week)",
+            "• Consider stress management techniques",
+            "• Follow prescribed medication regimen if applicable",
+        ]
+    else:
+        recommendations = [
+            "• Maintain current healthy lifestyle habits",
+            "• Schedule regular annual cardiovascular check-ups",
+            "• Continue balanced diet and physical activity",
+            "• Monitor blood pressure periodically",
+            "• Stay informed about cardiovascular health",
+        ]
+    
+    for rec in recommendations:
+        elements.append(Paragraph(rec, styles['Normal']))
+        elements.append(Spacer(1, 0.1*inch))
+    
+    elements.append(Spacer(1, 0.2*inch))
+    
+    # Disclaimer
+    disclaimer_style = ParagraphStyle(
+        'Disclaimer',
+        parent=styles['Normal'],
+        fontSize=9,
+        textColor=colors.HexColor('#D32F2F'),
+        leftIndent=20,
+        rightIndent=20,
+        spaceAfter=10,
+    )
+    
+    disclaimer_text = "<b>Medical Disclaimer:</b> This report is generated by an AI-based educational tool and should NOT be used for medical diagnosis. Always consult qualified healthcare professionals for medical advice, diagnosis, or treatment."
+    elements.append(Paragraph(disclaimer_text, disclaimer_style))
+    
+    # Footer
+    footer_style = ParagraphStyle(
+        'Footer',
+        parent=styles['Normal'],
+        fontSize=8,
+        textColor=colors.grey,
+        alignment=TA_CENTER,
+    )
+    elements.append(Spacer(1, 0.2*inch))
+    elements.append(Paragraph("Generated by CardioSense | Machine Learning Prediction System", footer_style))
+    
+    # Build PDF
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer
+
+
+def report_inputs(n: int) -> list:
+    inputs = []
+    for i, patient in enumerate(synthetic_patients(n, seed=11)):
+        data = main.PatientData(**patient)
+        probability = (i * 37 % 100) / 100
+        result = main.PredictionResult(
+            risk_level="High Risk" if probability >= 0.5 else "Low Risk", probability=probability
+        )
+        inputs.append((f"Patient {i}", data, ("randomforest", "logistic", "compare")[i % 3], result))
+    return inputs
+
+
+def check_identical(inputs):
+    def render(args):
+        return main.report_template.render(*args, timestamp=FIXED_TIME).getvalue()
+
+    rl_config.invariant = 1
+    try:
+        expected = [legacy_report(*args, timestamp=FIXED_TIME).getvalue() for args in inputs]
+        assert [render(args) for args in inputs] == expected, "template PDF differs"
+        # Report workers render concurrently from the same template
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            assert list(pool.map(render, inputs * 4)) == expected * 4, "concurrent template PDF differs"
+    finally:
+        rl_config.invariant = 0
+    print(f"[OK] Template output is byte-identical to the per-call builder on {len(inputs)} reports, "
+          f"also when rendered from 4 threads")
+
+
+def reports_per_second(render, inputs) -> float:
+    start = time.perf_counter()
+    for args in inputs:
+        render(*args)
+    return len(inputs) / (time.perf_counter() - start)
+
+
+def allocation_per_report(render, inputs) -> tuple:
+    """(KiB allocated and not yet freed at the peak, KiB still held afterwards) per report, averaged"""
+    peaks, retained = [], []
+    tracemalloc.start()
+    for args in inputs:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        buffer = render(*args)
+        current, peak = tracemalloc.get_traced_memory()
+        del buffer
+        peaks.append(peak - before)
+        retained.append(tracemalloc.get_traced_memory()[0] - before)
+    tracemalloc.stop()
+    return sum(peaks) / len(peaks) / 1024, sum(retained) / len(retained) / 1024
+
+
+def run(n_reports: int):
+    inputs = report_inputs(n_reports)
+    check_identical(inputs[:20])
+
+    # Warm up both paths (font metrics, the template's per-thread flowables)
+    for render in (legacy_report, main.report_template.render):
+        render(*inputs[0])
+
+    print(f"{'builder':<14}{'reports/s':>12}{'peak KiB':>12}{'retained KiB':>14}")
+    for name, render in (("per-call", legacy_report), ("template", main.report_template.render)):
+        rate = reports_per_second(render, inputs)
+        peak, retained = allocation_per_report(render, inputs[:50])
+        print(f"{name:<14}{rate:>12.1f}{peak:>12.1f}{retained:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reports", type=int, default=200)
+    run(parser.parse_args().reports)
@@ -0,0 +1,171 @@
+"""
+Background report pipeline throughput, offline.
+
+Runs /send-report against the in-memory email stub (EMAIL_BACKEND=stub)
+with a simulated provider latency. Reports how fast jobs are accepted and
+delivered for several worker counts and how prediction latency holds up
+during a report burst. Also checks retries, permanent failures and the
+queue bound.
+
+    python benchmarks/bench_reports.py [--reports 100] [--latency 0.05]
+"""
+
+import argparse
+import os
+import threading
+import time
+
+os.environ["EMAIL_BACKEND"] = "stub"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from common import install_standin_models, latency_percentiles, synthetic_patients  # noqa: E402
+
+import main  # noqa: E402
+import reports  # noqa: E402
+
+WORKER_COUNTS = (1, 2, 4)
+
+
+def report_payload(patient: dict, i: int) -> dict:
+    return {
+        "to_email": f"patient{i}@example.com",
+        "patient_name": f"Patient {i}",
+        "patient_data": patient,
+        "model_type": "compare",
+        "prediction_result": {"risk_level": "High Risk", "probability": 0.71},
+    }
+
+
+def use_pipeline(**kwargs) -> reports.ReportPipeline:
+    main.report_pipeline = reports.ReportPipeline(main.deliver_report, **kwargs)
+    return main.report_pipeline
+
+
+def wait_for(client, job_ids, timeout=60) -> list:
+    main.report_pipeline.join(timeout)
+    return [client.get(f"/send-report/{job_id}").json() for job_id in job_ids]
+
+
+def throughput(client, payloads, workers: int) -> dict:
+    use_pipeline(workers=workers, max_queue=len(payloads))
+    accept = []
+    start = time.perf_counter()
+    job_ids = []
+    for payload in payloads:
+        t = time.perf_counter()
+        r = client.post("/send-report", json=payload)
+        accept.append(time.perf_counter() - t)
+        assert r.status_code == 202, r.text
+        job_ids.append(r.json()["job_id"])
+    jobs = wait_for(client, job_ids)
+    elapsed = time.perf_counter() - start
+    assert all(job["status"] == "sent" for job in jobs), [j for j in jobs if j["status"] != "sent"][:1]
+    accept.sort()
+    return {
+        "accept_p99_ms": accept[int(len(accept) * 0.99) - 1] * 1000,
+        "reports_per_s": len(payloads) / elapsed,
+    }
+
+
+def check_retries(client, payloads):
+    main.email_stub.failure_rate = 0.3
+    try:
+        pipeline = use_pipeline(workers=2, max_queue=len(payloads), backoff_seconds=0.01, max_attempts=10)
+        job_ids = [client.post("/send-report", json=p).json()["job_id"] for p in payloads]
+        jobs = wait_for(client, job_ids)
+    finally:
+        main.email_stub.failure_rate = 0.0
+    assert all(job["status"] == "sent" for job in jobs)
+    assert pipeline.retries > 0
+    print(f"[OK] 30% simulated provider failures: all {len(jobs)} reports sent after {pipeline.retries} retries")
+
+
+def check_permanent_failure(client, payload):
+    use_pipeline(workers=1, backoff_seconds=0.01)
+    backend, key = main.EMAIL_BACKEND, os.environ.pop("RESEND_API_KEY", None)
+    main.EMAIL_BACKEND = "resend"
+    try:
+        job_id = client.post("/send-report", json=payload).json()["job_id"]
+        job = wait_for(client, [job_id])[0]
+    finally:
+        main.EMAIL_BACKEND = backend
+        if key is not None:
+            os.environ["RESEND_API_KEY"] = key
+    assert job["status"] == "failed" and job["attempts"] == 1, job
+    print(f"[OK] Missing RESEND_API_KEY fails the job without retrying: {job['error']}")
+
+
+def check_retry_after_shutdown():
+    def flaky(payload):
+        raise RuntimeError("provider unavailable")
+
+    pipeline = reports.ReportPipeline(flaky, workers=1, backoff_seconds=0.2, max_attempts=5)
+    job = pipeline.submit({})
+    time.sleep(0.05)  # first attempt fails, the retry is scheduled
+    start = time.perf_counter()
+    assert pipeline.shutdown(timeout=5), "shutdown waited for a retry nobody would run"
+    assert job.status == "failed" and "shut down" in job.error, job.info()
+    assert all(not thread.is_alive() for thread in pipeline._threads)
+    print(f"[OK] A retry due after shutdown fails its job instead of re-queuing it "
+          f"(shutdown took {time.perf_counter() - start:.2f}s): {job.error}")
+
+
+def check_queue_bound(client, payloads):
+    main.email_stub.latency_seconds = 0.5
+    try:
+        use_pipeline(workers=1, max_queue=2)
+        codes = [client.post("/send-report", json=p) for p in payloads[:6]]
+        main.report_pipeline.join(30)
+    finally:
+        main.email_stub.latency_seconds = 0.0
+    rejected = [r for r in codes if r.status_code == 503]
+    assert rejected and all(r.headers.get("Retry-After") for r in rejected)
+    print(f"[OK] Queue bound of 2: {len(rejected)} of {len(codes)} burst requests refused with 503 + Retry-After")
+
+
+def prediction_latency_during_burst(client, payloads, patient) -> tuple:
+    use_pipeline(workers=2, max_queue=len(payloads))
+    idle = latency_percentiles(lambda: client.post("/predict/logistic", json=patient), 200)
+
+    burst = threading.Thread(target=lambda: [client.post("/send-report", json=p) for p in payloads])
+    burst.start()
+    time.sleep(0.05)
+    busy = latency_percentiles(lambda: client.post("/predict/logistic", json=patient), 200, warmup=0)
+    burst.join()
+    main.report_pipeline.join(60)
+    return idle, busy
+
+
+def run(n_reports: int, latency: float):
+    install_standin_models(n_estimators=10)
+    main.prediction_cache = main.PredictionCache(max_entries=0)
+    main.email_stub.latency_seconds = latency
+    client = TestClient(main.app)
+
+    patients = synthetic_patients(n_reports, seed=9)
+    payloads = [report_payload(p, i) for i, p in enumerate(patients)]
+
+    check_retries(client, payloads[:30])
+    check_permanent_failure(client, payloads[0])
+    check_retry_after_shutdown()
+    check_queue_bound(client, payloads)
+    main.email_stub.latency_seconds = latency
+
+    print(f"\n{n_reports} reports, simulated provider latency {latency * 1000:.0f} ms")
+    print(f"{'workers':>8}{'accept p99 ms':>16}{'reports/s':>12}")
+    for workers in WORKER_COUNTS:
+        stats = throughput(client, payloads, workers)
+        print(f"{workers:>8}{stats['accept_p99_ms']:>16.2f}{stats['reports_per_s']:>12.1f}")
+
+    idle, busy = prediction_latency_during_burst(client, payloads, patients[0])
+    print(f"\n/predict/logistic p50/p99 ms: idle {idle['p50_ms']:.2f}/{idle['p99_ms']:.2f}, "
+          f"during report burst {busy['p50_ms']:.2f}/{busy['p99_ms']:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reports", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated provider latency in seconds")
+    args = parser.parse_args()
+    run(args.reports, args.latency)
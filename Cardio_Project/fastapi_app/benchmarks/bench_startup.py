@@ -0,0 +1,243 @@
+"""
+Cold-start time to first prediction, serial vs. parallel artifact fetch.
+
+Stand-in artifacts are served by a local HTTP mirror that supports Range
+requests and simulates per-request latency and limited bandwidth. Each
+scenario starts a fresh process that imports main, runs load_models() and
+serves one prediction per model. The script also checks that an
+interrupted download resumes, that a corrupted artifact is replaced, and
+that a resume is refused whenever it could splice two different files.
+
+    python benchmarks/bench_startup.py
+"""
+
+import argparse
+import functools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LATENCY_S = 0.15
+BANDWIDTH_BPS = 40 * 1024 * 1024
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import artifacts  # noqa: E402
+
+
+class ThrottledRangeHandler(SimpleHTTPRequestHandler):
+    """Static files with Range/If-Range support, fixed request latency and capped bandwidth"""
+
+    # {url path: bytes}: the next GET of that path drops the connection after that many bytes
+    cut_after = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(LATENCY_S)
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+
+        size = os.path.getsize(path)
+        etag = f'"{os.stat(path).st_mtime_ns:x}-{size:x}"'
+        start = 0
+        if_range = self.headers.get("If-Range")
+        if self.headers.get("Range", "").startswith("bytes=") and if_range in (None, etag):
+            start = int(self.headers["Range"][6:].split("-")[0])
+            if start >= size:
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(size - start))
+        self.end_headers()
+
+        left = self.cut_after.pop(self.path, size)
+        with open(path, "rb") as f:
+            f.seek(start)
+            while left > 0 and (chunk := f.read(min(256 * 1024, left))):
+                try:
+                    self.wfile.write(chunk)
+                except ConnectionError:  # the client rejected the response
+                    return
+                left -= len(chunk)
+                time.sleep(len(chunk) / BANDWIDTH_BPS)
+
+
+def child():
+    start = time.perf_counter()
+    sys.path.insert(0, APP_DIR)
+    import main
+    from common import synthetic_patients
+
+    main.load_models()
+    patient = main.PatientData(**synthetic_patients(1)[0])
+    main.random_forest_result(patient, main.active_models())
+    main.predict_logistic(patient)
+    print(json.dumps({"first_prediction_s": time.perf_counter() - start, "startup": main.active_models().stats}))
+
+
+def cold_start(env: dict) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", __file__, "--child"],
+        env={**os.environ, **env}, check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def interrupted(url: str, dest_dir: str, expected: dict, cut: int) -> str:
+    """Leave a ``.part`` of ``url`` behind as a dropped connection would; returns its path"""
+    ThrottledRangeHandler.cut_after[urlparse(url).path] = cut
+    try:
+        artifacts.fetch_artifact("blob.bin", url, dest_dir, expected, retries=1)
+    except artifacts.ArtifactError:
+        pass
+    return os.path.join(dest_dir, "blob.bin.part")
+
+
+def check_resume_safety(tmp: str, mirror: str, base_url: str):
+    blob = os.path.join(mirror, "blob.bin")
+    url = f"{base_url}/blob.bin"
+
+    def publish(seed: int) -> dict:
+        with open(blob, "wb") as f:
+            f.write(random.Random(seed).randbytes(3 * 2 ** 20))
+        return {"sha256": artifacts.sha256_file(blob), "size": os.path.getsize(blob)}
+
+    def fetched(dest_dir: str) -> bytes:
+        with open(os.path.join(dest_dir, "blob.bin"), "rb") as f:
+            return f.read()
+
+    def source() -> bytes:
+        with open(blob, "rb") as f:
+            return f.read()
+
+    # The file changed on the mirror after the interruption: If-Range gets a 200 and the copy restarts
+    dest = os.path.join(tmp, "changed")
+    interrupted(url, dest, publish(1), 2 ** 20)
+    time.sleep(0.01)
+    stats = artifacts.fetch_artifact("blob.bin", url, dest, publish(2), retries=1)
+    assert stats["bytes"] == os.path.getsize(blob) and fetched(dest) == source(), stats
+    print("[OK] A .part of a file that changed on the mirror is fetched again, not spliced")
+
+    # No checksum to verify against: a leftover .part is never resumed
+    dest = os.path.join(tmp, "unverified")
+    interrupted(url, dest, None, 2 ** 20)
+    with open(os.path.join(dest, "blob.bin.part"), "r+b") as f:
+        f.write(b"stale bytes from another file")
+    stats = artifacts.fetch_artifact("blob.bin", url, dest, None, retries=1)
+    assert stats["resumed_from"] == 0 and fetched(dest) == source(), stats
+    print("[OK] Without a manifest entry a leftover .part is discarded")
+
+    # Content-Range that does not continue the .part (server now reports another total size)
+    expected = publish(2)
+    dest = os.path.join(tmp, "range")
+    part = interrupted(url, dest, expected, 2 ** 20)
+    with open(part + ".meta") as f:
+        meta = json.load(f)
+    with open(part + ".meta", "w") as f:
+        json.dump({**meta, "size": meta["size"] + 1}, f)
+    stats = artifacts.fetch_artifact("blob.bin", url, dest, expected, retries=2)
+    assert fetched(dest) == source(), stats
+    print("[OK] A Content-Range that does not match the .part is rejected and the copy restarts")
+
+    # Local mirror: a .part at least as long as the source cannot be a prefix of it
+    dest = os.path.join(tmp, "oversize")
+    os.makedirs(dest)
+    with open(os.path.join(dest, "blob.bin.part"), "wb") as f:
+        f.write(b"x" * (expected["size"] + 10))
+    stats = artifacts.fetch_artifact("blob.bin", blob, dest, expected, retries=1)
+    assert stats["bytes"] == expected["size"] and fetched(dest) == source(), stats
+    print("[OK] An oversize .part next to a local mirror is discarded")
+
+    # Two fetchers of the same file: one downloads, the other waits and finds it verified
+    dest = os.path.join(tmp, "concurrent")
+    os.makedirs(dest)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(lambda _: artifacts.fetch_artifact("blob.bin", url, dest, expected), range(2)))
+    assert sorted(r["bytes"] for r in results) == [0, expected["size"]], results
+    assert fetched(dest) == source()
+    print("[OK] Concurrent fetches of one artifact are serialized: one download, one verified reuse")
+
+
+def run():
+    from common import write_standin_artifacts
+
+    with tempfile.TemporaryDirectory() as tmp:
+        mirror = os.path.join(tmp, "mirror")
+        manifest = write_standin_artifacts(mirror, n_train=20_000)
+        manifest_path = os.path.join(tmp, "manifest.json")
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f)
+        total_mb = sum(e["size"] for e in manifest["files"].values()) / 1e6
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(ThrottledRangeHandler, directory=mirror))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_env = {
+            "MODEL_BASE_URL": f"http://127.0.0.1:{server.server_port}",
+            "MODEL_MANIFEST": manifest_path,
+        }
+
+        print(f"Mirror: {len(manifest['files'])} artifacts, {total_mb:.1f} MB, "
+              f"{LATENCY_S * 1000:.0f} ms latency, {BANDWIDTH_BPS / 2 ** 20:.0f} MiB/s per connection\n")
+        print(f"{'scenario':<28}{'first prediction s':>20}")
+        scenarios = [
+            ("cold, serial fetch", {"ARTIFACT_WORKERS": "1"}, "serial"),
+            ("cold, parallel fetch", {"ARTIFACT_WORKERS": "5"}, "parallel"),
+            ("warm (verified local)", {"ARTIFACT_WORKERS": "5"}, "parallel"),
+            ("offline, local mirror", {"MODEL_OFFLINE": "1", "MODEL_BASE_URL": mirror}, "offline"),
+        ]
+        for name, env, model_dir in scenarios:
+            result = cold_start({**base_env, **env, "MODEL_DIR": os.path.join(tmp, model_dir)})
+            print(f"{name:<28}{result['first_prediction_s']:>20.2f}")
+
+        # Interrupted download: the mirror drops the connection halfway through the forest
+        model_dir = os.path.join(tmp, "resume")
+        rf = os.path.join(mirror, "random_forest_model.pkl")
+        rf_size = os.path.getsize(rf)
+        ThrottledRangeHandler.cut_after["/random_forest_model.pkl"] = rf_size // 2
+        try:
+            artifacts.fetch_artifact("random_forest_model.pkl", f"{base_env['MODEL_BASE_URL']}/random_forest_model.pkl",
+                                     model_dir, manifest["files"]["random_forest_model.pkl"], retries=1)
+        except artifacts.ArtifactError:
+            pass
+        resumed_from = os.path.getsize(os.path.join(model_dir, "random_forest_model.pkl.part"))
+        assert 0 < resumed_from < rf_size, resumed_from
+        # Corrupted artifact left in place by an old crash
+        with open(os.path.join(model_dir, "scaler_num.pkl"), "wb") as f:
+            f.write(b"truncated")
+
+        result = cold_start({**base_env, "MODEL_DIR": model_dir})
+        stats = result["startup"]["artifacts"]
+        rf_stats = stats["random_forest_model.pkl"]
+        assert rf_stats["bytes"] == rf_size - resumed_from, rf_stats
+        assert stats["scaler_num.pkl"]["bytes"] == manifest["files"]["scaler_num.pkl"]["size"]
+        print(f"\n[OK] Resumed forest download fetched {rf_stats['bytes']} of {rf_size} bytes")
+        print("[OK] Corrupted scaler_num.pkl failed verification and was fetched again")
+
+        check_resume_safety(tmp, mirror, base_env["MODEL_BASE_URL"])
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    if parser.parse_args().child:
+        child()
+    else:
+        run()
@@ -0,0 +1,88 @@
+"""
+Throughput and peak RSS of bulk CSV/NDJSON scoring as input size grows.
+
+Each size is scored by ``bulk.score_file`` in a fresh subprocess so the
+reported peak RSS belongs to that run alone; flat RSS across sizes shows
+memory is bounded by the chunk size, not the input size. First checks that
+a malformed NDJSON line is reported on its own row and the rest is scored.
+
+    python benchmarks/bench_stream.py [--sizes 10000 100000 1000000]
+"""
+
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from common import install_standin_models, synthetic_patients
+
+import bulk
+import main
+
+COLUMNS = ("id",) + main.PATIENT_FIELDS
+
+
+def write_input(path: str, fmt: str, n: int, block: int = 50_000):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            f.write(";".join(COLUMNS) + "\n")
+        for start in range(0, n, block):
+            for i, row in enumerate(synthetic_patients(min(block, n - start), seed=start), start):
+                if fmt == "csv":
+                    f.write(";".join([str(i)] + [str(row[c]) for c in main.PATIENT_FIELDS]) + "\n")
+                else:
+                    f.write(json.dumps({"id": i, **row}) + "\n")
+
+
+def child(path: str, fmt: str):
+    install_standin_models(n_train=2000, n_estimators=100)
+    stats = bulk.score_file(path, os.devnull, fmt, "compare", main.score_chunk)
+    print(json.dumps(stats))
+
+
+def check_malformed_lines():
+    install_standin_models(n_train=2000, n_estimators=10)
+    rows = [json.dumps({"id": i, **row}) for i, row in enumerate(synthetic_patients(6))]
+    rows[2] = rows[2][:-1]  # truncated object
+    rows[4] = "not json"
+    stream = io.StringIO("\n".join(rows) + "\n")
+    out = "".join(bulk.stream_scores(stream, "ndjson", "compare", main.score_chunk, chunk_size=3))
+    records = [json.loads(line) for line in out.splitlines()]
+    assert [r["row"] for r in records] == list(range(6)), records
+    assert [i for i, r in enumerate(records) if "error" in r] == [2, 4], records
+    assert all(r["error"].startswith("Invalid JSON") for r in (records[2], records[4])), records
+    assert all("rf_probability" in records[i] for i in (0, 1, 3, 5)), records
+    print("[OK] Malformed NDJSON lines come back as row errors; the other rows are scored\n")
+
+
+def run(sizes):
+    check_malformed_lines()
+    print(f"{'format':<8}{'rows':>10}{'rows/s':>12}{'peak RSS MB':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in bulk.FORMATS:
+            for n in sizes:
+                path = os.path.join(tmp, f"extract_{n}.{fmt}")
+                write_input(path, fmt, n)
+                out = subprocess.run(
+                    [sys.executable, "-W", "ignore", __file__, "--child", path, fmt],
+                    check=True, capture_output=True, text=True,
+                )
+                stats = json.loads(out.stdout.strip().splitlines()[-1])
+                print(f"{fmt:<8}{stats['rows']:>10}{stats['rows_per_second']:>12,.0f}"
+                      f"{stats['peak_rss_mb']:>14.0f}")
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--child", nargs=2, metavar=("PATH", "FORMAT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+    else:
+        run(args.sizes)
@@ -0,0 +1,89 @@
+"""
+Latency of /predict/sweep against scoring the same grid point by point.
+
+Sends 1-D and 2-D what-if sweeps (up to the 100x100 ap_hi x bmi surface)
+through the app in-process and reports p50/p99 latency. For comparison it
+also times the per-point /predict/compare calls the frontend would
+otherwise make, on a sample extrapolated to the full grid. Checks that
+sampled grid cells equal the /predict/compare result for that point and
+that the 100x100 surface comes back in under a second.
+
+    python benchmarks/bench_sweep.py [--calls 50]
+"""
+
+import argparse
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from common import install_standin_models, latency_percentiles, synthetic_patients
+
+import main
+from cache import PredictionCache
+
+SWEEPS = {
+    "ap_hi x 20": [{"feature": "ap_hi", "start": 90, "stop": 200, "steps": 20}],
+    "ap_hi x 100": [{"feature": "ap_hi", "start": 90, "stop": 200, "steps": 100}],
+    "ap_hi x smoke": [{"feature": "ap_hi", "start": 90, "stop": 200, "steps": 100},
+                      {"feature": "smoke", "start": 0, "stop": 1, "steps": 2}],
+    "ap_hi x bmi 100x100": [{"feature": "ap_hi", "start": 90, "stop": 200, "steps": 100},
+                            {"feature": "bmi", "start": 18, "stop": 40, "steps": 100}],
+}
+POINT_SAMPLE = 200
+
+
+def point_payload(patient: dict, axes: list, index) -> dict:
+    payload = dict(patient)
+    for axis, i in zip(axes, index):
+        payload[axis["feature"]] = axis["values"][i]
+    if "bmi" in payload:
+        payload["weight"] = payload.pop("bmi") * (payload["height"] / 100) ** 2
+    return payload
+
+
+def check_cells(client, patient: dict, sweep: dict, samples: int = 50):
+    rng = np.random.default_rng(5)
+    shape = [len(axis["values"]) for axis in sweep["axes"]]
+    for _ in range(samples):
+        index = tuple(int(rng.integers(n)) for n in shape)
+        expected = client.post("/predict/compare", json=point_payload(patient, sweep["axes"], index)).json()
+        rf, lr = sweep["random_forest"], sweep["logistic_regression"]
+        for i in index:
+            rf, lr = rf[i], lr[i]
+        assert rf == expected["random_forest"]["probability"], f"random forest differs at {index}"
+        assert lr == expected["logistic_regression"]["probability"], f"logistic differs at {index}"
+
+
+def run(calls: int):
+    install_standin_models()
+    # Point-by-point calls must reach the models, not the cache
+    main.prediction_cache = PredictionCache(max_entries=0)
+    client = TestClient(main.app)
+    patient = synthetic_patients(1, seed=4)[0]
+
+    print(f"{'sweep':<22}{'points':>8}{'p50 ms':>10}{'p99 ms':>10}{'per-point calls ms':>20}{'speedup':>10}")
+    for name, axes in SWEEPS.items():
+        body = {"patient": patient, "axes": axes}
+        sweep = client.post("/predict/sweep", json=body).json()
+        check_cells(client, patient, sweep)
+        stats = latency_percentiles(lambda: client.post("/predict/sweep", json=body), calls)
+
+        points = sweep["points"]
+        shape = [len(axis["values"]) for axis in sweep["axes"]]
+        sample = [point_payload(patient, sweep["axes"], np.unravel_index(i, shape))
+                  for i in np.linspace(0, points - 1, min(points, POINT_SAMPLE)).astype(int)]
+        per_point = latency_percentiles(
+            lambda: [client.post("/predict/compare", json=p) for p in sample], 1, warmup=1
+        )["p50_ms"] / len(sample) * points
+
+        print(f"{name:<22}{points:>8}{stats['p50_ms']:>10.1f}{stats['p99_ms']:>10.1f}"
+              f"{per_point:>20,.0f}{per_point / stats['p50_ms']:>9.0f}x")
+        if points == 10_000:
+            assert stats["p99_ms"] < 1000, "100x100 sweep took over a second"
+    print("\n[OK] Sampled grid cells match /predict/compare; 100x100 surface under 1 s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50)
+    run(parser.parse_args().calls)
@@ -0,0 +1,78 @@
+"""
+Offline training pipeline: wall-clock time against core count.
+
+Checks first that chunked loading does not depend on the chunk size
+(cleaning and de-duplication across chunk borders), then trains on the
+Kaggle extract with --jobs 1, 2, 4, ... up to the machine's cores. Reports
+each stage's time in seconds and the speedup over the first run, and checks
+every run wrote byte-identical artifacts: the parallel search and fit change
+how fast the models are found, never which.
+
+    python benchmarks/bench_train.py [--data ../Data/raw/cardio_train.csv] [--full] [--jobs 1 2 4]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from common import APP_DIR  # noqa: F401  (puts the app on sys.path)
+
+import main
+import train
+
+
+def check_chunking(path):
+    whole, y_whole, stats = train.load_dataset(path, main.PATIENT_FIELDS, chunk_rows=10 ** 9)
+    start = time.perf_counter()
+    chunked, y_chunked, chunked_stats = train.load_dataset(path, main.PATIENT_FIELDS, chunk_rows=1000)
+    seconds = time.perf_counter() - start
+    assert np.array_equal(whole, chunked) and np.array_equal(y_whole, y_chunked), "chunk size changed the data"
+    assert stats == chunked_stats, (stats, chunked_stats)
+    print(f"[OK] 1,000-row chunks load the same {len(chunked):,} rows as one pass ({seconds:.2f}s, "
+          f"{stats['dropped']['duplicate']} duplicates across the file)")
+
+
+def job_counts():
+    cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 < cpus:
+        counts.append(counts[-1] * 2)
+    return counts + [cpus] if cpus > 1 else counts
+
+
+def run(path, quick, counts):
+    check_chunking(path)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for jobs in counts:
+            output = os.path.join(tmp, f"jobs-{jobs}")
+            print(f"\n--jobs {jobs}")
+            manifest = train.train(path, output, jobs=jobs, quick=quick)
+            results.append((jobs, manifest["training"]["seconds"], manifest["files"]))
+
+    stages = [k for k in results[0][1] if k != "total"]
+    print(f"\nTraining ({'quick grids' if quick else 'full grids'}) on {os.cpu_count()} core(s)")
+    widths = {s: len(s) + 2 for s in stages}
+    print(f"{'jobs':>5}" + "".join(f"{s:>{widths[s]}}" for s in stages) + f"{'total s':>10}{'speedup':>9}")
+    base = results[0][1]["total"]
+    for jobs, seconds, _ in results:
+        print(f"{jobs:>5}" + "".join(f"{seconds[s]:>{widths[s]}.2f}" for s in stages)
+              + f"{seconds['total']:>10.2f}{base / seconds['total']:>8.2f}x")
+    for jobs, _, files in results[1:]:
+        assert files == results[0][2], f"--jobs {jobs} wrote different artifacts than --jobs 1"
+    if len(results) > 1:
+        print("[OK] Every job count wrote byte-identical artifacts")
+    else:
+        print("[NOTE] A single job count: nothing to compare the artifacts with")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default=train.DEFAULT_DATA)
+    parser.add_argument("--full", action="store_true", help="Full grids and 5 folds instead of the quick ones")
+    parser.add_argument("--jobs", type=int, nargs="+", default=None, help="Job counts (default 1, 2, 4, ... cores)")
+    args = parser.parse_args()
+    run(args.data, not args.full, args.jobs or job_counts())
@@ -0,0 +1,107 @@
+"""
+Rows/second of column-wise validation against pydantic PatientData.
+
+For N = 1k, 10k, 100k and 1M synthetic patients it times:
+
+  pydantic loop       PatientData(**row) per row, as the stream path did
+  pydantic list       TypeAdapter(List[PatientData]), as /predict/batch did
+  columns (dicts)     ColumnValidator.validate_rows: row dicts -> matrix -> checks
+  columns (matrix)    ColumnValidator.check on a decoded matrix (/predict/columnar)
+
+Before timing it corrupts a share of the cells (out-of-range, fractional,
+missing, null, non-numeric) and checks that the schema-only validator
+rejects exactly the rows pydantic rejects, with the same messages. It also
+reports how many rows the plausibility rules reject on top.
+
+    python benchmarks/bench_validation.py [--max-rows 1000000]
+"""
+
+import argparse
+from typing import List
+
+import numpy as np
+from pydantic import TypeAdapter, ValidationError
+
+from common import rows_per_second, synthetic_patients
+
+import main
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+FIELDS = main.PATIENT_FIELDS
+
+
+def corrupt(rows: list, share: float = 0.1, seed: int = 7) -> list:
+    rng = np.random.default_rng(seed)
+    rows = [dict(row) for row in rows]
+    for i in rng.choice(len(rows), int(len(rows) * share), replace=False).tolist():
+        field = FIELDS[int(rng.integers(len(FIELDS)))]
+        kind = int(rng.integers(6))
+        if kind == 0:
+            rows[i][field] = float(rng.choice([-5.0, 0.0, 3.5, 30.0, 150.0, 1e4]))
+        elif kind == 1:
+            rows[i][field] = 1.5
+        elif kind == 2:
+            del rows[i][field]
+        elif kind == 3:
+            rows[i][field] = None
+        elif kind == 4:
+            rows[i][field] = "n/a"
+        else:
+            rows[i]["ap_lo"] = rows[i]["ap_hi"] + 10
+    return rows
+
+
+def pydantic_errors(rows: list) -> dict:
+    errors = {}
+    for row, values in enumerate(rows):
+        try:
+            main.PatientData(**values)
+        except ValidationError as e:
+            errors[row] = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+    return errors
+
+
+def check_equivalence(n: int = 20_000):
+    rows = corrupt(synthetic_patients(n, seed=3))
+    expected = pydantic_errors(rows)
+    _, report = main.patient_fields.validate_rows(rows)
+    assert report.messages() == expected, "column checks disagree with pydantic"
+    assert int((~report.valid).sum()) == len(expected)
+
+    _, with_rules = main.patient_columns.validate_rows(rows)
+    extra = int((~with_rules.valid).sum()) - len(expected)
+    print(f"[OK] Column checks match pydantic on {n:,} rows ({len(expected):,} invalid); "
+          f"plausibility rules reject {extra:,} more")
+
+
+def pydantic_loop(rows: list):
+    for row in rows:
+        try:
+            main.PatientData(**row)
+        except ValidationError:
+            pass
+
+
+def run(max_rows: int):
+    check_equivalence()
+    adapter = TypeAdapter(List[main.PatientData])
+
+    print(f"\n{'N':>10}{'pydantic loop':>16}{'pydantic list':>16}{'columns (dicts)':>18}"
+          f"{'columns (matrix)':>18}{'speedup':>10}")
+    for n in SIZES:
+        if n > max_rows:
+            break
+        rows = synthetic_patients(n, seed=n)
+        raw, _ = main.patient_columns.to_matrix(rows)
+        repeat = 1 if n >= 100_000 else 3
+        loop = rows_per_second(lambda: pydantic_loop(rows), n, repeat=1)
+        listed = rows_per_second(lambda: adapter.validate_python(rows), n, repeat=repeat)
+        dicts = rows_per_second(lambda: main.patient_columns.validate_rows(rows), n, repeat=repeat)
+        matrix = rows_per_second(lambda: main.patient_columns.check(raw), n, repeat=repeat)
+        print(f"{n:>10,}{loop:>16,.0f}{listed:>16,.0f}{dicts:>18,.0f}{matrix:>18,.0f}{dicts / listed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-rows", type=int, default=1_000_000)
+    run(parser.parse_args().max_rows)
@@ -0,0 +1,243 @@
+"""
+Shared helpers for the offline benchmarks.
+
+Benchmarks never touch Hugging Face: they generate cardio-shaped synthetic
+patients and fit small stand-in models with the same feature layout as the
+production artifacts, then install them as ``main``'s active model bundle.
+"""
+
+import dataclasses
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import main  # noqa: E402
+
+
+def synthetic_patients(n: int, seed: int = 0) -> list:
+    """Generate ``n`` valid PatientData payloads with cardio-like marginals"""
+    rng = np.random.default_rng(seed)
+    height = np.clip(rng.normal(164, 8, n), 140, 200)
+    weight = np.clip(rng.normal(74, 14, n), 40, 180)
+    ap_hi = np.clip(rng.normal(127, 17, n), 90, 200)
+    ap_lo = np.clip(ap_hi - rng.normal(45, 8, n), 50, 130)
+
+    return [
+        {
+            "age": round(float(a), 1),
+            "gender": int(g),
+            "height": round(float(h), 1),
+            "weight": round(float(w), 1),
+            "ap_hi": round(float(hi), 0),
+            "ap_lo": round(float(lo), 0),
+            "cholesterol": int(c),
+            "gluc": int(gl),
+            "smoke": int(s),
+            "alco": int(al),
+            "active": int(ac),
+        }
+        for a, g, h, w, hi, lo, c, gl, s, al, ac in zip(
+            np.clip(rng.normal(53, 6.8, n), 30, 65),
+            rng.integers(1, 3, n),
+            height,
+            weight,
+            ap_hi,
+            ap_lo,
+            rng.choice([1, 2, 3], n, p=[0.75, 0.14, 0.11]),
+            rng.choice([1, 2, 3], n, p=[0.85, 0.07, 0.08]),
+            rng.random(n) < 0.09,
+            rng.random(n) < 0.05,
+            rng.random(n) < 0.8,
+        )
+    ]
+
+
+def synthetic_matrix(n: int, seed: int = 0) -> np.ndarray:
+    """Same as synthetic_patients, as an (N, 11) matrix in PATIENT_FIELDS order"""
+    rows = synthetic_patients(n, seed)
+    return np.array([[row[f] for f in main.PATIENT_FIELDS] for row in rows], dtype=np.float64)
+
+
+def synthetic_labels(raw: np.ndarray, seed: int = 0) -> np.ndarray:
+    """Noisy cardio labels driven mostly by age, blood pressure and cholesterol"""
+    rng = np.random.default_rng(seed)
+    z = (
+        0.06 * (raw[:, 0] - 53)
+        + 0.05 * (raw[:, 4] - 127)
+        + 0.5 * (raw[:, 6] - 1)
+        + rng.normal(0, 1, raw.shape[0])
+    )
+    return (z > 0).astype(int)
+
+
+def build_standin_bundle(n_train: int = 5000, n_estimators: int = 100, seed: int = 42):
+    """
+    Fit stand-in scalers, forest and logistic weights as a ModelBundle
+
+    Returns:
+        tuple: (bundle, raw training matrix, labels)
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+
+    raw = synthetic_matrix(n_train, seed)
+    y = synthetic_labels(raw, seed)
+
+    bmi = raw[:, 3] / ((raw[:, 2] / 100) ** 2)
+    smoke, alco, age = raw[:, 8], raw[:, 9], raw[:, 0]
+    scalers = main.ModelBundle(
+        version=f"standin-{seed}", rf_model=None, rf_engine=None,
+        scaler_num=StandardScaler().fit(np.column_stack([age, raw[:, 4], raw[:, 5], bmi])),
+        scaler_int=StandardScaler().fit(np.column_stack([smoke * age, smoke * bmi, alco * age, alco * bmi])),
+        lr_weights=None, lr_bias=None, lr_engine=None,
+    )
+
+    features = main.preprocess_batch(raw, scalers)
+    rf_model = RandomForestClassifier(n_estimators=n_estimators, random_state=seed).fit(features, y)
+    lr = LogisticRegression(max_iter=1000).fit(features, y)
+    lr_weights, lr_bias = lr.coef_[0].copy(), lr.intercept_.copy()
+
+    bundle = dataclasses.replace(
+        scalers,
+        rf_model=rf_model,
+        rf_engine=main.build_forest_engine(rf_model),
+        lr_weights=lr_weights,
+        lr_bias=lr_bias,
+        lr_engine=main.FusedLogistic.from_params(scalers.scaler_num, scalers.scaler_int, lr_weights, lr_bias),
+    )
+    return bundle, raw, y
+
+
+def install_standin_models(n_train: int = 5000, n_estimators: int = 100, seed: int = 42):
+    """Fit stand-in models and make them ``main``'s active model bundle"""
+    bundle, raw, y = build_standin_bundle(n_train, n_estimators, seed)
+    main.model_registry.activate(bundle, reason="standin")
+    return raw, y
+
+
+def write_standin_artifacts(dest_dir: str, **kwargs) -> dict:
+    """
+    Fit stand-in models and save them under the MODEL_FILES names
+
+    Returns the artifacts' manifest, so the directory can act as a local
+    Hugging Face mirror for offline startup.
+    """
+    import joblib
+
+    import artifacts
+
+    bundle, _, _ = build_standin_bundle(**kwargs)
+    os.makedirs(dest_dir, exist_ok=True)
+    joblib.dump(bundle.rf_model, os.path.join(dest_dir, "random_forest_model.pkl"))
+    joblib.dump(bundle.scaler_int, os.path.join(dest_dir, "scaler_int.pkl"))
+    joblib.dump(bundle.scaler_num, os.path.join(dest_dir, "scaler_num.pkl"))
+    np.save(os.path.join(dest_dir, "logistic_weights.npy"), bundle.lr_weights)
+    np.save(os.path.join(dest_dir, "logistic_bias.npy"), bundle.lr_bias)
+    return artifacts.build_manifest(dest_dir)
+
+
+def start_api(env: dict, port: int = 8765, ready=None, timeout: float = 120) -> subprocess.Popen:
+    """
+    Run the API under uvicorn in a subprocess and wait until it serves
+
+    Args:
+        env: Environment overrides (MODEL_BASE_URL, MODEL_OFFLINE, ...)
+        port: Local port to listen on
+        ready: Predicate on the /health JSON; default: models are loaded
+        timeout: Seconds to wait before giving up
+    """
+    import requests
+
+    ready = ready or (lambda health: health["models_loaded"])
+    server = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=APP_DIR, env={**os.environ, **env}, stdout=subprocess.DEVNULL,
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if ready(requests.get(f"http://127.0.0.1:{port}/health", timeout=1).json()):
+                return server
+        except requests.RequestException:
+            pass
+        if server.poll() is not None:
+            break
+        time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("API did not start")
+
+
+def stop_api(server: subprocess.Popen) -> None:
+    server.terminate()
+    server.wait(30)
+
+
+def http_load(url: str, payloads: list, concurrency: int, seconds: float) -> dict:
+    """
+    POST ``payloads`` round-robin to ``url`` from ``concurrency`` client threads for ``seconds``
+
+    Returns:
+        dict: rps (requests/second), p50_ms, p99_ms; fails on any non-200 response
+    """
+    import threading
+
+    import requests
+
+    stop = threading.Event()
+    samples = [[] for _ in range(concurrency)]
+    errors = []
+
+    def client(slot):
+        session = requests.Session()
+        i = slot
+        while not stop.is_set():
+            start = time.perf_counter()
+            r = session.post(url, json=payloads[i % len(payloads)])
+            samples[slot].append(time.perf_counter() - start)
+            if r.status_code != 200:
+                errors.append(r.status_code)
+            i += concurrency
+
+    threads = [threading.Thread(target=client, args=(slot,)) for slot in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert not errors, f"{len(errors)} failed requests, e.g. HTTP {errors[0]}"
+    latencies = np.concatenate([np.asarray(s) for s in samples]) * 1000
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return {"rps": len(latencies) / seconds, "p50_ms": p50, "p99_ms": p99}
+
+
+def latency_percentiles(fn, calls: int, warmup: int = 5) -> dict:
+    """p50/p99 wall-clock latency of ``fn`` in milliseconds over ``calls`` calls"""
+    for _ in range(warmup):
+        fn()
+    samples = np.empty(calls)
+    for i in range(calls):
+        start = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - start
+    p50, p99 = np.percentile(samples * 1000, [50, 99])
+    return {"p50_ms": p50, "p99_ms": p99}
+
+
+def rows_per_second(fn, rows: int, repeat: int = 3) -> float:
+    """Best-of-``repeat`` throughput of ``fn`` which scores ``rows`` rows per call"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return rows / best
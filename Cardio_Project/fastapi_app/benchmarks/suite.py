@@ -0,0 +1,345 @@
+"""
+Reproducible benchmark suite with JSON baselines and a regression gate.
+
+Runs fully offline: synthetic cardio-shaped patients, stand-in models fit
+with fixed seeds, the in-memory email stub instead of Resend
+(EMAIL_BACKEND=stub) and an in-process HTTP client (httpx over ASGI, no
+sockets). The prediction cache is off so every request is scored.
+
+  micro  preprocess, sigmoid, the forest and logistic scoring paths (one
+         row and 10k rows) and generate_pdf_report: ops or rows/second,
+         p50/p99 per call
+  http   /predict/randomforest, /predict/logistic, /predict/compare,
+         /predict/batch (100 rows) and /send-report under concurrent load:
+         requests/second, p50/p99
+
+Every benchmark runs in rounds and keeps its fastest, which sheds most of
+the noise from other processes on the machine.
+
+``run`` writes the results and the environment they were measured in as
+JSON; ``compare`` exits 1 when any benchmark lost more throughput or
+gained more p99 latency than the thresholds allow.
+
+    python benchmarks/suite.py run [-o results.json] [--quick] [--only micro|http]
+    python benchmarks/suite.py compare baseline.json results.json
+        [--throughput-threshold 10] [--p99-threshold 25]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+os.environ["EMAIL_BACKEND"] = "stub"
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+import sklearn  # noqa: E402
+
+from common import APP_DIR, install_standin_models, synthetic_matrix, synthetic_patients  # noqa: E402
+
+import main  # noqa: E402
+import reports  # noqa: E402
+from cache import PredictionCache  # noqa: E402
+
+FORMAT_VERSION = 1
+# Environment fields that make two result files comparable
+ENVIRONMENT_KEYS = ("python", "numpy", "sklearn", "platform", "machine", "cpus")
+
+FULL = {"calls": 2000, "rows": 10_000, "reports": 100, "rounds": 3, "seconds": 2.0, "concurrency": 8}
+QUICK = {"calls": 200, "rows": 2000, "reports": 10, "rounds": 1, "seconds": 1.0, "concurrency": 4}
+
+
+# --------------------------------------------------
+# MEASUREMENT
+# --------------------------------------------------
+
+def summarize(samples: np.ndarray, rows: int, unit: str) -> dict:
+    """Throughput and p50/p99 per call from per-call wall-clock seconds"""
+    p50, p99 = np.percentile(samples * 1000, [50, 99])
+    return {"throughput": rows * len(samples) / samples.sum(), "unit": unit, "p50_ms": p50, "p99_ms": p99}
+
+
+def measure(fn, calls: int, rows: int = 1, rounds: int = 3, unit: str = "ops/s") -> dict:
+    """Time ``calls`` calls of ``fn`` (``rows`` rows each); best of ``rounds``"""
+    for _ in range(min(calls, 5)):
+        fn()
+    best = None
+    for _ in range(rounds):
+        samples = np.empty(calls)
+        for i in range(calls):
+            start = time.perf_counter()
+            fn()
+            samples[i] = time.perf_counter() - start
+        result = summarize(samples, rows, unit)
+        if best is None or result["throughput"] > best["throughput"]:
+            best = result
+    return best
+
+
+async def http_load(client: httpx.AsyncClient, path: str, payloads: list, concurrency: int,
+                    seconds: float) -> dict:
+    """POST ``payloads`` round-robin to ``path`` from ``concurrency`` tasks for ``seconds``"""
+    for payload in payloads[:concurrency]:
+        await client.post(path, json=payload)
+
+    samples, errors = [], []
+    deadline = time.perf_counter() + seconds
+
+    async def worker(slot):
+        i = slot
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            r = await client.post(path, json=payloads[i % len(payloads)])
+            samples.append(time.perf_counter() - start)
+            if r.status_code >= 400:
+                errors.append(r.status_code)
+            i += concurrency
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(slot) for slot in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise RuntimeError(f"{path}: {len(errors)} failed requests, e.g. HTTP {errors[0]}")
+
+    latencies = np.asarray(samples) * 1000
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return {"throughput": len(samples) / elapsed, "unit": "req/s", "p50_ms": p50, "p99_ms": p99,
+            "requests": len(samples), "concurrency": concurrency}
+
+
+# --------------------------------------------------
+# BENCHMARKS
+# --------------------------------------------------
+
+def micro_benchmarks(config: dict) -> dict:
+    calls, n, rounds = config["calls"], config["rows"], config["rounds"]
+    patient = main.PatientData(**synthetic_patients(1, seed=1)[0])
+    raw_one = main.patients_to_array([patient])
+    raw = synthetic_matrix(n, seed=2)
+    features_one = main.preprocess(patient)
+    features = main.preprocess_batch(raw)
+    z = np.random.default_rng(3).normal(0, 3, n)
+    prediction = main.PredictionResult(risk_level="High Risk", probability=0.71)
+
+    rows = f"{n // 1000}k" if n % 1000 == 0 else str(n)
+    bulk_calls = max(calls // 100, 10)
+    cases = {
+        "preprocess/1": (lambda: main.preprocess(patient), calls, 1),
+        f"preprocess/{rows}": (lambda: main.preprocess_batch(raw), bulk_calls, n),
+        f"sigmoid/{rows}": (lambda: main.sigmoid(z), calls, n),
+        "forest/1": (lambda: main.score_random_forest(features_one), calls, 1),
+        f"forest/{rows}": (lambda: main.score_random_forest(features), bulk_calls, n),
+        "logistic/1": (lambda: main.score_logistic(raw_one), calls, 1),
+        f"logistic/{rows}": (lambda: main.score_logistic(raw), bulk_calls, n),
+        "pdf_report": (lambda: main.generate_pdf_report("Jane Doe", patient, "compare", prediction),
+                       max(calls // 20, 10), 1),
+    }
+    results = {}
+    for name, (fn, n_calls, n_rows) in cases.items():
+        unit = "rows/s" if n_rows > 1 else "ops/s"
+        results[name] = measure(fn, n_calls, rows=n_rows, rounds=rounds, unit=unit)
+        print_result(f"micro/{name}", results[name])
+    return results
+
+
+def report_payload(patient: dict, i: int) -> dict:
+    return {
+        "to_email": f"patient{i}@example.com",
+        "patient_name": f"Patient {i}",
+        "patient_data": patient,
+        "model_type": "compare",
+        "prediction_result": {"risk_level": "High Risk", "probability": 0.71},
+    }
+
+
+async def http_benchmarks(config: dict) -> dict:
+    patients = synthetic_patients(1000, seed=4)
+    batches = [{"patients": patients[i:i + 100], "model": "compare"} for i in range(0, len(patients), 100)]
+    cases = {
+        "/predict/randomforest": patients,
+        "/predict/logistic": patients,
+        "/predict/compare": patients,
+        "/predict/batch": batches,
+    }
+    concurrency, seconds = config["concurrency"], config["seconds"]
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://suite") as client:
+        for path, payloads in cases.items():
+            rounds = [await http_load(client, path, payloads, concurrency, seconds) for _ in range(config["rounds"])]
+            results[path] = max(rounds, key=lambda r: r["throughput"])
+            print_result(f"http{path}", results[path])
+
+        # Reports: the queue is sized so nothing is rejected; the delivery rate
+        # (PDF + stub send in the report workers) is recorded next to it
+        pipeline = main.report_pipeline = reports.ReportPipeline(
+            main.deliver_report, workers=main.REPORT_WORKERS, max_queue=1_000_000
+        )
+        payloads = [report_payload(p, i) for i, p in enumerate(patients[:config["reports"]])]
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            result = await http_load(client, "/send-report", payloads, concurrency, seconds)
+            pipeline.join(300)
+        stats = pipeline.stats()
+        if stats.get("failed"):
+            raise RuntimeError(f"/send-report: {stats['failed']} reports failed")
+        result["delivered_per_s"] = (result["requests"] + concurrency) / (time.perf_counter() - start)
+        results["/send-report"] = result
+        print_result("http/send-report", result)
+    return results
+
+
+# --------------------------------------------------
+# RESULTS
+# --------------------------------------------------
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.system(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def print_result(name: str, result: dict) -> None:
+    print(f"{name:<32}{result['throughput']:>14,.0f} {result['unit']:<7}"
+          f"p50 {result['p50_ms']:>9.4f} ms   p99 {result['p99_ms']:>9.4f} ms")
+
+
+def run(args) -> dict:
+    config = dict(QUICK if args.quick else FULL)
+    if args.rounds:
+        config["rounds"] = args.rounds
+    install_standin_models()
+    main.prediction_cache = PredictionCache(max_entries=0)
+
+    benchmarks = {}
+    if args.only in (None, "micro"):
+        benchmarks.update({f"micro/{k}": v for k, v in micro_benchmarks(config).items()})
+    if args.only in (None, "http"):
+        benchmarks.update({f"http{k}": v for k, v in asyncio.run(http_benchmarks(config)).items()})
+
+    results = {
+        "format": FORMAT_VERSION,
+        "environment": environment(),
+        "config": {"quick": args.quick, **config},
+        "benchmarks": {name: {k: round(v, 6) if isinstance(v, float) else v for k, v in r.items()}
+                       for name, r in benchmarks.items()},
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n[OK] Results written to {args.output}")
+    return results
+
+
+def change(before: float, after: float) -> float:
+    """Relative change in percent"""
+    return (after - before) / before * 100 if before else 0.0
+
+
+def compare(baseline: dict, current: dict, throughput_threshold: float, p99_threshold: float) -> list:
+    """
+    Benchmarks that got worse than the thresholds allow
+
+    Returns:
+        list: (benchmark, message) per regression
+    """
+    before_env, after_env = baseline.get("environment", {}), current.get("environment", {})
+    differs = [k for k in ENVIRONMENT_KEYS if before_env.get(k) != after_env.get(k)]
+    if differs:
+        print("[WARN] Results come from different environments: " +
+              ", ".join(f"{k} {before_env.get(k)} -> {after_env.get(k)}" for k in differs))
+    if baseline.get("config") != current.get("config"):
+        print("[WARN] Results were measured with different settings; compare like with like (--quick)")
+
+    regressions = []
+    print(f"\n{'benchmark':<32}{'throughput':>12}{'change':>9}{'p99 ms':>12}{'change':>9}")
+    for name, before in baseline["benchmarks"].items():
+        after = current["benchmarks"].get(name)
+        if after is None:
+            print(f"{name:<32}{'missing':>12}")
+            continue
+        throughput = change(before["throughput"], after["throughput"])
+        p99 = change(before["p99_ms"], after["p99_ms"])
+        flags = []
+        if -throughput > throughput_threshold:
+            flags.append(f"throughput {throughput:+.1f}%")
+        if p99 > p99_threshold:
+            flags.append(f"p99 {p99:+.1f}%")
+        print(f"{name:<32}{after['throughput']:>12,.0f}{throughput:>+8.1f}%{after['p99_ms']:>12.4f}{p99:>+8.1f}%"
+              f"{'  REGRESSION' if flags else ''}")
+        if flags:
+            regressions.append((name, ", ".join(flags)))
+    for name in current["benchmarks"].keys() - baseline["benchmarks"].keys():
+        print(f"{name:<32}{'new':>12}")
+    return regressions
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        results = json.load(f)
+    if results.get("format") != FORMAT_VERSION:
+        raise SystemExit(f"[ERROR] {path} is not a benchmark suite result (format {FORMAT_VERSION})")
+    return results
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmark suite and regression gate")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("-o", "--output", help="Write the results as JSON")
+    run_parser.add_argument("--quick", action="store_true", help="Fewer calls and shorter load (smoke test)")
+    run_parser.add_argument("--rounds", type=int, help="Rounds per benchmark, best kept (default 3, quick 1)")
+    run_parser.add_argument("--only", choices=("micro", "http"), help="Run one group")
+    run_parser.add_argument("--compare", metavar="BASELINE", help="Compare with a baseline afterwards")
+
+    compare_parser = commands.add_parser("compare", help="Fail when results regress against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+
+    for p in (run_parser, compare_parser):
+        p.add_argument("--throughput-threshold", type=float, default=10.0,
+                       help="Allowed throughput loss in percent (default 10)")
+        p.add_argument("--p99-threshold", type=float, default=25.0,
+                       help="Allowed p99 latency increase in percent (default 25)")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        current = run(args)
+        if not args.compare:
+            return 0
+        baseline = load(args.compare)
+    else:
+        baseline, current = load(args.baseline), load(args.current)
+
+    regressions = compare(baseline, current, args.throughput_threshold, args.p99_threshold)
+    if regressions:
+        print(f"\n[FAIL] {len(regressions)} regression(s) beyond -{args.throughput_threshold:g}% "
+              f"throughput / +{args.p99_threshold:g}% p99:")
+        for name, message in regressions:
+            print(f"  {name}: {message}")
+        return 1
+    print("\n[OK] No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,199 @@
+"""
+Chunked CSV / NDJSON bulk scoring.
+
+Input is read in fixed-size chunks and every scored chunk is written out
+before the next one is read, so memory stays flat regardless of file size.
+Used by the /predict/stream endpoint and as a command-line tool:
+
+    python bulk.py cardio_extract.csv -o scores.csv --age-unit days
+"""
+
+import argparse
+import csv
+import io
+import sys
+import time
+from itertools import islice
+from typing import Callable, Iterator, List, NamedTuple, Optional, TextIO
+
+import orjson
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FORMATS = ("csv", "ndjson")
+DEFAULT_CHUNK_SIZE = 5_000
+
+# Flat output columns per model, shared by the CSV and NDJSON writers
+OUTPUT_COLUMNS = {
+    "randomforest": ["row", "id", "rf_probability", "rf_prediction", "error"],
+    "logistic": ["row", "id", "lr_probability", "lr_prediction", "error"],
+    "compare": ["row", "id", "rf_probability", "rf_prediction",
+                "lr_probability", "lr_prediction", "error"],
+}
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class UnreadableRow(NamedTuple):
+    """Stands in for an input line that could not be parsed; scored as an invalid row with ``error``"""
+    error: str
+
+
+def _ndjson_rows(stream: TextIO) -> Iterator:
+    for line in stream:
+        if line.strip():
+            try:
+                yield orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                yield UnreadableRow(f"Invalid JSON: {e}")
+
+
+def detect_format(filename: Optional[str]) -> str:
+    """Guess csv/ndjson from a file name, defaulting to csv"""
+    if filename and filename.lower().endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    return "csv"
+
+
+def read_chunks(stream: TextIO, fmt: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[dict]]:
+    """
+    Yield lists of at most ``chunk_size`` raw row dicts
+
+    CSV input needs a header row; both ``;`` (as in cardio_train.csv) and
+    ``,`` delimiters are accepted. An NDJSON line that is not valid JSON
+    comes back as an ``UnreadableRow`` so it is reported like any invalid row.
+    """
+    if fmt == "csv":
+        header = stream.readline()
+        delimiter = ";" if header.count(";") > header.count(",") else ","
+        fieldnames = [name.strip() for name in next(csv.reader([header], delimiter=delimiter))]
+        rows = csv.DictReader(stream, fieldnames=fieldnames, delimiter=delimiter)
+    elif fmt == "ndjson":
+        rows = _ndjson_rows(stream)
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def format_records(records: List[dict], fmt: str, columns: List[str], header: bool = False) -> str:
+    """Serialize scored records to CSV or NDJSON text"""
+    if fmt == "ndjson":
+        return b"".join(
+            orjson.dumps({k: r[k] for k in columns if r.get(k) is not None}, option=orjson.OPT_APPEND_NEWLINE)
+            for r in records
+        ).decode()
+
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=columns, extrasaction="ignore", lineterminator="\n")
+    if header:
+        writer.writeheader()
+    writer.writerows(records)
+    return out.getvalue()
+
+
+def stream_scores(stream: TextIO, fmt: str, model: str,
+                  score_chunk: Callable[..., List[dict]],
+                  chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  age_unit: str = "years",
+                  stats: Optional[dict] = None) -> Iterator[str]:
+    """
+    Read, score and serialize ``stream`` chunk by chunk
+
+    Args:
+        stream: Text stream with CSV or NDJSON patient rows
+        fmt: Input and output format, csv or ndjson
+        model: randomforest, logistic or compare
+        score_chunk: Callable(rows, offset, model, age_unit) -> records
+        chunk_size: Rows held in memory at once
+        age_unit: Unit of the age column, years or days
+        stats: Optional dict updated with rows, errors and seconds
+
+    Yields:
+        str: Serialized output for one chunk
+    """
+    stats = stats if stats is not None else {}
+    stats.update(rows=0, errors=0, seconds=0.0)
+    columns = OUTPUT_COLUMNS[model]
+    start = time.perf_counter()
+
+    for chunk in read_chunks(stream, fmt, chunk_size):
+        records = score_chunk(chunk, stats["rows"], model, age_unit)
+        yield format_records(records, fmt, columns, header=stats["rows"] == 0)
+
+        stats["rows"] += len(records)
+        stats["errors"] += sum(1 for r in records if r.get("error"))
+        stats["seconds"] = time.perf_counter() - start
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB, if the platform reports it"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def score_file(input_path: str, output_path: str, fmt: str, model: str,
+               score_chunk: Callable[..., List[dict]],
+               chunk_size: int = DEFAULT_CHUNK_SIZE,
+               age_unit: str = "years") -> dict:
+    """Score ``input_path`` into ``output_path`` ('-' for stdin/stdout) and return run stats"""
+    source = sys.stdin if input_path == "-" else open(input_path, newline="", encoding="utf-8")
+    sink = sys.stdout if output_path == "-" else open(output_path, "w", newline="", encoding="utf-8")
+    stats = {}
+
+    try:
+        for text in stream_scores(source, fmt, model, score_chunk, chunk_size, age_unit, stats):
+            sink.write(text)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+    stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    stats["peak_rss_mb"] = peak_rss_mb()
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Score a CSV/NDJSON patient extract in bounded memory")
+    parser.add_argument("input", help="Input file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="Output file, or - for stdout (default)")
+    parser.add_argument("--format", choices=FORMATS, help="Input/output format (default: from file extension)")
+    parser.add_argument("--model", choices=sorted(OUTPUT_COLUMNS), default="compare")
+    parser.add_argument("--age-unit", choices=("years", "days"), default="years",
+                        help="Unit of the age column; cardio_train.csv uses days")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    # Imported here so the API can import this module without a cycle
+    import main as app
+
+    app.load_models()
+    stats = score_file(
+        args.input, args.output, args.format or detect_format(args.input),
+        args.model, app.score_chunk, args.chunk_size, args.age_unit,
+    )
+
+    print(
+        f"[BULK] Scored {stats['rows']} rows ({stats['errors']} invalid) in {stats['seconds']:.2f}s "
+        f"- {stats['rows_per_second']:,.0f} rows/s, peak RSS {stats['peak_rss_mb'] or 0:.0f} MB",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""
+Columnar binary payloads for high-volume scoring clients.
+
+``/predict/columnar`` takes the 11 PatientData columns as an Apache Arrow
+IPC stream, a ``.npy`` array or a msgpack map, and answers in the format it
+was sent. A payload is decoded straight into one (N, 11) float matrix and
+checked column-wise by ``validation.ColumnValidator``, so no per-row dict
+or model instance is built. Rows that fail a check are reported in the
+``error`` output column and the rest are scored.
+
+pyarrow (in requirements.txt) or msgpack may still be missing from a slim
+install. Without them only ``.npy`` is served.
+"""
+
+import io
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Response media type per format
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "npy": "application/x-npy",
+    "msgpack": "application/msgpack",
+}
+
+# Request Content-Types accepted for each format, including common aliases
+CONTENT_TYPES = {
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/vnd.apache.arrow.file": "arrow",
+    "application/x-npy": "npy",
+    "application/msgpack": "msgpack",
+    "application/x-msgpack": "msgpack",
+    "application/vnd.msgpack": "msgpack",
+}
+
+# Package a format needs on the server
+DEPENDENCIES = {"arrow": "pyarrow", "msgpack": "msgpack"}
+
+ARROW_FILE_MAGIC = b"ARROW1"
+NPY_MAGIC = b"\x93NUMPY"
+
+def format_for(content_type: Optional[str]) -> Optional[str]:
+    """Format name for a request Content-Type header, or None if unsupported"""
+    if not content_type:
+        return None
+    return CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+
+
+def available(fmt: str) -> bool:
+    """Whether the package ``fmt`` needs is installed"""
+    return {"arrow": pa, "msgpack": msgpack}.get(fmt, np) is not None
+
+
+# --------------------------------------------------
+# DECODING
+# --------------------------------------------------
+
+def decode(body: bytes, fmt: str, columns: Sequence[str]) -> np.ndarray:
+    """
+    Decode a columnar payload into an (N, len(columns)) float64 matrix
+
+    Extra columns are ignored; nulls become NaN and fail validation.
+
+    Raises:
+        ValueError: The payload is malformed, empty or lacks one of ``columns``
+    """
+    if not body:
+        raise ValueError("Empty request body")
+    if fmt == "npy":
+        raw = _decode_npy(body, columns)
+    elif fmt == "arrow":
+        raw = _decode_arrow(body, columns)
+    elif fmt == "msgpack":
+        raw = _decode_msgpack(body, columns)
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+    if raw.shape[0] == 0:
+        raise ValueError("Payload has no rows")
+    return raw
+
+
+def _stack(named: Dict[str, np.ndarray], columns: Sequence[str]) -> np.ndarray:
+    missing = [name for name in columns if name not in named]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    lengths = {len(named[name]) for name in columns}
+    if len(lengths) > 1:
+        raise ValueError("Columns have different lengths")
+
+    raw = np.empty((lengths.pop(), len(columns)), dtype=np.float64)
+    for i, name in enumerate(columns):
+        raw[:, i] = named[name]
+    return raw
+
+
+def _decode_npy(body: bytes, columns: Sequence[str]) -> np.ndarray:
+    # Structured array with named fields, or a plain (N, 11) matrix in column order
+    if not body.startswith(NPY_MAGIC):
+        raise ValueError("Malformed .npy payload: missing the NUMPY header")
+    try:
+        array = np.load(io.BytesIO(body), allow_pickle=False)
+    except (ValueError, OSError, EOFError) as e:
+        raise ValueError(f"Malformed .npy payload: {e}") from None
+
+    try:
+        if array.dtype.names:
+            return _stack({name: array[name] for name in array.dtype.names}, columns)
+        if array.ndim == 2 and array.shape[1] == len(columns):
+            return array.astype(np.float64, copy=False)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Columns must be numeric: {e}") from None
+    raise ValueError(f"Expected a structured array or an (N, {len(columns)}) matrix, got shape {array.shape}")
+
+
+def _decode_arrow(body: bytes, columns: Sequence[str]) -> np.ndarray:
+    try:
+        buffer = pa.py_buffer(body)
+        if body[:len(ARROW_FILE_MAGIC)] == ARROW_FILE_MAGIC:
+            table = pa.ipc.open_file(buffer).read_all()
+        else:
+            table = pa.ipc.open_stream(buffer).read_all()
+        named = {
+            name: table.column(name).cast(pa.float64()).to_numpy()
+            for name in columns if name in table.column_names
+        }
+    except (pa.ArrowException, OSError) as e:
+        raise ValueError(f"Malformed Arrow payload: {e}") from None
+    return _stack(named, columns)
+
+
+def _decode_msgpack(body: bytes, columns: Sequence[str]) -> np.ndarray:
+    # {column: [values]} or {column: little-endian float64 bytes}
+    try:
+        payload = msgpack.unpackb(body, raw=False)
+    except (ValueError, msgpack.UnpackException) as e:
+        raise ValueError(f"Malformed msgpack payload: {e}") from None
+    if not isinstance(payload, dict):
+        raise ValueError("Expected a msgpack map of column name to values")
+
+    named = {}
+    for name in columns:
+        if name not in payload:
+            continue
+        values = payload[name]
+        try:
+            if isinstance(values, bytes):
+                named[name] = np.frombuffer(values, dtype="<f8")
+            else:
+                named[name] = np.array(values, dtype=np.float64)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Column {name} must be numeric: {e}") from None
+        if named[name].ndim != 1:
+            raise ValueError(f"Column {name} must be a flat list")
+    return _stack(named, columns)
+
+
+# --------------------------------------------------
+# ENCODING
+# --------------------------------------------------
+
+def encode(table: Dict[str, np.ndarray], errors: Dict[int, str], fmt: str) -> bytes:
+    """
+    Serialize result columns plus an ``error`` column in ``fmt``
+
+    Args:
+        table: Equal-length numeric result columns, in output order
+        errors: Error message per invalid row
+        fmt: arrow, npy or msgpack
+
+    Returns:
+        bytes: Response body; valid rows have a null (empty for .npy) error
+    """
+    n = len(next(iter(table.values())))
+    if fmt == "npy":
+        width = max(map(len, errors.values()), default=1)
+        out = np.zeros(n, dtype=[*((name, col.dtype) for name, col in table.items()), ("error", f"U{width}")])
+        for name, col in table.items():
+            out[name] = col
+        for row, message in errors.items():
+            out["error"][row] = message
+        buffer = io.BytesIO()
+        np.save(buffer, out, allow_pickle=False)
+        return buffer.getvalue()
+
+    error_column = [None] * n
+    for row, message in errors.items():
+        error_column[row] = message
+
+    if fmt == "arrow":
+        arrays = [pa.array(col) for col in table.values()] + [pa.array(error_column, type=pa.string())]
+        result = pa.Table.from_arrays(arrays, names=[*table, "error"])
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, result.schema) as writer:
+            writer.write_table(result)
+        return sink.getvalue().to_pybytes()
+
+    if fmt == "msgpack":
+        return msgpack.packb({**{name: col.tolist() for name, col in table.items()}, "error": error_column})
+
+    raise ValueError(f"Unsupported format: {fmt}")
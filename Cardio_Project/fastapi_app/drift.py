@@ -0,0 +1,317 @@
+"""
+Streaming input-drift monitor.
+
+Compares the patients the API scores with the training population the
+serving models were fit on. The training statistics come for free: the
+scalers hold the mean and standard deviation of every numerical and
+interaction feature. Per feature the monitor keeps a few fixed-size
+sketches of the live inputs, so memory does not grow with traffic:
+
+  numeric      count, mean and sum of squared deviations (merged batch by
+               batch, Chan et al.) and a histogram over fixed bins
+  categorical  counts per level (cholesterol, gluc, smoke, alco, active)
+
+and reports per feature:
+
+  z_shift      (live mean - training mean) / training std
+  psi          population stability index of the live histogram against a
+               reference: a normal with the training mean/std (for features
+               that are roughly normal), or a baseline window frozen with
+               ``reset(baseline=True)``
+
+The bins are the training normal's deciles, so under no drift each holds
+about a tenth of the rows.
+
+Recording stays off the request path: ``observe`` only appends the raw
+patient matrix (or a validated patient object) to a bounded deque, a
+lock-free operation. A background thread folds the queued rows into the
+sketches once ``fold_items`` are waiting or every ``fold_interval``
+seconds, and ``report`` folds whatever is left before reading. When the
+folder falls behind, the oldest queued inputs are dropped and counted.
+"""
+
+import threading
+import time
+from collections import deque
+from statistics import NormalDist
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Conventional PSI bands: below 0.1 no shift, up to 0.25 moderate, above significant
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+# Empty bins are floored to this share so PSI stays finite
+PSI_FLOOR = 1e-4
+
+
+def normal_quantiles(bins: int) -> np.ndarray:
+    """The bins - 1 inner bin edges, in standard deviations: quantiles k/bins of the standard normal"""
+    return np.array([NormalDist().inv_cdf(k / bins) for k in range(1, bins)])
+
+
+def psi(actual: np.ndarray, expected: np.ndarray) -> np.ndarray:
+    """Population stability index per row of two (F, bins) count or share arrays"""
+    actual = np.maximum(actual / actual.sum(axis=1, keepdims=True), PSI_FLOOR)
+    expected = np.maximum(expected / expected.sum(axis=1, keepdims=True), PSI_FLOOR)
+    return ((actual - expected) * np.log(actual / expected)).sum(axis=1)
+
+
+def drift_level(value: Optional[float]) -> Optional[str]:
+    if value is None:
+        return None
+    if value >= PSI_SIGNIFICANT:
+        return "significant"
+    return "moderate" if value >= PSI_MODERATE else "none"
+
+
+def _rounded(value, digits: int = 4):
+    return None if value is None or not np.isfinite(value) else round(float(value), digits)
+
+
+class DriftMonitor:
+    """Fixed-memory sketches of the scored inputs, compared with the training statistics"""
+
+    def __init__(self, numeric: Sequence[str], categories: Dict[str, Sequence[int]],
+                 extract: Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]],
+                 to_matrix: Callable[[list], np.ndarray], bins: int = 10,
+                 fold_items: int = 256, max_pending: int = 10_000, fold_interval: float = 1.0,
+                 min_rows: int = 1000):
+        """
+        Args:
+            numeric: Names of the numeric features, in ``extract`` column order
+            categories: Categorical feature -> its levels, in ``extract`` column order
+            extract: Raw (N, 11) patient matrix -> ((N, len(numeric)), (N, len(categories))) features
+            to_matrix: List of queued patient objects -> raw patient matrix
+            bins: Histogram bins per numeric feature
+            fold_items: Queued inputs that wake the folder thread early
+            max_pending: Queued inputs kept before the oldest are dropped
+            fold_interval: Seconds between folds when traffic is light
+            min_rows: Rows a window needs before features are labelled drifting; PSI of a
+                small sample is noisy (about (bins - 1) / rows even without a shift)
+        """
+        self.numeric = tuple(numeric)
+        self.categories = {name: np.asarray(levels) for name, levels in categories.items()}
+        self.extract = extract
+        self.to_matrix = to_matrix
+        self.bins = bins
+        self.fold_items = fold_items
+        self.fold_interval = fold_interval
+        self.min_rows = min_rows
+        self._edges = normal_quantiles(bins)
+        self._bin_offsets = np.arange(len(self.numeric)) * bins
+
+        # Offsets of each categorical feature's levels in the flat count array
+        sizes = [len(levels) for levels in self.categories.values()]
+        self._level_offsets = np.cumsum([0] + sizes[:-1])
+        self._n_levels = sum(sizes)
+
+        self._pending: deque = deque(maxlen=max_pending)
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        self.version: Optional[str] = None
+        self._reference = None
+        self._baseline = None
+        self._reset_window()
+
+    # --------------------------------------------------
+    # REFERENCE / WINDOW
+    # --------------------------------------------------
+
+    def set_reference(self, mean: np.ndarray, std: np.ndarray, version: Optional[str] = None,
+                      normal: Optional[Sequence[bool]] = None) -> None:
+        """
+        Compare against new training statistics; clears the window, the baseline and queued inputs
+
+        Args:
+            mean: Training mean of each numeric feature
+            std: Training standard deviation of each numeric feature
+            version: Model version the statistics belong to
+            normal: Per numeric feature, whether PSI may use the training normal as reference
+                (default: all); the others get a PSI only against a baseline
+        """
+        mean = np.array(mean, dtype=np.float64)
+        std = np.array(std, dtype=np.float64)
+        std[~(std > 0)] = 1.0
+        normal = np.ones(len(self.numeric), dtype=bool) if normal is None else np.asarray(normal, dtype=bool)
+        with self._lock:
+            self._pending.clear()
+            self._reference = (mean, std, normal)
+            self._baseline = None
+            self.version = version
+            self._reset_window()
+        self._start()
+
+    def reset(self, baseline: bool = False) -> None:
+        """
+        Start a new window
+
+        Args:
+            baseline: Freeze the current window as the PSI reference for every feature first
+
+        Raises:
+            ValueError: ``baseline`` was requested for an empty window
+        """
+        self.fold()
+        with self._lock:
+            if baseline:
+                if not self._rows:
+                    raise ValueError("No inputs observed since the last reset; nothing to use as baseline")
+                self._baseline = (self._hist.copy(), self._levels.copy(), self._rows, self._since)
+            self._reset_window()
+
+    def _reset_window(self) -> None:
+        n = len(self.numeric)
+        self._since = time.time()
+        self._rows = 0
+        self._mean = np.zeros(n)
+        self._m2 = np.zeros(n)
+        self._hist = np.zeros((n, self.bins), dtype=np.int64)
+        self._levels = np.zeros(self._n_levels, dtype=np.int64)
+        self.dropped = 0
+
+    def _start(self) -> None:
+        # The folder starts with the first reference, so importing the app spawns no threads
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="drift-monitor", daemon=True)
+            self._thread.start()
+
+    # --------------------------------------------------
+    # RECORDING
+    # --------------------------------------------------
+
+    def observe(self, rows) -> None:
+        """
+        Queue scored inputs: a raw (N, 11) patient matrix or one patient object
+
+        Lock-free and O(1); a no-op until ``set_reference``. The matrix must
+        not be modified afterwards.
+        """
+        if self._reference is None:
+            return
+        pending = self._pending
+        if len(pending) == pending.maxlen:
+            # The append below evicts the oldest input; unlocked, so the count is approximate
+            self.dropped += 1
+        pending.append(rows)
+        if len(pending) >= self.fold_items and not self._wake.is_set():
+            self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.fold_interval)
+            self._wake.clear()
+            try:
+                self.fold()
+            except Exception as e:
+                print(f"[DRIFT] Could not fold inputs: {e}")
+
+    def fold(self) -> int:
+        """Merge the queued inputs into the sketches; returns the rows merged"""
+        with self._lock:
+            items = []
+            while True:
+                try:
+                    items.append(self._pending.popleft())
+                except IndexError:
+                    break
+            if not items or self._reference is None:
+                return 0
+
+            matrices = [item for item in items if isinstance(item, np.ndarray) and len(item)]
+            patients = [item for item in items if not isinstance(item, np.ndarray)]
+            if patients:
+                matrices.append(self.to_matrix(patients))
+            if not matrices:
+                return 0
+            raw = matrices[0] if len(matrices) == 1 else np.concatenate(matrices)
+            self._merge(*self.extract(raw))
+            return len(raw)
+
+    def _merge(self, numeric: np.ndarray, categorical: np.ndarray) -> None:
+        n = len(numeric)
+        mean = numeric.mean(axis=0)
+        m2 = ((numeric - mean) ** 2).sum(axis=0)
+        total = self._rows + n
+        delta = mean - self._mean
+        self._mean += delta * (n / total)
+        self._m2 += m2 + delta ** 2 * (self._rows * n / total)
+        self._rows = total
+
+        # Bin on the training z-score, every feature in one pass
+        train_mean, train_std, _ = self._reference
+        bins = np.searchsorted(self._edges, (numeric - train_mean) / train_std) + self._bin_offsets
+        self._hist += np.bincount(bins.ravel(), minlength=self._hist.size).reshape(self._hist.shape)
+        for j, levels in enumerate(self.categories.values()):
+            index = np.clip(np.searchsorted(levels, categorical[:, j]), 0, len(levels) - 1)
+            known = levels[index] == categorical[:, j]
+            offset = self._level_offsets[j]
+            self._levels[offset:offset + len(levels)] += np.bincount(index[known], minlength=len(levels))
+
+    # --------------------------------------------------
+    # SCORES
+    # --------------------------------------------------
+
+    def report(self) -> dict:
+        """Per-feature z-shift and PSI of the current window, after folding queued inputs"""
+        self.fold()
+        with self._lock:
+            if self._reference is None:
+                return {"enabled": False}
+            train_mean, train_std, normal = self._reference
+            rows = self._rows
+            baseline = self._baseline
+            level = drift_level if rows >= self.min_rows else lambda value: None
+
+            std = np.sqrt(self._m2 / rows) if rows else np.full(len(self.numeric), np.nan)
+            numeric_psi = np.full(len(self.numeric), np.nan)
+            if rows:
+                expected = baseline[0] if baseline else np.ones_like(self._hist)
+                numeric_psi = psi(self._hist, expected)
+                if not baseline:
+                    numeric_psi[~normal] = np.nan
+
+            features = {}
+            for j, name in enumerate(self.numeric):
+                value = _rounded(numeric_psi[j])
+                features[name] = {
+                    "mean": _rounded(self._mean[j]) if rows else None,
+                    "std": _rounded(std[j]),
+                    "train_mean": _rounded(train_mean[j]),
+                    "train_std": _rounded(train_std[j]),
+                    "z_shift": _rounded((self._mean[j] - train_mean[j]) / train_std[j]) if rows else None,
+                    "std_ratio": _rounded(std[j] / train_std[j]),
+                    "psi": value,
+                    "drift": level(value),
+                }
+
+            categories = {}
+            for j, (name, levels) in enumerate(self.categories.items()):
+                offset = self._level_offsets[j]
+                counts = self._levels[offset:offset + len(levels)]
+                value = None
+                if rows and baseline:
+                    value = _rounded(psi(counts[None], baseline[1][None, offset:offset + len(levels)])[0])
+                categories[name] = {
+                    "proportions": {
+                        str(level): _rounded(count / rows) if rows else None
+                        for level, count in zip(levels.tolist(), counts.tolist())
+                    },
+                    "psi": value,
+                    "drift": level(value),
+                }
+
+            return {
+                "enabled": True,
+                "model_version": self.version,
+                "since": self._since,
+                "rows": rows,
+                "dropped": self.dropped,
+                "reference": "baseline" if baseline else "training",
+                "baseline": {"rows": baseline[2], "since": baseline[3]} if baseline else None,
+                "thresholds": {"moderate": PSI_MODERATE, "significant": PSI_SIGNIFICANT, "min_rows": self.min_rows},
+                "features": features,
+                "categories": categories,
+            }
@@ -0,0 +1,120 @@
+"""
+Per-feature explanations of the forest and logistic predictions.
+
+Forest: tree-path contributions. Each tree node stores the positive rate
+of the training samples that reached it. As a row walks from the root to
+its leaf, every split moves that rate from the parent's value to the
+child's, and the change is credited to the split feature. Within a tree,
+root value plus credited changes equals the leaf value, so over the forest
+``base_value + contributions.sum() == probability`` exactly.
+``ForestExplainer`` walks all trees for all rows at once, like
+``FlatForest.apply``, and adds up each level's credits with one
+``bincount``. Explaining a batch costs about as much as scoring it.
+
+Logistic: the model is linear in the scaled features, so its log-odds
+decompose exactly. Through the scalers, each weight becomes an effect per
+original unit (per year, per mmHg, ...), applied to the distance from the
+scaler's mean: ``contribution = w / scale * (value - mean)``. That is the
+training mean for the numeric and interaction features (0 if a scaler was
+fit without centring). The categorical features are unscaled and count from
+0, so ``base_value`` is the intercept: the log-odds of a patient at the
+numeric training means with every categorical feature at 0, not of the
+average training patient.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+from forest_engine import FlatForest
+from logistic_engine import scaler_params
+
+# Columns of the preprocessed feature matrix (main.preprocess_batch)
+MODEL_FEATURES = (
+    "age", "ap_hi", "ap_lo", "bmi",
+    "cholesterol", "gluc", "smoke", "alco", "active",
+    "smoke_age", "smoke_bmi", "alco_age", "alco_bmi",
+)
+
+
+def feature_scaling(scaler_num, scaler_int) -> Tuple[np.ndarray, np.ndarray]:
+    """(mean, scale) of all 13 model features; the categorical ones are unscaled"""
+    num_mean, num_scale = scaler_params(scaler_num)
+    int_mean, int_scale = scaler_params(scaler_int)
+    mean = np.concatenate([num_mean, np.zeros(5), int_mean])
+    scale = np.concatenate([num_scale, np.ones(5), int_scale])
+    return mean, scale
+
+
+def original_units(features: np.ndarray, scaler_num, scaler_int) -> np.ndarray:
+    """Undo the scalers: model features in years, mmHg, kg/m2, ..."""
+    mean, scale = feature_scaling(scaler_num, scaler_int)
+    return features * scale + mean
+
+
+class ForestExplainer:
+    """Tree-path contributions over a flat forest's per-node positive rates"""
+
+    def __init__(self, forest: FlatForest):
+        self.forest = forest
+        # Every node's value is kept, not just the leaves'
+        self.base_value = float(forest.node_values(forest.roots).mean())
+
+    def contributions(self, X: np.ndarray) -> np.ndarray:
+        """
+        Contribution of each feature to each row's positive-class probability
+
+        Args:
+            X: (n_rows, n_features) model-ready feature matrix
+
+        Returns:
+            np.ndarray: (n_rows, n_features); ``base_value`` plus a row's sum is its probability
+        """
+        forest = self.forest
+        # Same float32 comparison as FlatForest.apply, so rows take the same paths
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        flat_X = X.ravel()
+        n_rows, n_features, n_trees = X.shape[0], X.shape[1], forest.n_trees
+
+        node = np.tile(forest.roots, n_rows)
+        row_base = np.repeat(np.arange(n_rows, dtype=np.intp) * n_features, n_trees)
+        totals = np.zeros(n_rows * n_features)
+        active = np.flatnonzero(~forest.is_leaf[node])
+
+        while active.size:
+            current = node[active]
+            slot = row_base[active] + forest.feature[current]
+            go_right = ~(flat_X[slot] <= forest.threshold[current])
+            child = forest.children[2 * current + go_right]
+            totals += np.bincount(
+                slot, weights=forest.node_values(child) - forest.node_values(current), minlength=totals.size
+            )
+            node[active] = child
+            active = active[~forest.is_leaf[child]]
+
+        totals /= n_trees
+        return totals.reshape(n_rows, n_features)
+
+
+class LogisticExplainer:
+    """Exact log-odds contributions of the logistic model, in original feature units"""
+
+    def __init__(self, scaler_num, scaler_int, weights, bias):
+        weights = np.asarray(weights, dtype=np.float64).ravel()
+        mean, scale = feature_scaling(scaler_num, scaler_int)
+        # Log-odds per original unit of each feature, measured from the scaler mean (0 for categoricals)
+        self.per_unit = weights / scale
+        self.reference = mean
+        self.base_value = float(np.asarray(bias).ravel()[0])
+
+    def contributions(self, values: np.ndarray) -> np.ndarray:
+        """
+        Log-odds contribution of each feature
+
+        Args:
+            values: (n_rows, 13) model features in original units (see ``original_units``)
+
+        Returns:
+            np.ndarray: (n_rows, 13); ``base_value`` plus a row's sum is its log-odds
+        """
+        return (values - self.reference) * self.per_unit
@@ -0,0 +1,316 @@
+"""
+Compact Random Forest artifact.
+
+``random_forest_model.pkl`` stores every sklearn node as an 80-byte record
+(int64 children and feature, float64 threshold, impurity and sample counts,
+float64 class counts). Scoring only needs the split and the positive rate,
+so the compact format keeps, per node:
+
+    feature      uint8 (uint16 past 255 features)
+    threshold    float32, rounded down; exact, since sklearn compares float32 inputs
+    children     int32 (left, right) pairs
+    is_leaf      bool
+    leaf_value   positive rate quantized to uint16 (or uint8 / float32)
+
+about 16 bytes per node, written with ``np.savez_compressed``. Optionally,
+subtrees whose leaves all predict within ``prune_tolerance`` of each other
+are collapsed into one leaf; at the default of 0 only subtrees that cannot
+change a prediction go.
+
+Every compaction is checked on a reference dataset: the compact forest's
+probabilities must stay within ``--tolerance`` of the original's or nothing
+is written. The result of the check is stored with the artifact.
+
+    python forest_compact.py models/ --reference ../Data/raw/cardio_train.csv
+
+Serve it with ``FOREST_ARTIFACT=compact``.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from forest_engine import FlatForest
+
+COMPACT_FILE = "random_forest_compact.npz"
+FORMAT_VERSION = 1
+VALUE_BITS = (8, 16, 32)
+
+# Default reference dataset for the accuracy check (age in days)
+DEFAULT_REFERENCE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "Data", "raw", "cardio_train.csv"
+)
+
+# Rows scored per call during the check, to bound the walkers' memory
+CHECK_CHUNK_ROWS = 10_000
+
+
+class GuardrailError(ValueError):
+    """The compacted forest's probabilities drift further from the original's than allowed"""
+
+
+# --------------------------------------------------
+# COMPACTION
+# --------------------------------------------------
+
+def _levels(forest: FlatForest, is_leaf: np.ndarray) -> List[np.ndarray]:
+    """Node ids reachable from the roots, one array per depth"""
+    levels = []
+    frontier = np.asarray(forest.roots, dtype=np.intp)
+    while frontier.size:
+        levels.append(frontier)
+        internal = frontier[~is_leaf[frontier]]
+        frontier = np.concatenate([forest.children[2 * internal], forest.children[2 * internal + 1]])
+    return levels
+
+
+def _collapsible(forest: FlatForest, tolerance: float) -> np.ndarray:
+    """Nodes whose subtree's leaf values all lie within ``tolerance`` of each other"""
+    values = forest.node_values(np.arange(forest.n_nodes))
+    lo, hi = values.copy(), values.copy()
+    # Bottom-up, one level at a time: a node's range covers both children's
+    for nodes in reversed(_levels(forest, forest.is_leaf)):
+        internal = nodes[~forest.is_leaf[nodes]]
+        left, right = forest.children[2 * internal], forest.children[2 * internal + 1]
+        lo[internal] = np.minimum(lo[left], lo[right])
+        hi[internal] = np.maximum(hi[left], hi[right])
+    return hi - lo <= tolerance
+
+
+def _float32_floor(threshold: np.ndarray) -> np.ndarray:
+    """Largest float32 <= each threshold: ``x <= t`` is unchanged for every float32 ``x``"""
+    rounded = threshold.astype(np.float32)
+    over = rounded.astype(np.float64) > threshold
+    rounded[over] = np.nextafter(rounded[over], np.float32(-np.inf))
+    return rounded
+
+
+def compact(forest: FlatForest, value_bits: int = 16, prune_tolerance: Optional[float] = 0.0) -> FlatForest:
+    """
+    Shrink a flat forest to narrow dtypes, optionally pruning redundant subtrees
+
+    Args:
+        forest: Forest to compact, e.g. ``FlatForest.from_sklearn(model)``
+        value_bits: 8 or 16 to quantize node values to integers, 32 for float32
+        prune_tolerance: Collapse subtrees whose leaf values span at most this
+            much; the new leaf takes the subtree root's value. None disables pruning.
+
+    Returns:
+        FlatForest: The compact forest; node values are ``leaf_value * value_scale``
+    """
+    if value_bits not in VALUE_BITS:
+        raise ValueError(f"value_bits must be one of {VALUE_BITS}")
+
+    leaf = forest.is_leaf if prune_tolerance is None else _collapsible(forest, prune_tolerance)
+    levels = _levels(forest, leaf)
+    old = np.sort(np.concatenate(levels))  # reachable nodes, in their original order
+
+    new_id = np.full(forest.n_nodes, -1, dtype=np.int64)
+    new_id[old] = np.arange(len(old))
+    is_leaf = leaf[old]
+    own = np.arange(len(old))
+    left = np.where(is_leaf, own, new_id[forest.children[2 * old]])
+    right = np.where(is_leaf, own, new_id[forest.children[2 * old + 1]])
+
+    values = forest.node_values(old)
+    if value_bits == 32:
+        value_scale, leaf_value = 1.0, values.astype(np.float32)
+    else:
+        levels_max = 2 ** value_bits - 1
+        value_scale = 1.0 / levels_max
+        leaf_value = np.rint(values * levels_max).astype(np.uint8 if value_bits == 8 else np.uint16)
+
+    return FlatForest(
+        feature=np.where(is_leaf, 0, forest.feature[old]).astype(np.uint8 if forest.n_features <= 256 else np.uint16),
+        threshold=_float32_floor(np.where(is_leaf, np.inf, forest.threshold[old])),
+        children=np.column_stack([left, right]).ravel().astype(np.int32),
+        leaf_value=leaf_value,
+        roots=new_id[forest.roots].astype(np.int32),
+        max_depth=len(levels) - 1,
+        n_features=forest.n_features,
+        is_leaf=is_leaf,
+        value_scale=value_scale,
+    )
+
+
+# --------------------------------------------------
+# ACCURACY GUARDRAIL
+# --------------------------------------------------
+
+def _positive(model, X: np.ndarray) -> np.ndarray:
+    return np.concatenate([
+        model.predict_proba(X[start:start + CHECK_CHUNK_ROWS])[:, 1]
+        for start in range(0, len(X), CHECK_CHUNK_ROWS)
+    ])
+
+
+def check_accuracy(original, compacted: FlatForest, X: np.ndarray, tolerance: float) -> dict:
+    """
+    Compare the compact forest's probabilities to the original's on reference features
+
+    Args:
+        original: The sklearn forest (or its FlatForest)
+        compacted: Output of ``compact``
+        X: (n_rows, n_features) model-ready reference features
+        tolerance: Largest accepted absolute probability difference
+
+    Returns:
+        dict: rows, tolerance, max_abs_error, mean_abs_error, label_flips
+
+    Raises:
+        GuardrailError: Some row's probability moved by more than ``tolerance``
+    """
+    expected = _positive(original, X)
+    actual = _positive(compacted, X)
+    error = np.abs(actual - expected)
+    report = {
+        "rows": len(X),
+        "tolerance": tolerance,
+        "max_abs_error": float(error.max()),
+        "mean_abs_error": float(error.mean()),
+        "label_flips": int(((actual >= 0.5) != (expected >= 0.5)).sum()),
+    }
+    if report["max_abs_error"] > tolerance:
+        raise GuardrailError(
+            f"max probability error {report['max_abs_error']:.6f} exceeds tolerance {tolerance} "
+            f"on {len(X)} reference rows ({report['label_flips']} predictions flip)"
+        )
+    return report
+
+
+# --------------------------------------------------
+# SAVE / LOAD
+# --------------------------------------------------
+
+def save(path: str, forest: FlatForest, meta: Optional[dict] = None) -> dict:
+    """Write a compact forest as one compressed .npz (arrays plus a JSON ``meta`` entry)"""
+    meta = {
+        "format": FORMAT_VERSION,
+        "max_depth": forest.max_depth,
+        "n_features": forest.n_features,
+        "n_trees": forest.n_trees,
+        "n_nodes": forest.n_nodes,
+        "value_scale": forest.value_scale,
+        **(meta or {}),
+    }
+    tmp = f"{path}.part"
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, meta=np.array(json.dumps(meta)), **forest.arrays())
+    os.replace(tmp, path)
+    return meta
+
+
+def read_meta(path: str) -> dict:
+    with np.load(path) as npz:
+        return json.loads(str(npz["meta"]))
+
+
+def load(path: str) -> FlatForest:
+    """Load a compact forest written by ``save``; no pickle is involved"""
+    with np.load(path) as npz:
+        meta = json.loads(str(npz["meta"]))
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact forest format {meta.get('format')} in {path}")
+        arrays = {name: npz[name] for name in FlatForest.ARRAY_FIELDS}
+    return FlatForest.from_arrays(
+        arrays, max_depth=meta["max_depth"], n_features=meta["n_features"], value_scale=meta["value_scale"]
+    )
+
+
+# --------------------------------------------------
+# COMMAND LINE
+# --------------------------------------------------
+
+def load_reference(path: str, fields, limit: Optional[int] = None) -> np.ndarray:
+    """Raw patient matrix in ``fields`` order from a ``;`` or ``,`` delimited CSV"""
+    with open(path) as f:
+        header = f.readline()
+    delimiter = ";" if header.count(";") > header.count(",") else ","
+    names = [name.strip() for name in header.split(delimiter)]
+    return np.loadtxt(path, delimiter=delimiter, skiprows=1, ndmin=2,
+                      usecols=[names.index(field) for field in fields], max_rows=limit)
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compact random_forest_model.pkl with an accuracy check")
+    parser.add_argument("model_dir", help="Directory with random_forest_model.pkl and the scalers")
+    parser.add_argument("-o", "--output", help=f"Output file (default: <model_dir>/{COMPACT_FILE})")
+    parser.add_argument("--value-bits", type=int, choices=VALUE_BITS, default=16)
+    parser.add_argument("--prune-tolerance", type=float, default=0.0,
+                        help="Collapse subtrees whose leaf probabilities span at most this much")
+    parser.add_argument("--no-prune", action="store_true")
+    parser.add_argument("--reference", default=DEFAULT_REFERENCE, help="Reference patients CSV")
+    parser.add_argument("--age-unit", choices=("years", "days"), default="days",
+                        help="Unit of the reference age column; cardio_train.csv uses days")
+    parser.add_argument("--reference-rows", type=int, help="Only check the first N reference rows")
+    parser.add_argument("--tolerance", type=float, default=1e-3,
+                        help="Largest accepted absolute probability difference")
+    args = parser.parse_args(argv)
+
+    import joblib
+
+    # Imported here so the API can import this module without a cycle
+    import main as app
+    from artifacts import sha256_file
+
+    pickle_path = os.path.join(args.model_dir, "random_forest_model.pkl")
+    output = args.output or os.path.join(args.model_dir, COMPACT_FILE)
+
+    rf_model, pickle_load = _timed(lambda: joblib.load(pickle_path))
+    scalers = app.ModelBundle(
+        version="reference", rf_model=None, rf_engine=None,
+        scaler_num=joblib.load(os.path.join(args.model_dir, "scaler_num.pkl")),
+        scaler_int=joblib.load(os.path.join(args.model_dir, "scaler_int.pkl")),
+        lr_weights=None, lr_bias=None, lr_engine=None,
+    )
+    raw = load_reference(args.reference, app.PATIENT_FIELDS, args.reference_rows)
+    if args.age_unit == "days":
+        raw[:, 0] /= app.DAYS_PER_YEAR
+    X = app.preprocess_batch(raw, scalers)
+
+    flat = FlatForest.from_sklearn(rf_model)
+    compacted = compact(flat, args.value_bits, None if args.no_prune else args.prune_tolerance)
+    print(f"[COMPACT] {flat.n_trees} trees: {flat.n_nodes:,} -> {compacted.n_nodes:,} nodes, "
+          f"depth {compacted.max_depth}, values {compacted.leaf_value.dtype}")
+
+    try:
+        report = check_accuracy(rf_model, compacted, X, args.tolerance)
+    except GuardrailError as e:
+        print(f"[ERROR] {e}; nothing written", file=sys.stderr)
+        return 1
+    print(f"[GUARDRAIL] max |dp| {report['max_abs_error']:.2e}, mean {report['mean_abs_error']:.2e} "
+          f"on {report['rows']:,} reference rows (tolerance {args.tolerance}), {report['label_flips']} label flips")
+
+    save(output, compacted, {
+        "value_bits": args.value_bits,
+        "prune_tolerance": None if args.no_prune else args.prune_tolerance,
+        "source": {"random_forest_model.pkl": sha256_file(pickle_path)},
+        "guardrail": {**report, "reference": os.path.basename(args.reference)},
+    })
+    loaded, compact_load = _timed(lambda: load(output))
+
+    rows = [
+        ("pickle (sklearn)", pickle_path, pickle_load, rf_model),
+        ("compact (flat)", output, compact_load, loaded),
+    ]
+    print(f"\n{'artifact':<18}{'size MB':>10}{'load s':>9}{'rows/s':>12}")
+    for name, path, load_seconds, model in rows:
+        _, seconds = _timed(lambda: _positive(model, X))
+        print(f"{name:<18}{os.path.getsize(path) / 2 ** 20:>10.1f}{load_seconds:>9.2f}{len(X) / seconds:>12,.0f}")
+    print(f"\n[OK] Wrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
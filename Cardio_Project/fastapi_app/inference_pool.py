@@ -0,0 +1,127 @@
+"""
+Process-pool inference backend.
+
+Sync prediction handlers share one interpreter, so forest traversal and the
+NumPy feature pipeline of concurrent requests take turns on the GIL and an
+API process never uses much more than one core for inference.
+``InferencePool`` moves forest scoring into worker processes instead.
+
+Each worker memory-maps the model store (``model_store.py``) once when it
+starts, so N workers share one physical copy of the forest through the page
+cache. Requests send only the raw (N, 11) patient matrix and get the
+probabilities back; large batches are split across the workers. Workers
+are spawned rather than forked, because the API process already runs
+threads (request pool, report workers) when the pool starts.
+
+A pool serves exactly one model version. The API starts a new pool when a
+reload or rollback swaps models in and scores in-process until it is ready.
+"""
+
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import numpy as np
+
+# Set in each worker process by _init_worker
+_worker = {}
+
+
+def _init_worker(store_dir: str, version: str) -> None:
+    # The feature pipeline lives in main; importing it does not load any models
+    import main as app
+    import model_store
+
+    _worker["app"] = app
+    _worker["models"] = app.bundle_from_store(model_store.load_store(store_dir), version, store_dir)
+
+
+def _ping() -> str:
+    # Read from the store the worker mapped, not from the version it was told to serve
+    return _worker["models"].store_version
+
+
+def _score_forest(raw: np.ndarray) -> np.ndarray:
+    app, models = _worker["app"], _worker["models"]
+    return app.score_random_forest(app.preprocess_batch(raw, models), models)
+
+
+class InferencePool:
+    """Worker processes scoring the Random Forest of one memory-mapped model store"""
+
+    def __init__(self, store_dir: str, version: str, store_version: str, processes: int = 2,
+                 min_chunk_rows: int = 256):
+        """
+        Args:
+            store_dir: Model store every worker maps
+            version: Model version of the store; callers with another version must not use the pool
+            store_version: Version in the meta.json of the store the caller loaded; workers must map the same
+            processes: Worker processes
+            min_chunk_rows: Smallest slice of a batch sent to one worker
+        """
+        self.store_dir = store_dir
+        self.version = version
+        self.store_version = store_version
+        self.processes = processes
+        self.min_chunk_rows = min_chunk_rows
+        self._executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(store_dir, version),
+        )
+        self._lock = threading.Lock()
+        self.jobs = 0
+        self.rows = 0
+        self.started_seconds = None
+
+    def start(self) -> "InferencePool":
+        """Spawn every worker and wait until each has mapped the store"""
+        start = time.perf_counter()
+        # Workers are spawned on demand: submitting one task per worker before any is up starts them all
+        futures = [self._executor.submit(_ping) for _ in range(self.processes)]
+        for future in futures:
+            mapped = future.result()
+            if mapped != self.store_version:
+                raise RuntimeError(f"Inference worker mapped store {mapped} in {self.store_dir}, "
+                                   f"expected {self.store_version}")
+        self.started_seconds = time.perf_counter() - start
+        print(f"[POOL] {self.processes} inference workers serving {self.version} "
+              f"(started in {self.started_seconds:.2f}s)")
+        return self
+
+    def _submit(self, raw: np.ndarray) -> List:
+        raw = np.ascontiguousarray(raw, dtype=np.float64)
+        parts = min(self.processes, max(1, len(raw) // self.min_chunk_rows))
+        chunks = np.array_split(raw, parts) if parts > 1 else [raw]
+        with self._lock:
+            self.jobs += len(chunks)
+            self.rows += len(raw)
+        return [self._executor.submit(_score_forest, chunk) for chunk in chunks]
+
+    def forest(self, raw: np.ndarray) -> np.ndarray:
+        """Forest probabilities for a raw patient matrix; blocks the calling thread"""
+        return np.concatenate([future.result() for future in self._submit(raw)])
+
+    async def forest_async(self, raw: np.ndarray) -> np.ndarray:
+        """Same as ``forest``, awaited without blocking the event loop or a threadpool thread"""
+        futures = [asyncio.wrap_future(future) for future in self._submit(raw)]
+        return np.concatenate(await asyncio.gather(*futures))
+
+    def shutdown(self, wait: bool = True) -> None:
+        # Jobs already submitted still finish
+        self._executor.shutdown(wait=wait)
+
+    def stats(self) -> dict:
+        return {
+            "processes": self.processes,
+            "version": self.version,
+            "store_dir": self.store_dir,
+            "store_version": self.store_version,
+            "started_seconds": round(self.started_seconds, 3) if self.started_seconds else None,
+            "jobs": self.jobs,
+            "rows": self.rows,
+        }
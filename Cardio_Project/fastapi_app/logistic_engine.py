@@ -0,0 +1,160 @@
+"""
+Fused preprocessing + logistic scoring.
+
+Both StandardScalers and the logistic model are affine, so the scaler
+mean/scale are folded into the logistic weights once at load time. Scoring
+then works directly on raw patient values: BMI and the smoke/alco
+interaction terms are computed inline, with no scaler calls, concatenation
+or intermediate feature matrix.
+
+    z = bias + sum(w_j * x_j) + w_bmi * bmi
+          + smoke * (w_smoke_age * age + w_smoke_bmi * bmi)
+          + alco * (w_alco_age * age + w_alco_bmi * bmi)
+"""
+
+import math
+import threading
+
+import numpy as np
+
+# Same clipping as main.sigmoid
+Z_CLIP = 500.0
+# Rows per block of the batched path; each thread keeps three scratch vectors of this length (96 KB)
+BLOCK_ROWS = 4096
+_scratch = threading.local()
+
+
+def scaler_params(scaler):
+    """
+    (mean, scale) of a 4-column StandardScaler, exactly as its transform applies them
+
+    Like ``StandardScaler.transform`` this follows ``with_mean``/``with_std``:
+    a scaler fit with ``with_mean=False`` still has a ``mean_``, it is just not
+    subtracted.
+    """
+    mean = np.asarray(scaler.mean_, dtype=np.float64) if scaler.with_mean else 0.0
+    scale = np.asarray(scaler.scale_, dtype=np.float64) if scaler.with_std else 1.0
+    return np.broadcast_to(mean, (4,)), np.broadcast_to(scale, (4,))
+
+
+class FusedLogistic:
+    """Logistic model with the feature scalers folded into its weights"""
+
+    def __init__(self, linear, bmi_weight, interaction, bias):
+        # Coefficients on raw columns in main.PATIENT_FIELDS order
+        self.linear = np.asarray(linear, dtype=np.float64)
+        self.bmi_weight = float(bmi_weight)
+        # smoke*age, smoke*bmi, alco*age, alco*bmi
+        self.interaction = np.asarray(interaction, dtype=np.float64)
+        self.bias = float(bias)
+
+        # Plain floats for the scalar path, which must not touch NumPy
+        (self._age, _, _, _, self._ap_hi, self._ap_lo,
+         self._chol, self._gluc, self._smoke, self._alco, self._active) = map(float, self.linear)
+        self._smoke_age, self._smoke_bmi, self._alco_age, self._alco_bmi = map(float, self.interaction)
+
+    @classmethod
+    def from_params(cls, scaler_num, scaler_int, weights, bias) -> "FusedLogistic":
+        """
+        Fold the two StandardScalers into the 13 logistic weights
+
+        Args:
+            scaler_num: Scaler for age_years, ap_hi, ap_lo, bmi
+            scaler_int: Scaler for smoke_age, smoke_bmi, alco_age, alco_bmi
+            weights: Logistic weights over the 13 preprocessed features
+            bias: Logistic bias
+
+        Returns:
+            FusedLogistic: Scorer taking raw patient values
+        """
+        weights = np.asarray(weights, dtype=np.float64).ravel()
+        num_mean, num_scale = scaler_params(scaler_num)
+        int_mean, int_scale = scaler_params(scaler_int)
+
+        num_w = weights[0:4] / num_scale
+        cat_w = weights[4:9]
+        int_w = weights[9:13] / int_scale
+
+        linear = np.zeros(11)
+        linear[[0, 4, 5]] = num_w[:3]  # age, ap_hi, ap_lo
+        linear[6:11] = cat_w  # cholesterol, gluc, smoke, alco, active
+
+        folded_bias = (
+            float(np.asarray(bias).ravel()[0])
+            - float(np.dot(num_w, num_mean))
+            - float(np.dot(int_w, int_mean))
+        )
+        return cls(linear, num_w[3], int_w, folded_bias)
+
+    def score_one(self, p) -> float:
+        """Probability for one patient-like object (PatientData attributes), scalar math only"""
+        height_m = p.height / 100
+        bmi = p.weight / (height_m * height_m)
+        age = p.age
+
+        z = (
+            self.bias
+            + self._age * age + self._ap_hi * p.ap_hi + self._ap_lo * p.ap_lo
+            + self.bmi_weight * bmi
+            + self._chol * p.cholesterol + self._gluc * p.gluc
+            + self._smoke * p.smoke + self._alco * p.alco + self._active * p.active
+            + p.smoke * (self._smoke_age * age + self._smoke_bmi * bmi)
+            + p.alco * (self._alco_age * age + self._alco_bmi * bmi)
+        )
+        z = max(-Z_CLIP, min(Z_CLIP, z))
+        return 1 / (1 + math.exp(-z))
+
+    def predict_raw(self, raw: np.ndarray) -> np.ndarray:
+        """
+        Probabilities for an (N, 11) raw patient matrix in PATIENT_FIELDS order
+
+        Works column-wise on the raw matrix, no (N, 13) feature matrix and no
+        scaler calls. The output vector is the only allocation: BMI and the
+        per-row coefficients go through the calling thread's scratch
+        vectors, ``BLOCK_ROWS`` rows at a time.
+        """
+        z_all = raw @ self.linear
+        z_all += self.bias
+        scratch = _scratch_vectors()
+        w_smoke_age, w_smoke_bmi, w_alco_age, w_alco_bmi = self._smoke_age, self._smoke_bmi, self._alco_age, self._alco_bmi
+
+        for start in range(0, len(raw), BLOCK_ROWS):
+            block = raw[start:start + BLOCK_ROWS]
+            n = len(block)
+            z = z_all[start:start + n]
+            bmi, coef, term = scratch[0, :n], scratch[1, :n], scratch[2, :n]
+            age, smoke, alco = block[:, 0], block[:, 8], block[:, 9]
+
+            np.multiply(block[:, 2], 0.01, out=bmi)
+            np.square(bmi, out=bmi)
+            np.divide(block[:, 3], bmi, out=bmi)
+
+            # bmi coefficient per row: w_bmi + smoke * w_smoke_bmi + alco * w_alco_bmi
+            np.multiply(smoke, w_smoke_bmi, out=coef)
+            np.multiply(alco, w_alco_bmi, out=term)
+            coef += term
+            coef += self.bmi_weight
+            coef *= bmi
+            z += coef
+
+            # age coefficient per row: smoke * w_smoke_age + alco * w_alco_age
+            np.multiply(smoke, w_smoke_age, out=coef)
+            np.multiply(alco, w_alco_age, out=term)
+            coef += term
+            coef *= age
+            z += coef
+
+        np.clip(z_all, -Z_CLIP, Z_CLIP, out=z_all)
+        np.negative(z_all, out=z_all)
+        np.exp(z_all, out=z_all)
+        z_all += 1
+        np.reciprocal(z_all, out=z_all)
+        return z_all
+
+
+def _scratch_vectors() -> np.ndarray:
+    """This thread's (3, BLOCK_ROWS) scratch buffer, shared by every engine; engines are scored from many threads"""
+    buffer = getattr(_scratch, "buffer", None)
+    if buffer is None:
+        buffer = _scratch.buffer = np.empty((3, BLOCK_ROWS))
+    return buffer
@@ -1,21 +1,48 @@
 import os
 import base64
-import requests
+import dataclasses
+import hmac
+import operator
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import joblib
 import numpy as np
 import resend
 from datetime import datetime
-from io import BytesIO
+from io import BytesIO, TextIOWrapper
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, UploadFile, File, Query, Header, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, EmailStr
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from typing import Any, Dict, List, Literal, Optional
+from pydantic import BaseModel, Field, EmailStr, model_validator
+
+import admission
+import artifacts
+import audit
+from batcher import MicroBatcher
+import bulk
+import columnar
+import drift
+import explain
+from cache import PredictionCache, patient_digest
+import forest_compact
+from forest_engine import FlatForest
+from inference_pool import InferencePool
+from logistic_engine import FusedLogistic, scaler_params
+import metrics
+import model_store
+import reports
+from report_template import ReportTemplate
+from profiler import SamplingProfiler
+from registry import ModelBundle, ModelRegistry
+import validation
 
 # Load environment variables
 load_dotenv()
@@ -24,25 +51,140 @@ load_dotenv()
 # CONFIG
 # --------------------------------------------------
 
-MODEL_DIR = "models"
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
 os.makedirs(MODEL_DIR, exist_ok=True)
 
-BASE_URL = "https://huggingface.co/mr-baraiya/cardio-disease-model/resolve/main"
+# Hugging Face by default; any HTTP mirror, file:// URL or local directory also works
+BASE_URL = os.getenv("MODEL_BASE_URL", "https://huggingface.co/mr-baraiya/cardio-disease-model/resolve/main").rstrip("/")
 
-MODEL_FILES = {
-    "random_forest_model.pkl": f"{BASE_URL}/random_forest_model.pkl",
-    "scaler_int.pkl": f"{BASE_URL}/scaler_int.pkl",
-    "scaler_num.pkl": f"{BASE_URL}/scaler_num.pkl",
-    "logistic_weights.npy": f"{BASE_URL}/logistic_weights.npy",
-    "logistic_bias.npy": f"{BASE_URL}/logistic_bias.npy",
-}
+# "pickle" serves random_forest_model.pkl; "compact" the quantized forest written by
+# forest_compact.py (random_forest_compact.npz), always scored by the flat engine
+FOREST_ARTIFACT = os.getenv("FOREST_ARTIFACT", "pickle").lower()
+FOREST_FILE = forest_compact.COMPACT_FILE if FOREST_ARTIFACT == "compact" else "random_forest_model.pkl"
+
+MODEL_FILE_NAMES = (
+    FOREST_FILE,
+    "scaler_int.pkl",
+    "scaler_num.pkl",
+    "logistic_weights.npy",
+    "logistic_bias.npy",
+)
+
+
+def model_urls(base_url: str) -> dict:
+    return {filename: f"{base_url.rstrip('/')}/{filename}" for filename in MODEL_FILE_NAMES}
+
+
+MODEL_FILES = model_urls(BASE_URL)
+
+# SHA-256/size manifest for MODEL_FILES (see artifacts.py); verification is skipped without one
+MODEL_MANIFEST = os.getenv(
+    "MODEL_MANIFEST", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models_manifest.json")
+)
+
+# Never download over the network; serve from MODEL_DIR or a file:// / local MODEL_BASE_URL
+MODEL_OFFLINE = os.getenv("MODEL_OFFLINE", "0").lower() in ("1", "true", "yes")
+
+# "pickle" loads the artifacts into each worker's heap; "mmap" serves them from a
+# memory-mapped store (built from the pickles on first start) shared by all workers
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "pickle").lower()
+MODEL_STORE_DIR = os.getenv("MODEL_STORE_DIR", os.path.join(MODEL_DIR, "store"))
+
+# Hot reloads fetch each new model version into its own directory under here
+MODEL_RELEASES_DIR = os.path.join(MODEL_DIR, "releases")
+
+# Token for the /admin model reload/rollback endpoints (X-Admin-Token); disabled when unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Artifacts fetched and loaded concurrently at startup
+ARTIFACT_WORKERS = int(os.getenv("ARTIFACT_WORKERS", "5"))
+
+# Upper bound on rows accepted by /predict/batch in a single request
+MAX_BATCH_SIZE = 10_000
+
+# Upper bound on the values of one /predict/sweep axis (a 2-D grid holds up to its square)
+MAX_SWEEP_STEPS = 200
+
+# Bulk entry points also reject rows that pass PatientData but are implausible
+# (ap_lo above ap_hi, BMI outside PLAUSIBLE_BMI); single-patient endpoints do not check these
+PLAUSIBILITY_CHECKS = os.getenv("PLAUSIBILITY_CHECKS", "1").lower() in ("1", "true", "yes")
+PLAUSIBLE_BMI = (10, 80)
+
+# Upper bound on rows decoded from one /predict/columnar payload (it is held in memory at once)
+COLUMNAR_MAX_ROWS = int(os.getenv("COLUMNAR_MAX_ROWS", "1000000"))
+
+# Random Forest inference backend: "sklearn" (predict_proba) or "flat" (FlatForest arrays)
+FOREST_BACKEND = os.getenv("FOREST_BACKEND", "sklearn").lower()
+
+# Batches larger than this go to sklearn even with the flat backend (it wins on large batches)
+FLAT_FOREST_MAX_ROWS = int(os.getenv("FLAT_FOREST_MAX_ROWS", "512"))
+
+# Prediction cache: max entries (0 disables) and optional time-to-live in seconds
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "0"))
+
+# "thread" scores in the request threadpool; "process" runs forest scoring in INFERENCE_PROCESSES
+# worker processes that share the memory-mapped model store
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "thread").lower()
+INFERENCE_PROCESSES = int(os.getenv("INFERENCE_PROCESSES", str(os.cpu_count() or 1)))
+
+# Coalesce concurrent single-patient Random Forest calls into one batched model call (opt-in):
+# a batch is scored once MICROBATCH_MAX_ROWS rows wait or its first row has waited MICROBATCH_WAIT_MS
+MICROBATCH = os.getenv("MICROBATCH", "0").lower() in ("1", "true", "yes")
+MICROBATCH_WAIT_MS = float(os.getenv("MICROBATCH_WAIT_MS", "2"))
+MICROBATCH_MAX_ROWS = int(os.getenv("MICROBATCH_MAX_ROWS", "64"))
+
+# Background report jobs: worker threads (separate from the request pool), queue bound, attempts
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+REPORT_QUEUE_SIZE = int(os.getenv("REPORT_QUEUE_SIZE", "100"))
+REPORT_MAX_ATTEMPTS = int(os.getenv("REPORT_MAX_ATTEMPTS", "4"))
+REPORT_RETRY_BACKOFF = float(os.getenv("REPORT_RETRY_BACKOFF", "2"))
+
+# Request/stage latency histograms behind /metrics; the sampling profiler's default interval
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+
+# Input-drift monitor behind /drift: scored inputs are queued (up to DRIFT_MAX_PENDING) and folded
+# into per-feature sketches by a background thread
+DRIFT_MONITOR = os.getenv("DRIFT_MONITOR", "1").lower() in ("1", "true", "yes")
+DRIFT_MAX_PENDING = int(os.getenv("DRIFT_MAX_PENDING", "10000"))
+# Features are labelled drifting only once the window holds this many rows
+DRIFT_MIN_ROWS = int(os.getenv("DRIFT_MIN_ROWS", "1000"))
+
+# Prediction audit log (needs pyarrow): rotated Arrow segments under AUDIT_DIR, off when unset.
+# Records are buffered and flushed every AUDIT_FLUSH_ROWS rows or AUDIT_FLUSH_SECONDS; with
+# AUDIT_MAX_PENDING_ROWS waiting, requests wait up to AUDIT_MAX_WAIT_MS for the writer, then get a 503
+AUDIT_DIR = os.getenv("AUDIT_DIR", "")
+AUDIT_FLUSH_ROWS = int(os.getenv("AUDIT_FLUSH_ROWS", "5000"))
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "1"))
+AUDIT_MAX_PENDING_ROWS = int(os.getenv("AUDIT_MAX_PENDING_ROWS", "100000"))
+AUDIT_MAX_WAIT_MS = float(os.getenv("AUDIT_MAX_WAIT_MS", "100"))
+AUDIT_ROTATE_MB = float(os.getenv("AUDIT_ROTATE_MB", "64"))
+AUDIT_ROTATE_SECONDS = float(os.getenv("AUDIT_ROTATE_SECONDS", "3600"))
+AUDIT_FSYNC = os.getenv("AUDIT_FSYNC", "0").lower() in ("1", "true", "yes")
+
+# Admission control: at most ADMISSION_CAPACITY requests run at once (the threadpool size), bulk and
+# report requests at most ADMISSION_BULK_LIMIT / ADMISSION_REPORT_LIMIT of them. Up to
+# ADMISSION_QUEUE_SIZE more per class wait ADMISSION_MAX_WAIT_MS (or the client's
+# X-Request-Deadline-Ms) for a slot before being shed with a 503
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1").lower() in ("1", "true", "yes")
+ADMISSION_CAPACITY = int(os.getenv("ADMISSION_CAPACITY", "40"))
+ADMISSION_BULK_LIMIT = int(os.getenv("ADMISSION_BULK_LIMIT", "4"))
+ADMISSION_REPORT_LIMIT = int(os.getenv("ADMISSION_REPORT_LIMIT", "4"))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "100"))
+ADMISSION_MAX_WAIT_MS = float(os.getenv("ADMISSION_MAX_WAIT_MS", "1000"))
+
+# "resend" sends real email; "stub" records messages in memory for offline runs
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "resend").lower()
+
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
+
+# Worker processes scoring the active models (INFERENCE_BACKEND=process), started after each swap
+inference_pool: Optional[InferencePool] = None
+inference_pool_lock = threading.Lock()
 
-# Global model variables
-rf_model = None
-scaler_int = None
-scaler_num = None
-lr_weights = None
-lr_bias = None
+# Active and previous model bundles; cached predictions and the inference pool belong to the replaced models
+model_registry = ModelRegistry(on_swap=lambda bundle: on_model_swap(bundle))
 
 # --------------------------------------------------
 # APP
@@ -51,9 +193,44 @@ lr_bias = None
 app = FastAPI(
     title="Cardio Disease Prediction API",
     description="Random Forest & Logistic Regression based Cardio Disease Prediction",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson instead of the stdlib encoder for every JSON response
+    default_response_class=ORJSONResponse,
 )
 
+# --------------------------------------------------
+# ADMISSION CONTROL
+# --------------------------------------------------
+
+# Predictions are admitted first and may use every slot; bulk scoring and reports are capped
+# so a burst of either cannot take the threadpool from them
+ADMISSION_CLASSES = (
+    admission.AdmissionClass("predict", priority=0, limit=ADMISSION_CAPACITY, max_queue=ADMISSION_QUEUE_SIZE,
+                             max_wait=ADMISSION_MAX_WAIT_MS / 1000, retry_after=1),
+    admission.AdmissionClass("bulk", priority=1, limit=ADMISSION_BULK_LIMIT, max_queue=ADMISSION_QUEUE_SIZE,
+                             max_wait=ADMISSION_MAX_WAIT_MS / 1000, retry_after=5),
+    admission.AdmissionClass("report", priority=2, limit=ADMISSION_REPORT_LIMIT, max_queue=ADMISSION_QUEUE_SIZE,
+                             max_wait=ADMISSION_MAX_WAIT_MS / 1000, retry_after=5),
+)
+ADMISSION_ROUTES = {
+    ("POST", "/predict/randomforest"): "predict",
+    ("POST", "/predict/logistic"): "predict",
+    ("POST", "/predict/compare"): "predict",
+    ("POST", "/explain"): "predict",
+    ("POST", "/predict/batch"): "bulk",
+    ("POST", "/predict/stream"): "bulk",
+    ("POST", "/predict/columnar"): "bulk",
+    ("POST", "/predict/sweep"): "bulk",
+    ("POST", "/explain/batch"): "bulk",
+    ("POST", "/send-report"): "report",
+}
+
+admission_controller: Optional[admission.AdmissionController] = None
+if ADMISSION_CONTROL:
+    admission_controller = admission.AdmissionController(ADMISSION_CLASSES, capacity=ADMISSION_CAPACITY)
+    # Added before CORS so it runs inside it: shed requests still carry the CORS headers
+    app.add_middleware(admission.AdmissionMiddleware, controller=admission_controller, routes=ADMISSION_ROUTES)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -64,27 +241,46 @@ app.add_middleware(
 )
 
 # --------------------------------------------------
-# UTILS
+# INSTRUMENTATION
 # --------------------------------------------------
 
-def download_model_file(filename: str, url: str) -> bool:
-    filepath = os.path.join(MODEL_DIR, filename)
+metrics_registry = metrics.MetricsRegistry(enabled=METRICS_ENABLED)
 
-    if os.path.exists(filepath):
-        print(f"[OK] {filename} already exists")
-        return True
+request_latency = metrics_registry.histogram(
+    "cardio_http_request_duration_seconds", "HTTP request latency by route", ["handler"]
+)
+requests_in_flight = metrics_registry.gauge(
+    "cardio_http_requests_in_flight", "HTTP requests being served by route", ["handler"]
+)
+responses_total = metrics_registry.counter(
+    "cardio_http_responses_total", "HTTP responses by route and status code", ["handler", "status"]
+)
+# validate, preprocess, scaler_num, scaler_int, forest, logistic, explain, pdf_render, email_send
+stage_latency = metrics_registry.histogram(
+    "cardio_stage_duration_seconds", "Latency of one processing stage", ["stage"]
+)
 
-    print(f"[DOWNLOAD] Downloading {filename}...")
-    try:
-        r = requests.get(url, stream=True, timeout=600)
-        r.raise_for_status()
+app.add_middleware(
+    metrics.MetricsMiddleware,
+    latency=request_latency, in_flight=requests_in_flight, responses=responses_total,
+)
+
+# Off until started through /admin/profiler/start
+profiler = SamplingProfiler(interval=PROFILER_INTERVAL_MS / 1000)
 
-        with open(filepath, "wb") as f:
-            for chunk in r.iter_content(chunk_size=1024 * 1024):
-                if chunk:
-                    f.write(chunk)
+# --------------------------------------------------
+# UTILS
+# --------------------------------------------------
 
-        print(f"[OK] {filename} downloaded")
+def download_model_file(filename: str, url: str) -> bool:
+    """Fetch one artifact into MODEL_DIR, verified against the manifest when available"""
+    try:
+        stats = artifacts.fetch_artifact(
+            filename, url, MODEL_DIR,
+            expected=artifacts.load_manifest(MODEL_MANIFEST).get(filename),
+            offline=MODEL_OFFLINE,
+        )
+        print(f"[OK] {filename} ready ({stats['source']})")
         return True
     except Exception as e:
         print(f"[ERROR] Failed to download {filename}: {e}")
@@ -113,6 +309,15 @@ class PatientData(BaseModel):
     alco: int = Field(..., ge=0, le=1, description="0=No, 1=Yes")
     active: int = Field(..., ge=0, le=1, description="0=No, 1=Yes")
 
+    @model_validator(mode="wrap")
+    @classmethod
+    def timed_validation(cls, data, handler):
+        # Runs once per patient, also inside batches: kept to two clock reads and one observe
+        start = time.perf_counter()
+        patient = handler(data)
+        stage_latency.observe(time.perf_counter() - start, "validate")
+        return patient
+
 
 class PredictionResult(BaseModel):
     """Prediction result schema"""
@@ -120,6 +325,18 @@ class PredictionResult(BaseModel):
     probability: float = Field(..., ge=0, le=1, description="Risk probability (0-1)")
 
 
+class BatchPredictionRequest(BaseModel):
+    """Request schema for scoring many patients in one call"""
+    model: Literal["randomforest", "logistic", "compare"] = Field(
+        "compare", description="Model type: randomforest, logistic, or compare"
+    )
+    # Validated column-wise by the endpoints (patient_columns), not one PatientData at a time
+    patients: List[Any] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_SIZE, description="Patients to score, results keep this order",
+        json_schema_extra={"items": {"$ref": "#/components/schemas/PatientData"}},
+    )
+
+
 class EmailReportRequest(BaseModel):
     """Request schema for sending email reports"""
     to_email: EmailStr = Field(..., description="Recipient email address")
@@ -132,124 +349,1372 @@ class EmailReportRequest(BaseModel):
 # LOAD MODELS ON STARTUP
 # --------------------------------------------------
 
-@app.on_event("startup")
-def load_models():
-    print("[CHECKING] Checking model files...")
+def build_forest_engine(model):
+    """Return the object used for forest scoring according to FOREST_BACKEND"""
+    if FOREST_BACKEND == "flat":
+        engine = FlatForest.from_sklearn(model)
+        print(f"[ENGINE] Flat forest: {engine.n_trees} trees, {engine.n_nodes} nodes, depth {engine.max_depth}")
+        return engine
+    return model
 
-    for filename, url in MODEL_FILES.items():
-        ok = download_model_file(filename, url)
-        if not ok:
-            raise RuntimeError(f"Startup failed: could not download {filename}")
+
+def artifact_hashes(model_dir: str, manifest: dict) -> dict:
+    """SHA-256 of each artifact in ``model_dir``, taken from the manifest when it was verified against one"""
+    return {
+        filename: manifest.get(filename, {}).get("sha256") or artifacts.sha256_file(os.path.join(model_dir, filename))
+        for filename in MODEL_FILE_NAMES
+    }
+
+
+def store_is_current(store_dir: str, model_dir: str, manifest: dict) -> bool:
+    """Whether the memory-mapped store was converted from the artifacts the manifest (or ``model_dir``) holds"""
+    if all(manifest.get(name, {}).get("sha256") for name in MODEL_FILE_NAMES):
+        expected = {name: manifest[name]["sha256"] for name in MODEL_FILE_NAMES}
+    elif all(os.path.exists(os.path.join(model_dir, name)) for name in MODEL_FILE_NAMES):
+        expected = artifact_hashes(model_dir, {})
+    else:
+        print(f"[WARNING] No manifest or artifacts to check the model store in {store_dir} against")
+        return True
+    if model_store.read_meta(store_dir).get("source") != expected:
+        print(f"[STALE] Model store in {store_dir} was built from other artifacts, rebuilding it")
+        return False
+    return True
+
+
+ARTIFACT_LOADERS = {
+    "random_forest_model.pkl": joblib.load,
+    forest_compact.COMPACT_FILE: forest_compact.load,
+    "scaler_int.pkl": joblib.load,
+    "scaler_num.pkl": joblib.load,
+    "logistic_weights.npy": np.load,
+    "logistic_bias.npy": np.load,
+}
+
+
+def fetch_and_load(filename: str, url: str, model_dir: str, manifest: dict):
+    """Fetch one artifact and deserialize it; returns (object, timing stats)"""
+    stats = artifacts.fetch_artifact(
+        filename, url, model_dir,
+        expected=manifest.get(filename), offline=MODEL_OFFLINE,
+    )
+    start = time.perf_counter()
+    obj = ARTIFACT_LOADERS[filename](os.path.join(model_dir, filename))
+    stats["load_seconds"] = time.perf_counter() - start
+    return obj, stats
+
+
+def fetch_and_load_all(model_dir: str, base_url: str, manifest: dict) -> tuple:
+    """Fetch and deserialize every artifact concurrently; returns (objects, timings) by filename"""
+    # Each artifact is loaded as soon as its own download finishes
+    loaded, timings, store_meta = {}, {}, {}
+    with ThreadPoolExecutor(max_workers=ARTIFACT_WORKERS) as pool:
+        futures = {
+            name: pool.submit(fetch_and_load, name, url, model_dir, manifest)
+            for name, url in model_urls(base_url).items()
+        }
+        for filename, future in futures.items():
+            try:
+                loaded[filename], timings[filename] = future.result()
+            except Exception as e:
+                raise RuntimeError(f"Could not load {filename}: {e}")
+    return loaded, timings
+
+
+def load_bundle(model_dir: str = MODEL_DIR, base_url: str = BASE_URL,
+                manifest_path: Optional[str] = MODEL_MANIFEST) -> ModelBundle:
+    """
+    Fetch, verify and load one complete set of models
+
+    Args:
+        model_dir: Directory the artifacts are fetched into and served from
+        base_url: Where missing artifacts are fetched from
+        manifest_path: SHA-256 manifest of the artifacts, if any
+
+    Returns:
+        ModelBundle: Models ready to be activated in the registry
+    """
+    print(f"[CHECKING] Checking model files in {model_dir}...")
+    start = time.perf_counter()
+    os.makedirs(model_dir, exist_ok=True)
+    manifest = artifacts.load_manifest(manifest_path)
+    if not manifest:
+        print(f"[WARNING] No manifest at {manifest_path}, artifact checksums are not verified")
+
+    store_dir = MODEL_STORE_DIR if model_dir == MODEL_DIR else os.path.join(model_dir, "store")
+    use_store = MODEL_FORMAT == "mmap"
+    # Inference worker processes map the store even when this process serves the pickles
+    write_store = use_store or INFERENCE_BACKEND == "process"
+    loaded, timings = {}, {}
+
+    # An existing store is only served while it matches the current artifacts
+    if not (use_store and model_store.is_store(store_dir) and store_is_current(store_dir, model_dir, manifest)):
+        loaded, timings = fetch_and_load_all(model_dir, base_url, manifest)
+        hashes = artifact_hashes(model_dir, manifest)
+        forest = loaded[FOREST_FILE]
+        store_meta = model_store.read_meta(store_dir) if write_store else {}
+        if write_store and store_meta.get("source") != hashes:
+            print(f"[CONVERT] Building memory-mapped model store in {store_dir}...")
+            store_meta = model_store.write_store(
+                store_dir,
+                forest if isinstance(forest, FlatForest) else FlatForest.from_sklearn(forest),
+                loaded["scaler_num.pkl"], loaded["scaler_int.pkl"],
+                loaded["logistic_weights.npy"], loaded["logistic_bias.npy"],
+                source=hashes,
+                replace=True,
+            )
 
     print("[LOADING] Loading models...")
 
-    global rf_model, scaler_int, scaler_num, lr_weights, lr_bias
+    if use_store:
+        store = model_store.load_store(store_dir)
+        # Same id as the pickles the store was converted from
+        source = store["meta"]["source"]
+        version = artifacts.fingerprint(source) if source else store["meta"]["version"]
+        bundle = bundle_from_store(store, version, store_dir)
+    else:
+        # The compact forest is already flat and has no sklearn model behind it
+        rf_model = None if isinstance(forest, FlatForest) else forest
+        scaler_int = loaded["scaler_int.pkl"]
+        scaler_num = loaded["scaler_num.pkl"]
+        lr_weights = loaded["logistic_weights.npy"]
+        lr_bias = loaded["logistic_bias.npy"]
+        bundle = ModelBundle(
+            version=artifacts.fingerprint(hashes),
+            rf_model=rf_model,
+            rf_engine=forest if rf_model is None else build_forest_engine(rf_model),
+            scaler_num=scaler_num,
+            scaler_int=scaler_int,
+            lr_weights=lr_weights,
+            lr_bias=lr_bias,
+            lr_engine=FusedLogistic.from_params(scaler_num, scaler_int, lr_weights, lr_bias),
+            store_dir=store_dir if write_store else "",
+            store_version=store_meta.get("version", ""),
+        )
+
+    stats = {
+        "seconds": round(time.perf_counter() - start, 3),
+        "format": MODEL_FORMAT,
+        "artifacts": {
+            name: {
+                "source": t["source"],
+                "bytes": t["bytes"],
+                "fetch_seconds": round(t["seconds"], 3),
+                "load_seconds": round(t["load_seconds"], 3),
+            }
+            for name, t in timings.items()
+        },
+    }
+    print(f"[SUCCESS] Models loaded in {stats['seconds']:.2f}s (version {bundle.version})")
+
+    return dataclasses.replace(bundle, model_dir=model_dir, source=base_url, stats=stats)
 
-    rf_model = joblib.load(os.path.join(MODEL_DIR, "random_forest_model.pkl"))
-    scaler_int = joblib.load(os.path.join(MODEL_DIR, "scaler_int.pkl"))
-    scaler_num = joblib.load(os.path.join(MODEL_DIR, "scaler_num.pkl"))
-    lr_weights = np.load(os.path.join(MODEL_DIR, "logistic_weights.npy"))
-    lr_bias = np.load(os.path.join(MODEL_DIR, "logistic_bias.npy"))
 
+def bundle_from_store(store: dict, version: str, store_dir: str = "") -> ModelBundle:
+    """ModelBundle serving every model from an opened memory-mapped store (model_store.load_store)"""
+    return ModelBundle(
+        version=version,
+        rf_model=None,
+        rf_engine=store["forest"],
+        scaler_num=store["scaler_num"],
+        scaler_int=store["scaler_int"],
+        lr_weights=store["lr_weights"],
+        lr_bias=store["lr_bias"],
+        lr_engine=FusedLogistic.from_params(
+            store["scaler_num"], store["scaler_int"], store["lr_weights"], store["lr_bias"]
+        ),
+        store_dir=store_dir,
+        store_version=store["meta"]["version"],
+    )
+
+
+@app.on_event("startup")
+def load_models():
+    model_registry.activate(load_bundle(), reason="startup")
     print("[SUCCESS] All models loaded successfully!")
 
+
+def active_models() -> ModelBundle:
+    """The bundle a request should use from start to finish"""
+    models = model_registry.active
+    if models is None:
+        raise RuntimeError("Models are not loaded yet")
+    return models
+
+
+def on_model_swap(models: ModelBundle):
+    prediction_cache.clear()
+    if drift_monitor is not None:
+        drift_monitor.set_reference(*drift_reference(models), version=models.version, normal=DRIFT_NORMAL)
+    if INFERENCE_BACKEND == "process":
+        # Spawning workers takes a moment; requests score in-process until they are ready
+        threading.Thread(target=start_inference_pool, args=(models,), name="inference-pool", daemon=True).start()
+
+
+def start_inference_pool(models: ModelBundle):
+    """Start inference workers for ``models`` and retire the previous pool once they are ready"""
+    global inference_pool
+    if pool_for(models) is not None:
+        return
+    if not models.store_dir:
+        print(f"[POOL] Model version {models.version} has no memory-mapped store, scoring in-process")
+        return
+
+    pool = InferencePool(models.store_dir, models.version, models.store_version, INFERENCE_PROCESSES)
+    try:
+        pool.start()
+    except Exception as e:
+        pool.shutdown(wait=False)
+        print(f"[POOL] Could not start inference workers, scoring in-process: {e}")
+        return
+
+    with inference_pool_lock:
+        # Another swap may have happened while the workers started
+        if model_registry.active is models:
+            pool, inference_pool = inference_pool, pool
+    if pool is not None:
+        # Requests that picked the old pool just before the swap may still be submitting to it
+        timer = threading.Timer(5.0, pool.shutdown)
+        timer.daemon = True
+        timer.start()
+
+
+def pool_for(models: ModelBundle) -> Optional[InferencePool]:
+    """The inference pool if it serves exactly ``models``; None means score in-process"""
+    pool = inference_pool
+    return pool if pool is not None and pool.version == models.version else None
+
+
+def replace_broken_pool(pool: InferencePool):
+    """A worker died (e.g. OOM-killed); drop the pool and start a fresh one"""
+    global inference_pool
+    print(f"[POOL] Inference worker died, restarting the pool for {pool.version}")
+    with inference_pool_lock:
+        if inference_pool is not pool:
+            return
+        inference_pool = None
+    pool.shutdown(wait=False)
+    models = model_registry.active
+    if models is not None:
+        on_model_swap(models)
+
+
+@app.on_event("shutdown")
+def stop_inference_pool():
+    if inference_pool is not None:
+        inference_pool.shutdown()
+
 # --------------------------------------------------
 # HEALTH CHECK
 # --------------------------------------------------
 
 @app.get("/health")
 def health():
+    models = model_registry.active
     return {
-        "status": "healthy",
-        "models_loaded": True,
-        "model_directory": MODEL_DIR
+        "status": "healthy" if models else "loading",
+        "models_loaded": models is not None,
+        "model_directory": MODEL_DIR,
+        "model_version": models.version if models else None,
+        "startup": models.stats if models else {},
+        "registry": model_registry.status(),
+        "cache": prediction_cache.stats(),
+        "microbatch": forest_batcher.stats() if forest_batcher else None,
+        "inference": {
+            "backend": INFERENCE_BACKEND,
+            "pool": inference_pool.stats() if inference_pool else None,
+        },
+        "reports": report_pipeline.stats(),
+        "audit": audit_log.stats() if audit_log else None,
+        "admission": admission_controller.stats() if admission_controller else None,
     }
 
+# --------------------------------------------------
+# METRICS
+# --------------------------------------------------
+
+@metrics_registry.collector
+def collect_service_metrics():
+    """Model load timings and cache/queue counters, read from their stats() at scrape time"""
+    models = model_registry.active
+    if models is not None:
+        yield "cardio_model_info", "gauge", "Serving model version", [
+            ({"version": models.version, "format": models.stats.get("format", MODEL_FORMAT)}, 1)
+        ]
+        yield "cardio_model_load_seconds", "gauge", "Time to fetch and load the serving models", [
+            ({}, models.stats.get("seconds", 0.0))
+        ]
+        artifact_stats = models.stats.get("artifacts", {})
+        for suffix, key, help in (
+            ("fetch_seconds", "fetch_seconds", "Time to fetch one artifact"),
+            ("load_seconds", "load_seconds", "Time to deserialize one artifact"),
+            ("bytes", "bytes", "Size of one artifact"),
+        ):
+            yield f"cardio_artifact_{suffix}", "gauge", help, [
+                ({"artifact": name, "source": t["source"]}, t[key]) for name, t in artifact_stats.items()
+            ]
+
+    registry = model_registry.status()
+    yield "cardio_model_swaps_total", "counter", "Model versions swapped in", [({}, registry["swaps"])]
+    yield "cardio_model_reload_in_progress", "gauge", "1 while a model reload runs", [
+        ({}, int(registry["reload"]["state"] == "loading"))
+    ]
+
+    cache = prediction_cache.stats()
+    yield "cardio_cache_entries", "gauge", "Cached predictions", [({}, cache["entries"])]
+    for name in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        yield f"cardio_cache_{name}_total", "counter", f"Prediction cache {name}", [({}, cache[name])]
+
+    queue = report_pipeline.stats()
+    for name in ("queued", "pending"):
+        yield f"cardio_report_jobs_{name}", "gauge", f"Report jobs {name}", [({}, queue[name])]
+    for name in ("submitted", "rejected", "sent", "failed", "retries"):
+        yield f"cardio_report_jobs_{name}_total", "counter", f"Report jobs {name}", [({}, queue[name])]
+
+    if forest_batcher is not None:
+        batching = forest_batcher.stats()
+        yield "cardio_microbatch_batches_total", "counter", "Coalesced forest calls", [({}, batching["batches"])]
+        yield "cardio_microbatch_rows_total", "counter", "Rows scored in coalesced calls", [({}, batching["rows"])]
+
+    if inference_pool is not None:
+        pool = inference_pool.stats()
+        yield "cardio_inference_processes", "gauge", "Inference worker processes", [({}, pool["processes"])]
+        yield "cardio_inference_rows_total", "counter", "Rows scored by inference workers", [({}, pool["rows"])]
+
+    if admission_controller is not None:
+        control = admission_controller.stats()["classes"]
+        for name in ("running", "waiting"):
+            yield f"cardio_admission_{name}", "gauge", f"Requests {name} per admission class", [
+                ({"class": cls}, c[name]) for cls, c in control.items()
+            ]
+        yield "cardio_admission_admitted_total", "counter", "Requests admitted per class", [
+            ({"class": cls}, c["admitted"]) for cls, c in control.items()
+        ]
+        yield "cardio_admission_shed_total", "counter", "Requests shed with a 503 per class and reason", [
+            ({"class": cls, "reason": reason}, n) for cls, c in control.items() for reason, n in c["shed"].items()
+        ]
+        yield "cardio_admission_queue_seconds_total", "counter", "Time requests spent waiting for a slot", [
+            ({"class": cls}, c["queue_seconds"]) for cls, c in control.items()
+        ]
+        yield "cardio_admission_service_seconds", "gauge", "Moving average of request run time per class", [
+            ({"class": cls}, c["service_ms"] / 1000) for cls, c in control.items()
+        ]
+
+    yield "cardio_profiler_running", "gauge", "1 while the sampling profiler runs", [({}, int(profiler.running))]
+
+    if audit_log is not None:
+        log = audit_log.stats()
+        yield "cardio_audit_pending_rows", "gauge", "Audit records waiting to be written", [({}, log["pending_rows"])]
+        for name in ("rows_written", "rejected", "write_errors"):
+            yield f"cardio_audit_{name}_total", "counter", f"Audit log {name.replace('_', ' ')}", [({}, log[name])]
+
+    if drift_monitor is not None:
+        report = drift_monitor.report()
+        if report["enabled"]:
+            yield "cardio_drift_rows", "gauge", "Inputs in the drift window", [({}, report["rows"])]
+            yield "cardio_drift_dropped", "gauge", "Inputs the drift monitor dropped in this window", [
+                ({}, report["dropped"])
+            ]
+            features = {**report["features"], **report["categories"]}
+            yield "cardio_drift_psi", "gauge", "Population stability index of one input feature", [
+                ({"feature": name}, f["psi"]) for name, f in features.items() if f["psi"] is not None
+            ]
+            yield "cardio_drift_z_shift", "gauge", "Shift of one feature's mean, in training standard deviations", [
+                ({"feature": name}, f["z_shift"]) for name, f in report["features"].items()
+                if f["z_shift"] is not None
+            ]
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus text exposition of request, stage, model, cache and queue metrics"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# --------------------------------------------------
+# MODEL ADMINISTRATION
+# --------------------------------------------------
+
+class ModelReloadRequest(BaseModel):
+    """Request schema for loading a new model version"""
+    source: Optional[str] = Field(
+        None, description="Base URL, file:// URL or directory of the new artifacts (default MODEL_BASE_URL)"
+    )
+    manifest: Optional[str] = Field(None, description="Path to a SHA-256 manifest of the new artifacts")
+    wait: bool = Field(False, description="Respond only once the new version is serving")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Model administration is disabled; set ADMIN_TOKEN")
+    if not hmac.compare_digest((x_admin_token or "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def prune_releases():
+    """Delete release directories of this worker that are neither active nor the rollback target"""
+    if not os.path.isdir(MODEL_RELEASES_DIR):
+        return
+    keep = {os.path.abspath(bundle.model_dir) for bundle in model_registry.bundles()}
+    for name in os.listdir(MODEL_RELEASES_DIR):
+        path = os.path.abspath(os.path.join(MODEL_RELEASES_DIR, name))
+        if name.endswith(f"-{os.getpid()}") and path not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+@app.get("/admin/models", dependencies=[Depends(require_admin)])
+def model_status():
+    return model_registry.status()
+
+
+@app.post("/admin/models/reload", status_code=202, dependencies=[Depends(require_admin)])
+def reload_models(request: ModelReloadRequest = ModelReloadRequest()):
+    """
+    Load a new model version in the background and swap it in atomically
+
+    The current version keeps serving until the new one is fully loaded;
+    requests already running finish on the version they started with.
+    """
+    base_url = (request.source or BASE_URL).rstrip("/")
+
+    def load():
+        # A fresh directory per release, so files of the serving version are never overwritten
+        prune_releases()
+        release_dir = os.path.join(MODEL_RELEASES_DIR, f"{datetime.now():%Y%m%d-%H%M%S-%f}-{os.getpid()}")
+        return load_bundle(release_dir, base_url, request.manifest)
+
+    if not model_registry.reload(load):
+        raise HTTPException(status_code=409, detail="A model reload is already in progress")
+
+    if request.wait:
+        model_registry.wait()
+        if model_registry.state == "failed":
+            raise HTTPException(status_code=500, detail=f"Model reload failed: {model_registry.error}")
+    return model_registry.status()
+
+
+@app.post("/admin/models/rollback", dependencies=[Depends(require_admin)])
+def rollback_models():
+    """Swap the previously active model version back in"""
+    try:
+        model_registry.rollback()
+    except LookupError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return model_registry.status()
+
+
+class ProfilerStartRequest(BaseModel):
+    """Request schema for starting the sampling profiler"""
+    interval_ms: float = Field(PROFILER_INTERVAL_MS, gt=0, le=1000, description="Milliseconds between samples")
+    duration_seconds: Optional[float] = Field(None, gt=0, description="Stop automatically after this long")
+
+
+@app.post("/admin/profiler/start", dependencies=[Depends(require_admin)])
+def start_profiler(request: ProfilerStartRequest = ProfilerStartRequest()):
+    """Start sampling all threads' stacks; the previous profile is discarded"""
+    if not profiler.start(request.interval_ms / 1000, request.duration_seconds):
+        raise HTTPException(status_code=409, detail="The profiler is already running")
+    return profiler.status()
+
+
+@app.post("/admin/profiler/stop", dependencies=[Depends(require_admin)])
+def stop_profiler():
+    profiler.stop()
+    return profiler.status()
+
+
+@app.get("/admin/profiler", dependencies=[Depends(require_admin)])
+def profile(format: Literal["json", "collapsed"] = Query("json"), limit: Optional[int] = Query(None, gt=0)):
+    """
+    The current or last profile
+
+    ``collapsed`` returns folded stacks for flamegraph.pl or speedscope;
+    ``json`` returns the profiler state and the hottest frames.
+    """
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed(limit))
+    return profiler.status(limit or 10)
+
 # --------------------------------------------------
 # FEATURE PREPROCESSING
 # --------------------------------------------------
 
-def preprocess(data: PatientData):
-    age_years = data.age
-    bmi = data.weight / ((data.height / 100) ** 2)
-    
-    # Interaction features
-    smoke_age = data.smoke * age_years
-    smoke_bmi = data.smoke * bmi
-    alco_age = data.alco * age_years
-    alco_bmi = data.alco * bmi
-    
+# Column order of the raw patient matrix used by the batch path
+PATIENT_FIELDS = (
+    "age", "gender", "height", "weight", "ap_hi", "ap_lo",
+    "cholesterol", "gluc", "smoke", "alco", "active",
+)
+
+
+patient_values = operator.attrgetter(*PATIENT_FIELDS)
+
+
+def patients_to_array(patients: List[PatientData]) -> np.ndarray:
+    """Stack validated patients into an (N, 11) float matrix in PATIENT_FIELDS order"""
+    return np.array([patient_values(p) for p in patients], dtype=np.float64).reshape(-1, len(PATIENT_FIELDS))
+
+
+def preprocess_batch(raw: np.ndarray, models: Optional[ModelBundle] = None) -> np.ndarray:
+    """
+    Vectorized feature pipeline for an (N, 11) patient matrix
+
+    Args:
+        raw: Patient matrix with columns in PATIENT_FIELDS order
+        models: Bundle whose scalers to apply (default: the active one)
+
+    Returns:
+        np.ndarray: (N, 13) model-ready feature matrix
+    """
+    with stage_latency.time("preprocess"):
+        return _preprocess_batch(raw, models or active_models())
+
+
+def unscaled_features(raw: np.ndarray) -> tuple:
+    """(numerical, interaction) feature matrices of a raw patient matrix, (N, 4) each, before scaling"""
+    age_years = raw[:, 0]
+    bmi = raw[:, 3] / ((raw[:, 2] / 100) ** 2)
+    smoke = raw[:, 8]
+    alco = raw[:, 9]
+
     # Numerical features
-    num_features = np.array([[age_years, data.ap_hi, data.ap_lo, bmi]])
-    num_scaled = scaler_num.transform(num_features)
-    
+    num_features = np.column_stack([age_years, raw[:, 4], raw[:, 5], bmi])
+
     # Interaction features
-    int_features = np.array([[smoke_age, smoke_bmi, alco_age, alco_bmi]])
-    int_scaled = scaler_int.transform(int_features)
-    
-    # Combine all features
-    features = np.concatenate([
-        num_scaled.flatten(),
-        [data.cholesterol, data.gluc, data.smoke, data.alco, data.active],
-        int_scaled.flatten()
+    int_features = np.column_stack([
+        smoke * age_years, smoke * bmi, alco * age_years, alco * bmi
     ])
-    
-    return features.reshape(1, -1)
+    return num_features, int_features
+
+
+def _preprocess_batch(raw: np.ndarray, models: ModelBundle) -> np.ndarray:
+    num_features, int_features = unscaled_features(raw)
+
+    # Combine all features: scaled numerics, categoricals, scaled interactions
+    features = np.empty((raw.shape[0], 13), dtype=np.float64)
+    with stage_latency.time("scaler_num"):
+        features[:, 0:4] = models.scaler_num.transform(num_features)
+    features[:, 4:9] = raw[:, 6:11]
+    with stage_latency.time("scaler_int"):
+        features[:, 9:13] = models.scaler_int.transform(int_features)
+
+    return features
+
+
+def preprocess(data: PatientData, models: Optional[ModelBundle] = None):
+    return preprocess_batch(patients_to_array([data]), models)
+
+
+def cache_key(model: str, data: PatientData, models: ModelBundle) -> tuple:
+    return model, models.version, patient_digest([getattr(data, field) for field in PATIENT_FIELDS])
+
+# --------------------------------------------------
+# INPUT DRIFT
+# --------------------------------------------------
+
+# Monitored features: the scaled numerical and interaction features, and the categoricals
+DRIFT_NUMERIC = ("age", "ap_hi", "ap_lo", "bmi", "smoke_age", "smoke_bmi", "alco_age", "alco_bmi")
+DRIFT_CATEGORIES = {"cholesterol": (1, 2, 3), "gluc": (1, 2, 3), "smoke": (0, 1), "alco": (0, 1), "active": (0, 1)}
+# The interactions are zero for most patients, far from normal: their PSI needs a baseline window
+DRIFT_NORMAL = (True, True, True, True, False, False, False, False)
+
+
+def drift_features(raw: np.ndarray) -> tuple:
+    return np.hstack(unscaled_features(raw)), raw[:, 6:11]
+
+
+def drift_reference(models: ModelBundle) -> tuple:
+    """Training mean and standard deviation of DRIFT_NUMERIC, read from the bundle's scalers"""
+    num_mean, num_scale = scaler_params(models.scaler_num)
+    int_mean, int_scale = scaler_params(models.scaler_int)
+    return np.concatenate([num_mean, int_mean]), np.concatenate([num_scale, int_scale])
+
+
+# Fed by every prediction endpoint with the inputs it scored (validated raw matrices or patients)
+drift_monitor = drift.DriftMonitor(
+    DRIFT_NUMERIC, DRIFT_CATEGORIES, drift_features, patients_to_array,
+    max_pending=DRIFT_MAX_PENDING, min_rows=DRIFT_MIN_ROWS,
+) if DRIFT_MONITOR else None
+
+
+def observe_inputs(rows):
+    if drift_monitor is not None:
+        drift_monitor.observe(rows)
+
+
+@app.get("/drift")
+def input_drift():
+    """
+    Drift of the scored inputs since the last reset, per feature
+
+    z_shift is the live mean's distance from the training mean in training
+    standard deviations; psi compares the live histogram with the training
+    distribution, or with a baseline window once one is frozen.
+    """
+    if drift_monitor is None:
+        return {"enabled": False}
+    return drift_monitor.report()
+
+
+@app.post("/admin/drift/reset", dependencies=[Depends(require_admin)])
+def reset_drift(baseline: bool = Query(False, description="Freeze the current window as the PSI reference first")):
+    if drift_monitor is None:
+        raise HTTPException(status_code=404, detail="Drift monitoring is disabled; set DRIFT_MONITOR=1")
+    try:
+        drift_monitor.reset(baseline=baseline)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return drift_monitor.report()
+
+# --------------------------------------------------
+# PREDICTION AUDIT
+# --------------------------------------------------
+
+# Every served prediction, with its inputs, model, version and probability as served
+audit_log = audit.AuditLog(
+    AUDIT_DIR, PATIENT_FIELDS,
+    integer_fields=[name for name in PATIENT_FIELDS if PatientData.model_fields[name].annotation is int],
+    flush_rows=AUDIT_FLUSH_ROWS,
+    flush_seconds=AUDIT_FLUSH_SECONDS,
+    max_pending_rows=AUDIT_MAX_PENDING_ROWS,
+    max_wait=AUDIT_MAX_WAIT_MS / 1000,
+    rotate_bytes=int(AUDIT_ROTATE_MB * 2 ** 20),
+    rotate_seconds=AUDIT_ROTATE_SECONDS,
+    fsync=AUDIT_FSYNC,
+) if AUDIT_DIR else None
+
+
+def audit_results(endpoint: str, data: PatientData, *results: dict, timeout: Optional[float] = None):
+    """Record the formatted predictions served for one patient"""
+    if audit_log is not None:
+        audit_log.record(endpoint, results[0].get("model_version"), patient_values(data),
+                         [(result["model"], result["probability"], result["prediction"]) for result in results],
+                         timeout)
+
+
+async def audit_results_async(endpoint: str, data: PatientData, *results: dict):
+    """``audit_results`` from the event loop: only waiting for buffer space goes to the threadpool"""
+    try:
+        audit_results(endpoint, data, *results, timeout=0)
+    except audit.AuditFullError:
+        await run_in_threadpool(audit_results, endpoint, data, *results)
+
+
+def audit_rows(endpoint: Optional[str], model_name: str, version: str, raw: np.ndarray, probs: np.ndarray,
+               predictions: np.ndarray):
+    """Record one model's probabilities and predictions, as served, for a patient matrix; no-op without an endpoint"""
+    if audit_log is not None and endpoint is not None:
+        audit_log.record_batch(endpoint, model_name, version, raw, probs, predictions)
+
+
+@app.exception_handler(audit.AuditFullError)
+async def audit_unavailable(request: Request, exc: audit.AuditFullError):
+    # A prediction that cannot be audited is not served
+    return ORJSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": "1"})
+
+
+@app.on_event("shutdown")
+def close_audit_log():
+    if audit_log is not None:
+        audit_log.close()
+        print(f"[AUDIT] Closed; {audit_log.rows_written} records written to {audit_log.directory}")
+
+# --------------------------------------------------
+# BULK VALIDATION
+# --------------------------------------------------
+
+def implausible_bmi(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    bmi = columns["weight"] / (columns["height"] / 100) ** 2
+    return (bmi < PLAUSIBLE_BMI[0]) | (bmi > PLAUSIBLE_BMI[1])
+
+
+PLAUSIBILITY_RULES = (
+    validation.Rule("ap_lo", "Input should be less than or equal to ap_hi", lambda c: c["ap_lo"] > c["ap_hi"]),
+    validation.Rule("bmi", f"BMI (weight / height^2) should be between {PLAUSIBLE_BMI[0]} and {PLAUSIBLE_BMI[1]}",
+                    implausible_bmi),
+)
+
+# PatientData's Field constraints as vectorized column checks: as the single-patient endpoints
+# validate (sweeps), and with the plausibility rules for the bulk entry points
+patient_fields = validation.ColumnValidator(PatientData, PATIENT_FIELDS)
+patient_columns = validation.ColumnValidator(
+    PatientData, PATIENT_FIELDS, rules=PLAUSIBILITY_RULES if PLAUSIBILITY_CHECKS else ()
+)
+
+
+def validated_patients(patients: list) -> np.ndarray:
+    """
+    Patient matrix of a batch request body, checked column-wise
+
+    Raises:
+        RequestValidationError: Any patient is invalid (422, one entry per failed field)
+    """
+    with stage_latency.time("validate"):
+        raw, report = patient_columns.validate_rows(patients)
+    if not report.ok:
+        raise RequestValidationError(report.detail(("body", "patients")))
+    return raw
+
 
 # --------------------------------------------------
 # PREDICTION ENDPOINTS
 # --------------------------------------------------
 
+def score_random_forest(features: np.ndarray, models: Optional[ModelBundle] = None) -> np.ndarray:
+    models = models or active_models()
+    # The memory-mapped store has no sklearn model to fall back to
+    use_engine = models.rf_model is None or len(features) <= FLAT_FOREST_MAX_ROWS
+    engine = models.rf_engine if use_engine else models.rf_model
+    with stage_latency.time("forest"):
+        return engine.predict_proba(features)[:, 1]
+
+
+def score_logistic(raw: np.ndarray, models: Optional[ModelBundle] = None) -> np.ndarray:
+    """Logistic probabilities straight from the raw (N, 11) patient matrix via the fused engine"""
+    engine = (models or active_models()).lr_engine
+    with stage_latency.time("logistic"):
+        return engine.predict_raw(raw)
+
+
+def format_prediction(model_name: str, prob: float, model_version: Optional[str] = None) -> dict:
+    prediction = int(prob >= 0.5)
+
+    result = {
+        "model": model_name,
+        "prediction": prediction,
+        "probability": round(float(prob), 4),
+        "risk": "High Risk" if prediction else "Low Risk"
+    }
+    if model_version is not None:
+        result["model_version"] = model_version
+    return result
+
+
+def format_comparison(rf: dict, lr: dict, model_version: Optional[str] = None) -> dict:
+    result = {
+        "random_forest": rf,
+        "logistic_regression": lr,
+        "recommendation": (
+            "Both models agree on the prediction."
+            if rf["prediction"] == lr["prediction"]
+            else "Models disagree - consult a medical professional."
+        )
+    }
+    if model_version is not None:
+        result["model_version"] = model_version
+    return result
+
+
+def forest_probabilities(raw: np.ndarray, models: ModelBundle) -> np.ndarray:
+    """Forest probabilities for a raw patient matrix, in the inference pool when it serves ``models``"""
+    pool = pool_for(models)
+    if pool is not None:
+        try:
+            return pool.forest(raw)
+        except BrokenProcessPool:
+            replace_broken_pool(pool)
+    return score_random_forest(preprocess_batch(raw, models), models)
+
+
+async def forest_probabilities_async(raw: np.ndarray, models: ModelBundle) -> np.ndarray:
+    """``forest_probabilities`` awaited on the event loop; in-process scoring goes to the threadpool"""
+    pool = pool_for(models)
+    if pool is not None:
+        try:
+            return await pool.forest_async(raw)
+        except BrokenProcessPool:
+            replace_broken_pool(pool)
+    return await run_in_threadpool(forest_probabilities, raw, models)
+
+
+def score_forest_rows(models: ModelBundle, raw: np.ndarray) -> np.ndarray:
+    return score_random_forest(preprocess_batch(raw, models), models)
+
+
+forest_batcher = (
+    MicroBatcher(score_forest_rows, max_rows=MICROBATCH_MAX_ROWS, max_wait=MICROBATCH_WAIT_MS / 1000)
+    if MICROBATCH else None
+)
+
+
+def forest_probability(data: PatientData, models: ModelBundle) -> float:
+    """Random Forest probability for one patient, batched with concurrent callers when MICROBATCH is on"""
+    if forest_batcher is not None:
+        return forest_batcher.submit(models, [getattr(data, field) for field in PATIENT_FIELDS])
+    return score_random_forest(preprocess(data, models), models)[0]
+
+
+def random_forest_result(data: PatientData, models: ModelBundle) -> dict:
+    return prediction_cache.get_or_compute(
+        cache_key("randomforest", data, models),
+        lambda: format_prediction("Random Forest", forest_probability(data, models), models.version),
+    )
+
+
+async def random_forest_result_async(data: PatientData, models: ModelBundle) -> dict:
+    async def compute():
+        prob = (await forest_probabilities_async(patients_to_array([data]), models))[0]
+        return format_prediction("Random Forest", prob, models.version)
+
+    return await prediction_cache.get_or_compute_async(cache_key("randomforest", data, models), compute)
+
+
+def logistic_probability(data: PatientData, models: ModelBundle) -> float:
+    with stage_latency.time("logistic"):
+        return models.lr_engine.score_one(data)
+
+
+def logistic_result(data: PatientData, models: ModelBundle) -> dict:
+    return prediction_cache.get_or_compute(
+        cache_key("logistic", data, models),
+        lambda: format_prediction("Logistic Regression", logistic_probability(data, models), models.version),
+    )
+
+
 @app.post("/predict/randomforest")
-def predict_random_forest(data: PatientData):
+async def predict_random_forest(data: PatientData):
+    # With the process backend the forest is awaited on the event loop, not in a threadpool thread
     try:
-        features = preprocess(data)
-        prob = rf_model.predict_proba(features)[0][1]
-        prediction = int(prob >= 0.5)
-
-        return {
-            "model": "Random Forest",
-            "prediction": prediction,
-            "probability": round(float(prob), 4),
-            "risk": "High Risk" if prediction else "Low Risk"
-        }
+        models = active_models()
+        observe_inputs(data)
+        if pool_for(models) is None:
+            result = await run_in_threadpool(random_forest_result, data, models)
+        else:
+            result = await random_forest_result_async(data, models)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    await audit_results_async("/predict/randomforest", data, result)
+    return result
 
 
 @app.post("/predict/logistic")
 def predict_logistic(data: PatientData):
     try:
-        features = preprocess(data)
-        z = np.dot(features, lr_weights) + lr_bias
-        prob = sigmoid(z)[0]
-        prediction = int(prob >= 0.5)
-
-        return {
-            "model": "Logistic Regression",
-            "prediction": prediction,
-            "probability": round(float(prob), 4),
-            "risk": "High Risk" if prediction else "Low Risk"
-        }
+        models = active_models()
+        observe_inputs(data)
+        result = logistic_result(data, models)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    audit_results("/predict/logistic", data, result)
+    return result
+
+
+def compare_result(data: PatientData, models: ModelBundle) -> dict:
+    return format_comparison(random_forest_result(data, models), logistic_result(data, models), models.version)
 
 
 @app.post("/predict/compare")
-def compare_models(data: PatientData):
+async def compare_models(data: PatientData):
+    # Each half goes through the prediction cache, so a cached single-model result is reused;
+    # both halves use the same bundle even if a reload swaps models in between
     try:
-        rf = predict_random_forest(data)
-        lr = predict_logistic(data)
-
-        return {
-            "random_forest": rf,
-            "logistic_regression": lr,
-            "recommendation": (
-                "Both models agree on the prediction."
-                if rf["prediction"] == lr["prediction"]
-                else "Models disagree - consult a medical professional."
-            )
+        models = active_models()
+        observe_inputs(data)
+        if pool_for(models) is None:
+            result = await run_in_threadpool(compare_result, data, models)
+        else:
+            rf = await random_forest_result_async(data, models)
+            # The fused logistic scorer takes microseconds: cheaper inline than a worker round trip
+            lr = logistic_result(data, models)
+            result = format_comparison(rf, lr, models.version)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    await audit_results_async("/predict/compare", data, result["random_forest"], result["logistic_regression"])
+    return result
+
+
+@app.post("/predict/batch")
+def predict_batch(request: BatchPredictionRequest):
+    """
+    Score a cohort of patients in one call
+
+    Features, scalers and model calls run once over the whole batch;
+    results are returned in the same order as the input patients.
+    """
+    raw = validated_patients(request.patients)
+    try:
+        models = active_models()
+        version = models.version
+        observe_inputs(raw)
+
+        rf_probs = forest_probabilities(raw, models) if request.model != "logistic" else None
+        lr_probs = score_logistic(raw, models) if request.model != "randomforest" else None
+        # Audited as served: rounded to 4 decimals like format_prediction, predictions from the exact value
+        if rf_probs is not None:
+            audit_rows("/predict/batch", "Random Forest", version, raw, rf_probs.round(4), rf_probs >= 0.5)
+        if lr_probs is not None:
+            audit_rows("/predict/batch", "Logistic Regression", version, raw, lr_probs.round(4), lr_probs >= 0.5)
+
+        if request.model == "randomforest":
+            results = [format_prediction("Random Forest", p, version) for p in rf_probs]
+        elif request.model == "logistic":
+            results = [format_prediction("Logistic Regression", p, version) for p in lr_probs]
+        else:
+            results = [
+                format_comparison(
+                    format_prediction("Random Forest", rf_p, version),
+                    format_prediction("Logistic Regression", lr_p, version),
+                    version,
+                )
+                for rf_p, lr_p in zip(rf_probs, lr_probs)
+            ]
+
+        # Results are already plain dicts of str/float/int: skip FastAPI's jsonable_encoder pass over them
+        return ORJSONResponse({
+            "model": request.model,
+            "model_version": version,
+            "count": len(results),
+            "results": results
+        })
+    except audit.AuditFullError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# --------------------------------------------------
+# STREAMING BULK SCORING
+# --------------------------------------------------
+
+DAYS_PER_YEAR = 365.25
+
+
+def score_chunk(rows: List[dict], offset: int, model: str, age_unit: str = "years",
+                models: Optional[ModelBundle] = None, audit_endpoint: Optional[str] = None) -> List[dict]:
+    """
+    Validate and score one chunk of raw bulk rows
+
+    Args:
+        rows: Raw row dicts as read from CSV/NDJSON
+        offset: Index of the first row in the whole input
+        model: randomforest, logistic or compare
+        age_unit: Unit of the age column, years or days
+        models: Bundle to score with (default: the active one)
+        audit_endpoint: Route to audit the predictions under (None: not audited)
+
+    Returns:
+        List[dict]: One flat record per input row, in order; invalid rows carry an error
+    """
+    raw, failures = patient_columns.to_matrix(rows)
+    if age_unit == "days":
+        raw[:, 0] /= DAYS_PER_YEAR
+    with stage_latency.time("validate"):
+        report = patient_columns.check(raw, failures)
+
+    records = [
+        {"row": offset + i, "id": row.get("id") if isinstance(row, dict) else None}
+        for i, row in enumerate(rows)
+    ]
+    for i, message in report.messages().items():
+        records[i]["error"] = rows[i].error if isinstance(rows[i], bulk.UnreadableRow) else message
+
+    valid = np.flatnonzero(report.valid)
+    if len(valid):
+        models = models or active_models()
+        raw = raw[valid] if len(valid) < len(raw) else raw
+        observe_inputs(raw)
+        scored = [records[i] for i in valid.tolist()]
+        if model in ("randomforest", "compare"):
+            probs = forest_probabilities(raw, models)
+            audit_rows(audit_endpoint, "Random Forest", models.version, raw, probs.round(4), probs >= 0.5)
+            for record, prob in zip(scored, probs.tolist()):
+                record["rf_probability"] = round(prob, 4)
+                record["rf_prediction"] = int(prob >= 0.5)
+        if model in ("logistic", "compare"):
+            probs = score_logistic(raw, models)
+            audit_rows(audit_endpoint, "Logistic Regression", models.version, raw, probs.round(4), probs >= 0.5)
+            for record, prob in zip(scored, probs.tolist()):
+                record["lr_probability"] = round(prob, 4)
+                record["lr_prediction"] = int(prob >= 0.5)
+
+    return records
+
+
+@app.post("/predict/stream")
+def predict_stream(
+    file: UploadFile = File(..., description="CSV (header row, ; or , delimited) or NDJSON patient rows"),
+    model: Literal["randomforest", "logistic", "compare"] = Query("compare"),
+    age_unit: Literal["years", "days"] = Query("years", description="Unit of the age column"),
+    chunk_size: int = Query(bulk.DEFAULT_CHUNK_SIZE, ge=1, le=MAX_BATCH_SIZE),
+):
+    """
+    Score an uploaded CSV/NDJSON extract and stream results back chunk by chunk
+
+    The upload is spooled to disk and read in fixed-size chunks, so memory use
+    does not grow with the file size. Output uses the input format. The whole
+    file is scored by the model version active when the upload arrived
+    (X-Model-Version header), even if models are reloaded meanwhile.
+    """
+    fmt = bulk.detect_format(file.filename)
+    models = active_models()
+
+    def score(rows, offset, model, age_unit):
+        return score_chunk(rows, offset, model, age_unit, models, audit_endpoint="/predict/stream")
+
+    # FastAPI closes the upload once this handler returns, before the body streams
+    spool = tempfile.TemporaryFile()
+    shutil.copyfileobj(file.file, spool)
+    spool.seek(0)
+    text = TextIOWrapper(spool, encoding="utf-8", newline="")
+
+    def generate():
+        stats = {}
+        with text:
+            yield from bulk.stream_scores(text, fmt, model, score, chunk_size, age_unit, stats)
+        rate = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+        print(f"[STREAM] Scored {stats['rows']} rows ({stats['errors']} invalid) "
+              f"in {stats['seconds']:.2f}s - {rate:,.0f} rows/s")
+
+    return StreamingResponse(
+        generate(), media_type=bulk.MEDIA_TYPES[fmt], headers={"X-Model-Version": models.version}
+    )
+
+
+# --------------------------------------------------
+# COLUMNAR SCORING
+# --------------------------------------------------
+
+def score_columns(raw: np.ndarray, model: str, age_unit: str = "years",
+                  models: Optional[ModelBundle] = None, audit_endpoint: Optional[str] = None) -> tuple:
+    """
+    Validate and score a decoded (N, 11) patient matrix without building per-row objects
+
+    Args:
+        raw: Patient matrix in PATIENT_FIELDS order; age is converted in place for days
+        model: randomforest, logistic or compare
+        age_unit: Unit of the age column, years or days
+        models: Bundle to score with (default: the active one)
+        audit_endpoint: Route to audit the predictions under (None: not audited)
+
+    Returns:
+        tuple: (result columns, {row: error}); invalid rows get NaN probabilities and prediction -1
+    """
+    models = models or active_models()
+    if age_unit == "days":
+        raw[:, 0] /= DAYS_PER_YEAR
+    with stage_latency.time("validate"):
+        report = patient_columns.check(raw)
+    valid, errors = report.valid, report.messages()
+    scored = raw if not errors else raw[valid]
+    if len(scored):
+        observe_inputs(scored)
+
+    scorers = {
+        "randomforest": [("rf", "Random Forest", forest_probabilities)],
+        "logistic": [("lr", "Logistic Regression", score_logistic)],
+        "compare": [("rf", "Random Forest", forest_probabilities), ("lr", "Logistic Regression", score_logistic)],
+    }
+    table = {}
+    for prefix, model_name, score in scorers[model]:
+        probs = np.full(len(raw), np.nan)
+        predictions = np.full(len(raw), -1, dtype=np.int8)
+        if len(scored):
+            probs[valid] = score(scored, models)
+            predictions[valid] = probs[valid] >= 0.5
+            audit_rows(audit_endpoint, model_name, models.version, scored, probs[valid], predictions[valid])
+        table[f"{prefix}_probability"] = probs
+        table[f"{prefix}_prediction"] = predictions
+    return table, errors
+
+
+@app.post(
+    "/predict/columnar",
+    response_class=Response,
+    openapi_extra={"requestBody": {"required": True, "content": {
+        media_type: {"schema": {"type": "string", "format": "binary"}}
+        for media_type in columnar.CONTENT_TYPES
+    }}},
+)
+async def predict_columnar(
+    request: Request,
+    model: Literal["randomforest", "logistic", "compare"] = Query("compare"),
+    age_unit: Literal["years", "days"] = Query("years", description="Unit of the age column"),
+):
+    """
+    Score the 11 patient columns sent as Arrow IPC, .npy or msgpack (by Content-Type)
+
+    The response uses the request's format, one row per input row in order:
+    ``rf_probability``/``rf_prediction`` and/or ``lr_probability``/``lr_prediction``
+    (full precision) and ``error``. Invalid rows are reported, not rejected.
+    """
+    fmt = columnar.format_for(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(status_code=415, detail=f"Send one of: {', '.join(columnar.CONTENT_TYPES)}")
+    if not columnar.available(fmt):
+        raise HTTPException(status_code=415,
+                            detail=f"{fmt} payloads need the {columnar.DEPENDENCIES[fmt]} package on the server")
+
+    body = await request.body()
+    models = active_models()
+    try:
+        raw = await run_in_threadpool(columnar.decode, body, fmt, PATIENT_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if len(raw) > COLUMNAR_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {COLUMNAR_MAX_ROWS} rows per request")
+
+    def score():
+        table, errors = score_columns(raw, model, age_unit, models, audit_endpoint="/predict/columnar")
+        return columnar.encode(table, errors, fmt), len(errors)
+
+    try:
+        content, invalid = await run_in_threadpool(score)
+    except audit.AuditFullError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return Response(content, media_type=columnar.MEDIA_TYPES[fmt], headers={
+        "X-Model-Version": models.version,
+        "X-Invalid-Rows": str(invalid),
+    })
+
+
+# --------------------------------------------------
+# WHAT-IF SWEEP
+# --------------------------------------------------
+
+# Sweepable features: the patient fields plus BMI, which rescales weight at the patient's height
+SWEEP_FEATURES = Literal[
+    "age", "gender", "height", "weight", "ap_hi", "ap_lo",
+    "cholesterol", "gluc", "smoke", "alco", "active", "bmi",
+]
+
+
+class SweepAxis(BaseModel):
+    """One swept feature: ``steps`` evenly spaced values from ``start`` to ``stop`` inclusive"""
+    feature: SWEEP_FEATURES = Field(..., description="Feature to vary, or bmi")
+    start: float = Field(..., description="First value")
+    stop: float = Field(..., description="Last value")
+    steps: int = Field(20, ge=1, le=MAX_SWEEP_STEPS, description="Number of values")
+
+    def values(self) -> np.ndarray:
+        return np.linspace(self.start, self.stop, self.steps)
+
+
+class SweepRequest(BaseModel):
+    """Request schema for a what-if sweep around one patient"""
+    patient: PatientData = Field(..., description="Baseline patient; unswept features keep these values")
+    axes: List[SweepAxis] = Field(..., min_length=1, max_length=2, description="One axis (curve) or two (surface)")
+    model: Literal["randomforest", "logistic", "compare"] = Field("compare")
+
+    @model_validator(mode="after")
+    def distinct_features(self):
+        features = {axis.feature for axis in self.axes}
+        if len(features) < len(self.axes):
+            raise ValueError("Sweep two different features")
+        if {"bmi", "weight"} <= features:
+            raise ValueError("bmi and weight cannot be swept together: bmi sets the weight")
+        return self
+
+
+def sweep_grid(request: SweepRequest) -> np.ndarray:
+    """
+    Raw patient matrix of every grid point, the first axis varying slowest
+
+    Args:
+        request: Baseline patient and one or two axes
+
+    Returns:
+        np.ndarray: (prod(steps), 11) matrix in PATIENT_FIELDS order
+    """
+    values = [axis.values() for axis in request.axes]
+    grid = np.meshgrid(*values, indexing="ij")
+    raw = np.tile(patients_to_array([request.patient]), (grid[0].size, 1))
+
+    bmi = None
+    for axis, points in zip(request.axes, grid):
+        if axis.feature == "bmi":
+            bmi = points.ravel()
+        else:
+            raw[:, PATIENT_FIELDS.index(axis.feature)] = points.ravel()
+    if bmi is not None:
+        # Applied last so a swept height is used
+        raw[:, PATIENT_FIELDS.index("weight")] = bmi * (raw[:, PATIENT_FIELDS.index("height")] / 100) ** 2
+    return raw
+
+
+@app.post("/predict/sweep")
+def predict_sweep(request: SweepRequest):
+    """
+    Risk response curve (one axis) or surface (two axes) around one patient
+
+    The whole grid is built as one matrix and scored by each model in a
+    single vectorized call. Probabilities are indexed like the axes: a list
+    for one axis, ``[i][j]`` for values ``i`` of the first and ``j`` of the
+    second axis.
+    """
+    raw = sweep_grid(request)
+    # Same checks as /predict/compare on each point, so every cell matches a single-patient call
+    valid, errors = patient_fields.validate(raw)
+    if errors:
+        row, message = next(iter(errors.items()))
+        index = np.unravel_index(row, [axis.steps for axis in request.axes])
+        point = ", ".join(f"{axis.feature}={axis.values()[i]:g}" for axis, i in zip(request.axes, index))
+        raise HTTPException(status_code=422,
+                            detail=f"{len(errors)} of {len(raw)} grid points are invalid, e.g. {point}: {message}")
+
+    try:
+        models = active_models()
+        shape = [axis.steps for axis in request.axes]
+        response = {
+            "model": request.model,
+            "model_version": models.version,
+            "axes": [{"feature": axis.feature, "values": axis.values().round(4).tolist()} for axis in request.axes],
+            "points": len(raw),
         }
+        # Every grid point is audited like a batch of patients, with the prediction /predict would serve
+        if request.model in ("randomforest", "compare"):
+            probs = forest_probabilities(raw, models)
+            audit_rows("/predict/sweep", "Random Forest", models.version, raw, probs.round(4), probs >= 0.5)
+            response["random_forest"] = probs.round(4).reshape(shape).tolist()
+        if request.model in ("logistic", "compare"):
+            probs = score_logistic(raw, models)
+            audit_rows("/predict/sweep", "Logistic Regression", models.version, raw, probs.round(4), probs >= 0.5)
+            response["logistic_regression"] = probs.round(4).reshape(shape).tolist()
+        return ORJSONResponse(response)
+    except audit.AuditFullError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# --------------------------------------------------
+# EXPLANATIONS
+# --------------------------------------------------
+
+# Forest explainers by model version, built on first use (the sklearn backend keeps no flat forest)
+forest_explainers: Dict[str, explain.ForestExplainer] = {}
+forest_explainers_lock = threading.Lock()
+
+
+def forest_explainer(models: ModelBundle) -> explain.ForestExplainer:
+    with forest_explainers_lock:
+        explainer = forest_explainers.get(models.version)
+        if explainer is None:
+            forest = models.rf_engine if isinstance(models.rf_engine, FlatForest) else FlatForest.from_sklearn(
+                models.rf_model
+            )
+            explainer = explain.ForestExplainer(forest)
+            # Drop versions the registry can no longer serve
+            live = {bundle.version for bundle in model_registry.bundles()}
+            for version in [v for v in forest_explainers if v not in live]:
+                del forest_explainers[version]
+            forest_explainers[models.version] = explainer
+        return explainer
+
+
+def explain_rows(raw: np.ndarray, model: str, models: ModelBundle) -> List[dict]:
+    """
+    Feature attributions for an (N, 11) patient matrix, one vectorized pass per model
+
+    Args:
+        raw: Patient matrix in PATIENT_FIELDS order
+        model: randomforest, logistic or compare
+        models: Bundle to explain
+
+    Returns:
+        List[dict]: Per row, the model features in original units and, per model, the
+        probability, base value and per-feature contributions (probability for the forest,
+        log-odds for the logistic model)
+    """
+    features = preprocess_batch(raw, models)
+    values = explain.original_units(features, models.scaler_num, models.scaler_int)
+    results = [{"features": dict(zip(explain.MODEL_FEATURES, row))} for row in values.round(4).tolist()]
+
+    if model in ("randomforest", "compare"):
+        explainer = forest_explainer(models)
+        with stage_latency.time("explain"):
+            contributions = explainer.contributions(features)
+        probs = explainer.base_value + contributions.sum(axis=1)
+        for result, prob, row in zip(results, probs.tolist(), contributions.round(4).tolist()):
+            result["random_forest"] = {
+                "probability": round(prob, 4),
+                "prediction": int(prob >= 0.5),
+                "base_value": round(explainer.base_value, 4),
+                "contributions": dict(zip(explain.MODEL_FEATURES, row)),
+            }
+
+    if model in ("logistic", "compare"):
+        explainer = explain.LogisticExplainer(models.scaler_num, models.scaler_int, models.lr_weights, models.lr_bias)
+        contributions = explainer.contributions(values)
+        log_odds = explainer.base_value + contributions.sum(axis=1)
+        for result, z, prob, row in zip(results, log_odds.tolist(), sigmoid(log_odds).tolist(),
+                                        contributions.round(4).tolist()):
+            result["logistic_regression"] = {
+                "probability": round(prob, 4),
+                "prediction": int(prob >= 0.5),
+                "log_odds": round(z, 4),
+                "base_value": round(explainer.base_value, 4),
+                "contributions": dict(zip(explain.MODEL_FEATURES, row)),
+            }
+
+    return results
+
+
+def explain_patients(raw: np.ndarray, model: str, models: ModelBundle) -> List[dict]:
+    """``explain_rows`` for a validated patient matrix, served from the prediction cache where possible"""
+    # Same keys as cache_key: the digest packs values as float64 either way
+    keys = [(f"explain:{model}", models.version, patient_digest(row)) for row in raw.tolist()]
+    results = [prediction_cache.get(key) for key in keys] if prediction_cache.enabled else [None] * len(keys)
+    missing = [i for i, result in enumerate(results) if result is None]
+
+    if missing:
+        # Cache misses are explained together in one batch
+        for i, result in zip(missing, explain_rows(raw[missing], model, models)):
+            results[i] = result
+            prediction_cache.put(keys[i], result)
+    return results
+
+
+def audit_explanations(endpoint: str, raw: np.ndarray, results: List[dict], models: ModelBundle):
+    """Record the probabilities served with explanations, cached ones included"""
+    for key, model_name in (("random_forest", "Random Forest"), ("logistic_regression", "Logistic Regression")):
+        if key in results[0]:
+            probs = np.array([result[key]["probability"] for result in results])
+            predictions = np.array([result[key]["prediction"] for result in results])
+            audit_rows(endpoint, model_name, models.version, raw, probs, predictions)
+
+
+@app.post("/explain")
+def explain_prediction(
+    data: PatientData,
+    model: Literal["randomforest", "logistic", "compare"] = Query("compare"),
+):
+    """
+    Per-feature contributions behind one patient's prediction
+
+    Forest contributions are in probability units and add up with
+    ``base_value`` to the forest probability. Logistic contributions are in
+    log-odds and add up with ``base_value`` (the model's intercept) to
+    ``log_odds``. They are measured from the training mean for age, ap_hi,
+    ap_lo, bmi and the four interaction terms, and from 0 for cholesterol,
+    gluc, smoke, alco and active, which are not scaled.
+    """
+    try:
+        models = active_models()
+        raw = patients_to_array([data])
+        results = explain_patients(raw, model, models)
+        audit_explanations("/explain", raw, results, models)
+        return {"model": model, "model_version": models.version, **results[0]}
+    except audit.AuditFullError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/explain/batch")
+def explain_batch(request: BatchPredictionRequest):
+    """Explanations for a cohort of patients, in input order"""
+    raw = validated_patients(request.patients)
+    try:
+        models = active_models()
+        results = explain_patients(raw, request.model, models)
+        audit_explanations("/explain/batch", raw, results, models)
+        return ORJSONResponse({
+            "model": request.model,
+            "model_version": models.version,
+            "count": len(results),
+            "results": results,
+        })
+    except audit.AuditFullError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -258,10 +1723,14 @@ def compare_models(data: PatientData):
 # PDF GENERATION UTILITY
 # --------------------------------------------------
 
+report_template = ReportTemplate()
+
 def generate_pdf_report(patient_name: str, patient_data: PatientData, 
                        model_type: str, prediction_result: PredictionResult) -> BytesIO:
     """
     Generate a professional PDF report for cardiovascular disease prediction
+
+    Styles and static content come precompiled from report_template.
     
     Args:
         patient_name: Patient's full name
@@ -272,185 +1741,17 @@ def generate_pdf_report(patient_name: str, patient_data: PatientData,
     Returns:
         BytesIO: PDF file in memory
     """
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, 
-                           rightMargin=72, leftMargin=72,
-                           topMargin=72, bottomMargin=18)
-    
-    # Container for PDF elements
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#4A148C'),
-        spaceAfter=30,
-        alignment=TA_CENTER
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#6A1B9A'),
-        spaceAfter=12,
-        spaceBefore=12
-    )
-    
-    # Title
-    title = Paragraph("CardioSense Health Report", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 0.2*inch))
-    
-    # Report metadata
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    meta_data = [
-        ["Report Date:", timestamp],
-        ["Patient Name:", patient_name],
-        ["Model Type:", model_type.replace("_", " ").title()],
-    ]
-    
-    meta_table = Table(meta_data, colWidths=[2*inch, 4*inch])
-    meta_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-    ]))
-    elements.append(meta_table)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Patient Information Section
-    elements.append(Paragraph("Patient Health Metrics", heading_style))
-    
-    bmi = patient_data.weight / ((patient_data.height / 100) ** 2)
-    
-    patient_info = [
-        ["Metric", "Value"],
-        ["Age", f"{patient_data.age} years"],
-        ["Gender", "Male" if patient_data.gender == 2 else "Female"],
-        ["Height", f"{patient_data.height} cm"],
-        ["Weight", f"{patient_data.weight} kg"],
-        ["BMI", f"{bmi:.2f}"],
-        ["Systolic BP", f"{patient_data.ap_hi} mmHg"],
-        ["Diastolic BP", f"{patient_data.ap_lo} mmHg"],
-        ["Cholesterol", ["Normal", "Above Normal", "Well Above Normal"][patient_data.cholesterol-1]],
-        ["Glucose", ["Normal", "Above Normal", "Well Above Normal"][patient_data.gluc-1]],
-        ["Smoking", "Yes" if patient_data.smoke else "No"],
-        ["Alcohol", "Yes" if patient_data.alco else "No"],
-        ["Physical Activity", "Yes" if patient_data.active else "No"],
-    ]
-    
-    patient_table = Table(patient_info, colWidths=[2.5*inch, 3.5*inch])
-    patient_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6A1B9A')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F3E5F5')]),
-    ]))
-    elements.append(patient_table)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Prediction Results Section
-    elements.append(Paragraph("Prediction Results", heading_style))
-    
-    # Single model mode - use PredictionResult fields directly
-    results_data = [
-        ["Metric", "Value"],
-        ["Model", model_type.replace("_", " ").title()],
-        ["Risk Level", prediction_result.risk_level],
-        ["Probability", f"{prediction_result.probability * 100:.2f}%"],
-    ]
-    
-    results_table = Table(results_data, colWidths=[2.5*inch, 3.5*inch])
-    
-    # Color based on risk level
-    is_high_risk = "High" in prediction_result.risk_level
-    header_color = colors.HexColor('#D32F2F') if is_high_risk else colors.HexColor('#388E3C')
-    
-    table_style = [
-        ('BACKGROUND', (0, 0), (-1, 0), header_color),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-    ]
-    
-    results_table.setStyle(TableStyle(table_style))
-    elements.append(results_table)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Recommendations Section
-    elements.append(Paragraph("Medical Recommendations", heading_style))
-    
-    if is_high_risk:
-        recommendations = [
-            "• Consult a cardiologist for comprehensive evaluation",
-            "• Monitor blood pressure and cholesterol regularly",
-            "• Adopt a heart-healthy diet low in sodium and saturated fats",
-            "• Engage in regular physical activity (150 minutes/week)",
-            "• Consider stress management techniques",
-            "• Follow prescribed medication regimen if applicable",
-        ]
-    else:
-        recommendations = [
-            "• Maintain current healthy lifestyle habits",
-            "• Schedule regular annual cardiovascular check-ups",
-            "• Continue balanced diet and physical activity",
-            "• Monitor blood pressure periodically",
-            "• Stay informed about cardiovascular health",
-        ]
-    
-    for rec in recommendations:
-        elements.append(Paragraph(rec, styles['Normal']))
-        elements.append(Spacer(1, 0.1*inch))
-    
-    elements.append(Spacer(1, 0.2*inch))
-    
-    # Disclaimer
-    disclaimer_style = ParagraphStyle(
-        'Disclaimer',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=colors.HexColor('#D32F2F'),
-        leftIndent=20,
-        rightIndent=20,
-        spaceAfter=10,
-    )
-    
-    disclaimer_text = "<b>Medical Disclaimer:</b> This report is generated by an AI-based educational tool and should NOT be used for medical diagnosis. Always consult qualified healthcare professionals for medical advice, diagnosis, or treatment."
-    elements.append(Paragraph(disclaimer_text, disclaimer_style))
-    
-    # Footer
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.grey,
-        alignment=TA_CENTER,
-    )
-    elements.append(Spacer(1, 0.2*inch))
-    elements.append(Paragraph("Generated by CardioSense | Machine Learning Prediction System", footer_style))
-    
-    # Build PDF
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer
+    with stage_latency.time("pdf_render"):
+        return report_template.render(patient_name, patient_data, model_type, prediction_result)
 
 
 # --------------------------------------------------
 # RESEND EMAIL UTILITY
 # --------------------------------------------------
 
+# Offline stand-in for resend.Emails (EMAIL_BACKEND=stub)
+email_stub = reports.StubEmailClient(latency_seconds=float(os.getenv("EMAIL_STUB_LATENCY", "0")))
+
 def send_email_with_resend(to_email: str, patient_name: str,
                            pdf_buffer: BytesIO, risk_level: str,
                            model_type: str, probability: float) -> bool:
@@ -466,104 +1767,148 @@ def send_email_with_resend(to_email: str, patient_name: str,
         probability: Risk probability
     
     Returns:
-        bool: True if email sent successfully, False otherwise
-    """
-    api_key = os.getenv("RESEND_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="RESEND_API_KEY is not configured")
+        bool: True if email sent successfully
 
-    resend.api_key = api_key
+    Raises:
+        reports.PermanentError: Missing credentials or a request the provider rejects
+    """
+    if EMAIL_BACKEND == "stub":
+        client = email_stub
+    else:
+        api_key = os.getenv("RESEND_API_KEY")
+        if not api_key:
+            raise reports.PermanentError("RESEND_API_KEY is not configured")
+        resend.api_key = api_key
+        client = resend.Emails
 
     pdf_base64 = base64.b64encode(pdf_buffer.getvalue()).decode("utf-8")
     subject = f"CardioSense Health Report - {patient_name}"
 
     try:
-        resend.Emails.send({
-            "from": "CardioSense <reports@resend.dev>",
-            "to": to_email,
-            "subject": subject,
-            "html": f"""
-                <p>Dear {patient_name},</p>
-                <p>Thank you for using the CardioSense cardiovascular risk assessment.</p>
-                <p><b>Assessment Summary:</b></p>
-                <ul>
-                  <li>Model Used: {model_type}</li>
-                  <li>Risk Level: {risk_level}</li>
-                  <li>Probability: {probability * 100:.2f}%</li>
-                  <li>Report Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</li>
-                </ul>
-                <p>Your full report is attached as a PDF.</p>
-                <p><b>Disclaimer:</b> This is an AI-generated educational report and should NOT be used for medical diagnosis. Please consult qualified healthcare professionals.</p>
-                <p>Best regards,<br/>CardioSense Support Team</p>
-                <p style="font-size: 12px; color: #6b7280;">This is an automated message. Please do not reply.</p>
-            """,
-            "attachments": [
-                {
-                    "filename": f"CardioSense_Report_{patient_name.replace(' ', '_')}.pdf",
-                    "content": pdf_base64
-                }
-            ]
-        })
+        with stage_latency.time("email_send"):
+            client.send({
+                "from": "CardioSense <reports@resend.dev>",
+                "to": to_email,
+                "subject": subject,
+                "html": f"""
+                    <p>Dear {patient_name},</p>
+                    <p>Thank you for using the CardioSense cardiovascular risk assessment.</p>
+                    <p><b>Assessment Summary:</b></p>
+                    <ul>
+                      <li>Model Used: {model_type}</li>
+                      <li>Risk Level: {risk_level}</li>
+                      <li>Probability: {probability * 100:.2f}%</li>
+                      <li>Report Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</li>
+                    </ul>
+                    <p>Your full report is attached as a PDF.</p>
+                    <p><b>Disclaimer:</b> This is an AI-generated educational report and should NOT be used for medical diagnosis. Please consult qualified healthcare professionals.</p>
+                    <p>Best regards,<br/>CardioSense Support Team</p>
+                    <p style="font-size: 12px; color: #6b7280;">This is an automated message. Please do not reply.</p>
+                """,
+                "attachments": [
+                    {
+                        "filename": f"CardioSense_Report_{patient_name.replace(' ', '_')}.pdf",
+                        "content": pdf_base64
+                    }
+                ]
+            })
 
-        print(f"[EMAIL] Successfully sent report to {to_email} via Resend")
+        print(f"[EMAIL] Successfully sent report to {to_email} via {EMAIL_BACKEND}")
         return True
 
-    except Exception as e:
+    except resend.exceptions.ResendError as e:
         print(f"[EMAIL ERROR] Failed to send email via Resend: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to send email: {str(e)}")
+        # Client errors (bad key, unverified sender, demo-mode recipient) will not succeed on retry
+        if str(e.code).startswith("4") and str(e.code) != "429":
+            raise reports.PermanentError(f"Failed to send email: {str(e)}") from e
+        raise
+    except Exception as e:
+        print(f"[EMAIL ERROR] Failed to send email via {EMAIL_BACKEND}: {str(e)}")
+        raise
 
 
 # --------------------------------------------------
 # EMAIL REPORT ENDPOINT
 # --------------------------------------------------
 
-@app.post("/send-report")
-def send_report(request: EmailReportRequest):
+def deliver_report(job: dict) -> dict:
     """
-    Generate PDF report and send via email
-    
-    This endpoint:
-    1. Generates a professional PDF report with patient data and predictions
-    2. Sends the report via Resend email API with secure credentials
-    3. Returns confirmation of delivery
+    Render and email one report; runs on a report worker thread
+
+    The PDF is rendered on the first attempt only, retries just resend it.
     """
-    try:
-        # Use risk_level and probability directly from frontend
-        risk_level = request.prediction_result.risk_level
-        probability = request.prediction_result.probability
-        
-        # Generate PDF report
-        pdf_buffer = generate_pdf_report(
+    request = job["request"]
+    if job.get("pdf") is None:
+        job["pdf"] = generate_pdf_report(
             patient_name=request.patient_name,
             patient_data=request.patient_data,
             model_type=request.model_type,
             prediction_result=request.prediction_result
         )
-        
-        # Send email with PDF attachment via Resend
-        send_email_with_resend(
-            to_email=request.to_email,
-            patient_name=request.patient_name,
-            pdf_buffer=pdf_buffer,
-            risk_level=risk_level,
-            model_type=request.model_type,
-            probability=probability
-        )
-        
-        return {
-            "status": "success",
-            "message": f"Report successfully sent to {request.to_email}",
-            "timestamp": datetime.now().isoformat(),
-            "recipient": request.to_email,
-            "patient_name": request.patient_name,
-            "risk_level": risk_level,
-            "probability": f"{probability * 100:.2f}%"
-        }
-        
-    except ValueError as ve:
-        raise HTTPException(status_code=500, detail=str(ve))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to send report: {str(e)}")
+
+    send_email_with_resend(
+        to_email=request.to_email,
+        patient_name=request.patient_name,
+        pdf_buffer=job["pdf"],
+        risk_level=request.prediction_result.risk_level,
+        model_type=request.model_type,
+        probability=request.prediction_result.probability
+    )
+    return {"recipient": request.to_email, "sent_at": datetime.now().isoformat()}
+
+
+report_pipeline = reports.ReportPipeline(
+    deliver_report,
+    workers=REPORT_WORKERS,
+    max_queue=REPORT_QUEUE_SIZE,
+    max_attempts=REPORT_MAX_ATTEMPTS,
+    backoff_seconds=REPORT_RETRY_BACKOFF,
+)
+
+
+@app.on_event("shutdown")
+def stop_report_workers():
+    # Give queued reports a chance to go out before the process exits
+    if not report_pipeline.shutdown(timeout=30):
+        print(f"[REPORT] Shutting down with {report_pipeline.stats()['pending']} report(s) undelivered")
+
+
+@app.post("/send-report", status_code=202)
+def send_report(request: EmailReportRequest):
+    """
+    Queue a PDF report for generation and email delivery
+
+    This endpoint:
+    1. Queues the report job and returns its id immediately
+    2. A report worker generates the PDF and sends it via Resend, retrying on failure
+    3. Poll GET /send-report/{job_id} for the delivery status
+    """
+    try:
+        job = report_pipeline.submit({"request": request})
+    except reports.QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+    probability = request.prediction_result.probability
+    return {
+        "status": "queued",
+        "job_id": job.id,
+        "status_url": f"/send-report/{job.id}",
+        "message": f"Report for {request.to_email} queued for delivery",
+        "timestamp": datetime.now().isoformat(),
+        "recipient": request.to_email,
+        "patient_name": request.patient_name,
+        "risk_level": request.prediction_result.risk_level,
+        "probability": f"{probability * 100:.2f}%"
+    }
+
+
+@app.get("/send-report/{job_id}")
+def report_status(job_id: str):
+    """Delivery status of a queued report: queued, running, retrying, sent or failed"""
+    job = report_pipeline.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown report job {job_id}")
+    return job.info()
 
 
 # --------------------------------------------------
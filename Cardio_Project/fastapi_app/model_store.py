@@ -0,0 +1,238 @@
+"""
+Memory-mapped model store.
+
+Pickled models are deserialized into private heap memory, so every worker
+process holds its own copy of the forest. The store instead keeps every
+model parameter as a plain ``.npy`` file that is opened with
+``np.load(mmap_mode="r")``: the arrays live in the OS page cache and all
+workers on a host share one physical copy.
+
+A store at ``models/store`` is a symlink to the sibling directory holding
+the current version (``models/.store-<version>``), so a rebuilt store is
+swapped in atomically. Layout of that directory:
+
+    meta.json                  version, forest depth/width, source files
+    forest_<field>.npy         FlatForest arrays (feature, threshold, ...)
+    scaler_num_mean.npy, scaler_num_scale.npy
+    scaler_int_mean.npy, scaler_int_scale.npy
+    logistic_weights.npy, logistic_bias.npy
+
+Convert the downloaded pickles once with:
+
+    python model_store.py convert models/ models/store/
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+from forest_engine import FlatForest
+from logistic_engine import scaler_params
+
+META_FILE = "meta.json"
+FORMAT_VERSION = 1
+
+
+class StoredScaler:
+    """StandardScaler stand-in backed by (memory-mapped) mean/scale arrays"""
+
+    # The stored arrays already hold the identity where the original did not centre/scale
+    with_mean = True
+    with_std = True
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        # Same arithmetic as StandardScaler.transform with_mean/with_std
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+def is_store(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+def read_meta(path: str) -> dict:
+    """The store's metadata, or an empty dict if ``path`` holds no store"""
+    if not is_store(path):
+        return {}
+    with open(os.path.join(path, META_FILE)) as f:
+        return json.load(f)
+
+
+def _scaler_arrays(scaler):
+    mean, scale = scaler_params(scaler)
+    return np.ascontiguousarray(mean), np.ascontiguousarray(scale)
+
+
+def write_store(path: str, forest: FlatForest, scaler_num, scaler_int,
+                lr_weights, lr_bias, source: dict = None, replace: bool = False) -> dict:
+    """
+    Write models as a memory-mappable store at ``path``
+
+    The store is assembled in a temporary sibling directory, renamed to a
+    sibling named after its content version and published by pointing the
+    ``path`` symlink at it, so concurrent workers never see a partial or
+    missing store. Without ``replace`` whoever links first wins; with it the
+    link is swapped atomically (processes that already mapped the old store
+    keep their pages).
+
+    Returns:
+        dict: The store's metadata
+    """
+    arrays = {f"forest_{name}": array for name, array in forest.arrays().items()}
+    arrays["scaler_num_mean"], arrays["scaler_num_scale"] = _scaler_arrays(scaler_num)
+    arrays["scaler_int_mean"], arrays["scaler_int_scale"] = _scaler_arrays(scaler_int)
+    arrays["logistic_weights"] = np.asarray(lr_weights, dtype=np.float64).ravel()
+    arrays["logistic_bias"] = np.asarray(lr_bias, dtype=np.float64).ravel()
+
+    digest = hashlib.sha256()
+    for name in sorted(arrays):
+        array = np.ascontiguousarray(arrays[name])
+        digest.update(f"{name}:{array.dtype.str}:{array.shape};".encode())
+        digest.update(array.tobytes())
+
+    meta = {
+        "format": FORMAT_VERSION,
+        "version": digest.hexdigest()[:12],
+        "forest": {"max_depth": forest.max_depth, "n_features": forest.n_features,
+                   "n_trees": forest.n_trees, "n_nodes": forest.n_nodes,
+                   "value_scale": forest.value_scale},
+        "arrays": sorted(arrays),
+        "source": source or {},
+    }
+
+    # ``path`` is a symlink to a directory named after the content version, so a
+    # replacement is one atomic rename of the link and readers never find it missing
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    target = f".{os.path.basename(os.path.abspath(path))}-{meta['version']}"
+    target_dir = os.path.join(parent, target)
+    tmp = tempfile.mkdtemp(prefix=".store-", dir=parent)
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(tmp, META_FILE), "w") as f:
+            json.dump(meta, f, indent=2)
+        try:
+            os.rename(tmp, target_dir)
+        except OSError:
+            if not is_store(target_dir):
+                raise
+            # Same content already written by another worker
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    previous = os.path.realpath(path) if os.path.islink(path) else None
+    if os.path.isdir(path) and not os.path.islink(path):
+        if is_store(path) and not replace:
+            return read_meta(path)
+        # A store from before versioned directories (or an empty placeholder): swapped out once, non-atomically
+        old = tempfile.mkdtemp(prefix=".store-old-", dir=parent)
+        os.rename(path, os.path.join(old, "store"))
+        shutil.rmtree(old, ignore_errors=True)
+
+    if replace:
+        link = os.path.join(parent, f".store-link-{os.getpid()}-{threading.get_ident()}")
+        os.symlink(target, link)
+        os.replace(link, path)
+    else:
+        try:
+            os.symlink(target, path)
+        except FileExistsError:
+            # Another worker finished converting first; keep its store
+            return read_meta(path)
+
+    if previous and previous != os.path.realpath(path):
+        # Processes that already mapped it keep their pages
+        shutil.rmtree(previous, ignore_errors=True)
+    return meta
+
+
+def load_store(path: str) -> dict:
+    """
+    Open a store with every array memory-mapped read-only
+
+    Returns:
+        dict: forest (FlatForest), scaler_num, scaler_int, lr_weights, lr_bias, meta
+    """
+    for attempt in range(3):
+        try:
+            return _load_store(os.path.realpath(path))
+        except FileNotFoundError:
+            # The link was swapped and its old target removed while we read it
+            if attempt == 2:
+                raise
+
+
+def _load_store(path: str) -> dict:
+    # Meta and arrays come from one resolved version directory
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    if meta.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model store format {meta.get('format')} in {path}")
+
+    def load(name):
+        # Plain ndarray view of the mapping: no memmap subclass overhead on fancy indexing
+        return np.asarray(np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+
+    forest = FlatForest.from_arrays(
+        {name: load(f"forest_{name}") for name in FlatForest.ARRAY_FIELDS},
+        max_depth=meta["forest"]["max_depth"],
+        n_features=meta["forest"]["n_features"],
+        value_scale=meta["forest"].get("value_scale", 1.0),
+    )
+    return {
+        "forest": forest,
+        "scaler_num": StoredScaler(load("scaler_num_mean"), load("scaler_num_scale")),
+        "scaler_int": StoredScaler(load("scaler_int_mean"), load("scaler_int_scale")),
+        "lr_weights": load("logistic_weights"),
+        "lr_bias": load("logistic_bias"),
+        "meta": meta,
+    }
+
+
+def convert(model_dir: str, store_dir: str, replace: bool = True) -> dict:
+    """Build a store from the pickled/npy artifacts in ``model_dir``"""
+    import joblib
+
+    from artifacts import sha256_file
+
+    sources = ("random_forest_model.pkl", "scaler_num.pkl", "scaler_int.pkl",
+               "logistic_weights.npy", "logistic_bias.npy")
+    return write_store(
+        store_dir,
+        FlatForest.from_sklearn(joblib.load(os.path.join(model_dir, "random_forest_model.pkl"))),
+        joblib.load(os.path.join(model_dir, "scaler_num.pkl")),
+        joblib.load(os.path.join(model_dir, "scaler_int.pkl")),
+        np.load(os.path.join(model_dir, "logistic_weights.npy")),
+        np.load(os.path.join(model_dir, "logistic_bias.npy")),
+        source={name: sha256_file(os.path.join(model_dir, name)) for name in sources},
+        replace=replace,
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Memory-mapped model store tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    conv = sub.add_parser("convert", help="Convert downloaded pickles into a memory-mapped store")
+    conv.add_argument("model_dir", help="Directory with the MODEL_FILES artifacts")
+    conv.add_argument("store_dir", help="Directory to create the store in")
+    args = parser.parse_args(argv)
+
+    meta = convert(args.model_dir, args.store_dir)
+    print(f"[OK] Store {meta['version']} written to {args.store_dir}: "
+          f"{meta['forest']['n_trees']} trees, {meta['forest']['n_nodes']} nodes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Sampling profiler that can be switched on in a running server.
+
+A background thread reads every other thread's current stack
+(``sys._current_frames()``) at a fixed interval and counts identical stacks.
+Nothing is hooked into the interpreter, so the cost is confined to the
+sampling thread and disappears when it stops. Threads parked in a queue,
+lock or selector are skipped so the counts show where CPU time goes.
+
+Stacks are counted as tuples of code objects and only formatted when the
+profile is read, as "collapsed stacks" (``frame;frame;frame count``, root
+first): the input format of flamegraph.pl and speedscope.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+# Leaf frames of threads that are waiting rather than working
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+}
+
+
+def frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Counts the call stacks of all threads, sampled every ``interval`` seconds"""
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: Optional[float] = None, duration: Optional[float] = None) -> bool:
+        """
+        Start sampling, discarding the previous profile
+
+        Args:
+            interval: Seconds between samples (default: the constructor's)
+            duration: Stop automatically after this many seconds
+
+        Returns:
+            bool: False if the profiler was already running
+        """
+        with self._lock:
+            if self.running:
+                return False
+            if interval:
+                self.interval = interval
+            self.stacks = Counter()
+            self.samples = 0
+            self.started_at, self.stopped_at = time.time(), None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sample, args=(duration,), name="profiler", daemon=True)
+            self._thread.start()
+        print(f"[PROFILER] Sampling every {self.interval * 1000:g} ms")
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _sample(self, duration: Optional[float]) -> None:
+        own = threading.get_ident()
+        deadline = time.monotonic() + duration if duration else None
+        while not self._stop.wait(self.interval):
+            if deadline and time.monotonic() >= deadline:
+                break
+            sampled = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                sampled.append(tuple(stack))
+            with self._lock:
+                self.stacks.update(sampled)
+                self.samples += 1
+        self.stopped_at = time.time()
+        print(f"[PROFILER] Stopped after {self.samples} samples")
+
+    def collapsed(self, limit: Optional[int] = None) -> str:
+        """The profile as collapsed stacks, most frequent first"""
+        with self._lock:
+            top = self.stacks.most_common(limit)
+        return "".join(f"{';'.join(map(frame_label, reversed(stack)))} {count}\n" for stack, count in top)
+
+    def status(self, top: int = 10) -> dict:
+        with self._lock:
+            leaves = Counter()
+            for stack, count in self.stacks.items():
+                leaves[frame_label(stack[0])] += count
+            return {
+                "running": self.running,
+                "interval_ms": self.interval * 1000,
+                "samples": self.samples,
+                "started_at": self.started_at,
+                "stopped_at": self.stopped_at,
+                "top_frames": [{"frame": frame, "count": count} for frame, count in leaves.most_common(top)],
+            }
@@ -0,0 +1,165 @@
+"""
+Versioned model registry with hot reload.
+
+Every set of models the API serves is an immutable ``ModelBundle`` (forest,
+scalers, logistic weights and the engines built from them) identified by a
+content-derived version. The registry holds the active bundle and the one it
+replaced:
+
+* Requests read ``registry.active`` once and use that bundle to the end, so a
+  swap never mixes models within a request and in-flight requests finish on
+  the version they started with.
+* ``reload`` builds a new bundle on a background thread while the old one
+  keeps serving, then swaps it in with a single reference assignment.
+* ``rollback`` swaps the previous bundle back in instantly; it is still in
+  memory, so nothing is downloaded or deserialized.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, List, Optional
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """One consistent, immutable set of models"""
+
+    version: str
+    rf_model: Any  # sklearn forest; None when served from the memory-mapped store
+    rf_engine: Any
+    scaler_num: Any
+    scaler_int: Any
+    lr_weights: Any
+    lr_bias: Any
+    lr_engine: Any
+    model_dir: str = ""
+    store_dir: str = ""  # memory-mapped store of these models, if one was written
+    store_version: str = ""  # content version recorded in that store's meta.json
+    source: str = ""
+    stats: dict = field(default_factory=dict)
+    loaded_at: float = field(default_factory=time.time)
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "source": self.source,
+            "model_dir": self.model_dir,
+            "loaded_at": datetime.fromtimestamp(self.loaded_at, timezone.utc).isoformat(timespec="seconds"),
+        }
+
+
+class ModelRegistry:
+    """Active/previous model bundles with atomic swap, background reload and rollback"""
+
+    def __init__(self, on_swap: Optional[Callable[[ModelBundle], None]] = None):
+        # Called with the new active bundle after every swap, e.g. to drop cached predictions
+        self.on_swap = on_swap
+        self._active: Optional[ModelBundle] = None
+        self._previous: Optional[ModelBundle] = None
+        self._lock = threading.Lock()
+        self._loader: Optional[threading.Thread] = None
+        self.state = "idle"
+        self.error: Optional[str] = None
+        self.swaps = 0
+        self.history: List[dict] = []
+
+    @property
+    def active(self) -> Optional[ModelBundle]:
+        """The bundle new requests should use (a plain attribute read, no locking)"""
+        return self._active
+
+    @property
+    def previous(self) -> Optional[ModelBundle]:
+        return self._previous
+
+    def bundles(self) -> List[ModelBundle]:
+        return [b for b in (self._active, self._previous) if b is not None]
+
+    def activate(self, bundle: ModelBundle, reason: str = "load") -> None:
+        """Make ``bundle`` the active one; the replaced bundle becomes the rollback target"""
+        with self._lock:
+            self._swap(bundle, self._active, reason)
+
+    def rollback(self) -> ModelBundle:
+        """
+        Swap the previous bundle back in
+
+        Raises:
+            LookupError: There is no previous bundle to roll back to
+        """
+        with self._lock:
+            if self._previous is None:
+                raise LookupError("No previous model version to roll back to")
+            self._swap(self._previous, self._active, "rollback")
+            return self._active
+
+    def _swap(self, new: ModelBundle, old: Optional[ModelBundle], reason: str) -> None:
+        # Readers see either the old or the new bundle, never a mix
+        self._active = new
+        self._previous = old
+        self.swaps += 1
+        self.history.append({
+            "version": new.version,
+            "replaced": old.version if old else None,
+            "reason": reason,
+            "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        })
+        del self.history[:-20]
+        if self.on_swap is not None:
+            self.on_swap(new)
+        print(f"[REGISTRY] Serving model version {new.version} ({reason}, replaced {old.version if old else 'nothing'})")
+
+    @property
+    def loading(self) -> bool:
+        return self._loader is not None and self._loader.is_alive()
+
+    def reload(self, loader: Callable[[], ModelBundle]) -> bool:
+        """
+        Build a new bundle with ``loader`` on a background thread and swap it in
+
+        The active bundle keeps serving while the loader runs; if it fails the
+        active bundle stays in place and the error is reported by ``status``.
+
+        Returns:
+            bool: False if a reload is already running
+        """
+        with self._lock:
+            if self.loading:
+                return False
+            self.state = "loading"
+            self.error = None
+            self._loader = threading.Thread(target=self._load, args=(loader,), name="model-reload", daemon=True)
+            self._loader.start()
+            return True
+
+    def _load(self, loader: Callable[[], ModelBundle]) -> None:
+        try:
+            bundle = loader()
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            print(f"[REGISTRY] Reload failed, still serving {self._active.version if self._active else 'nothing'}: {e}")
+            return
+        if self._active is not None and bundle.version == self._active.version:
+            print(f"[REGISTRY] Reloaded models are unchanged, still serving {bundle.version}")
+        else:
+            self.activate(bundle, reason="reload")
+        self.state = "idle"
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until a running reload finishes; True if none is running anymore"""
+        loader = self._loader
+        if loader is not None:
+            loader.join(timeout)
+        return not self.loading
+
+    def status(self) -> dict:
+        return {
+            "active": self._active.info() if self._active else None,
+            "previous": self._previous.info() if self._previous else None,
+            "reload": {"state": self.state, "error": self.error},
+            "swaps": self.swaps,
+            "history": list(self.history),
+        }
@@ -0,0 +1,238 @@
+"""
+Precompiled PDF report template.
+
+Building a report used to start from scratch every time: the sample
+stylesheet, the custom ParagraphStyles, every TableStyle and all static
+paragraphs (title, headings, recommendations, disclaimer, footer) were
+recreated and their markup parsed again. ``ReportTemplate`` builds them
+once; ``render`` only fills the three tables that hold per-patient values
+and lays out the document.
+
+Styles, table styles and the parsed static paragraphs are shared by every
+thread. A build stores layout state on its flowables (line breaks from
+``wrap()``, page-break postponement), so each render lays out shallow
+copies: they share the parsed text fragments but not that state. Static
+paragraphs always wrap at the same frame width, so their line breaking is
+also computed once and reused by every copy.
+"""
+
+from copy import copy
+from datetime import datetime
+from io import BytesIO
+from typing import Optional
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+LEVELS = ["Normal", "Above Normal", "Well Above Normal"]
+
+HIGH_RISK_RECOMMENDATIONS = [
+    "• Consult a cardiologist for comprehensive evaluation",
+    "• Monitor blood pressure and cholesterol regularly",
+    "• Adopt a heart-healthy diet low in sodium and saturated fats",
+    "• Engage in regular physical activity (150 minutes/week)",
+    "• Consider stress management techniques",
+    "• Follow prescribed medication regimen if applicable",
+]
+
+LOW_RISK_RECOMMENDATIONS = [
+    "• Maintain current healthy lifestyle habits",
+    "• Schedule regular annual cardiovascular check-ups",
+    "• Continue balanced diet and physical activity",
+    "• Monitor blood pressure periodically",
+    "• Stay informed about cardiovascular health",
+]
+
+DISCLAIMER = (
+    "<b>Medical Disclaimer:</b> This report is generated by an AI-based educational tool and should NOT "
+    "be used for medical diagnosis. Always consult qualified healthcare professionals for medical advice, "
+    "diagnosis, or treatment."
+)
+
+
+class StaticParagraph(Paragraph):
+    """Paragraph that breaks its lines once per available width; copies share the result"""
+
+    def __init__(self, text, style):
+        super().__init__(text, style)
+        self._layouts = {}
+
+    def wrap(self, availWidth, availHeight):
+        # wrap() only depends on the width; it sets width, _wrapWidths, blPara and height
+        layout = self._layouts.get(availWidth)
+        if layout is None:
+            size = super().wrap(availWidth, availHeight)
+            layout = self._layouts[availWidth] = (size, self.width, self._wrapWidths, self.blPara, self.height)
+        size, self.width, self._wrapWidths, self.blPara, self.height = layout
+        return size
+
+
+class ReportTemplate:
+    """CardioSense PDF report with styles and static content built once"""
+
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        self.normal_style = styles['Normal']
+
+        self.title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#4A148C'),
+            spaceAfter=30,
+            alignment=TA_CENTER
+        )
+        self.heading_style = ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=14,
+            textColor=colors.HexColor('#6A1B9A'),
+            spaceAfter=12,
+            spaceBefore=12
+        )
+        self.disclaimer_style = ParagraphStyle(
+            'Disclaimer',
+            parent=styles['Normal'],
+            fontSize=9,
+            textColor=colors.HexColor('#D32F2F'),
+            leftIndent=20,
+            rightIndent=20,
+            spaceAfter=10,
+        )
+        self.footer_style = ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=8,
+            textColor=colors.grey,
+            alignment=TA_CENTER,
+        )
+
+        self.meta_table_style = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ])
+        self.patient_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6A1B9A')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F3E5F5')]),
+        ])
+        # Results header is red for high risk, green otherwise
+        self.results_table_styles = {
+            high_risk: TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), header_color),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, -1), 10),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+                ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+            ])
+            for high_risk, header_color in ((True, colors.HexColor('#D32F2F')), (False, colors.HexColor('#388E3C')))
+        }
+
+        self.static = self._build_static_flowables()
+
+    def _build_static_flowables(self) -> dict:
+        def recommendations(lines):
+            block = [StaticParagraph("Medical Recommendations", self.heading_style)]
+            for rec in lines:
+                block.append(StaticParagraph(rec, self.normal_style))
+                block.append(Spacer(1, 0.1*inch))
+            block.append(Spacer(1, 0.2*inch))
+            return block
+
+        return {
+            "title": [StaticParagraph("CardioSense Health Report", self.title_style), Spacer(1, 0.2*inch)],
+            "section_gap": Spacer(1, 0.3*inch),
+            "metrics_heading": StaticParagraph("Patient Health Metrics", self.heading_style),
+            "results_heading": StaticParagraph("Prediction Results", self.heading_style),
+            "recommendations": {
+                True: recommendations(HIGH_RISK_RECOMMENDATIONS),
+                False: recommendations(LOW_RISK_RECOMMENDATIONS),
+            },
+            "closing": [
+                StaticParagraph(DISCLAIMER, self.disclaimer_style),
+                Spacer(1, 0.2*inch),
+                StaticParagraph("Generated by CardioSense | Machine Learning Prediction System", self.footer_style),
+            ],
+        }
+
+    def render(self, patient_name: str, patient_data, model_type: str, prediction_result,
+               timestamp: Optional[datetime] = None) -> BytesIO:
+        """
+        Render one report
+
+        Args:
+            patient_name: Patient's full name
+            patient_data: Patient health metrics (PatientData)
+            model_type: Type of model used (randomforest, logistic, compare)
+            prediction_result: Risk level and probability (PredictionResult)
+            timestamp: Report date (default: now)
+
+        Returns:
+            BytesIO: PDF file in memory
+        """
+        static = self.static
+        model_label = model_type.replace("_", " ").title()
+        is_high_risk = "High" in prediction_result.risk_level
+
+        meta_table = Table([
+            ["Report Date:", (timestamp or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")],
+            ["Patient Name:", patient_name],
+            ["Model Type:", model_label],
+        ], colWidths=[2*inch, 4*inch])
+        meta_table.setStyle(self.meta_table_style)
+
+        bmi = patient_data.weight / ((patient_data.height / 100) ** 2)
+        patient_table = Table([
+            ["Metric", "Value"],
+            ["Age", f"{patient_data.age} years"],
+            ["Gender", "Male" if patient_data.gender == 2 else "Female"],
+            ["Height", f"{patient_data.height} cm"],
+            ["Weight", f"{patient_data.weight} kg"],
+            ["BMI", f"{bmi:.2f}"],
+            ["Systolic BP", f"{patient_data.ap_hi} mmHg"],
+            ["Diastolic BP", f"{patient_data.ap_lo} mmHg"],
+            ["Cholesterol", LEVELS[patient_data.cholesterol-1]],
+            ["Glucose", LEVELS[patient_data.gluc-1]],
+            ["Smoking", "Yes" if patient_data.smoke else "No"],
+            ["Alcohol", "Yes" if patient_data.alco else "No"],
+            ["Physical Activity", "Yes" if patient_data.active else "No"],
+        ], colWidths=[2.5*inch, 3.5*inch])
+        patient_table.setStyle(self.patient_table_style)
+
+        results_table = Table([
+            ["Metric", "Value"],
+            ["Model", model_label],
+            ["Risk Level", prediction_result.risk_level],
+            ["Probability", f"{prediction_result.probability * 100:.2f}%"],
+        ], colWidths=[2.5*inch, 3.5*inch])
+        results_table.setStyle(self.results_table_styles[is_high_risk])
+
+        elements = [
+            *map(copy, static["title"]),
+            meta_table, copy(static["section_gap"]),
+            copy(static["metrics_heading"]), patient_table, copy(static["section_gap"]),
+            copy(static["results_heading"]), results_table, copy(static["section_gap"]),
+            *map(copy, static["recommendations"][is_high_risk]),
+            *map(copy, static["closing"]),
+        ]
+
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=letter,
+                                rightMargin=72, leftMargin=72,
+                                topMargin=72, bottomMargin=18)
+        doc.build(elements)
+        buffer.seek(0)
+        return buffer
@@ -0,0 +1,253 @@
+"""
+Background report pipeline.
+
+Rendering a PDF and handing it to the email provider can take seconds, so
+/send-report no longer does it inside the request handler. Jobs go on a
+bounded queue served by a small pool of worker threads, sized separately
+from the request threadpool, and the handler returns a job id right away;
+clients poll the job's status. A full queue is refused instead of letting
+report bursts pile up behind the prediction endpoints.
+
+Failed attempts are retried with exponential backoff and jitter, except for
+``PermanentError`` (bad credentials, rejected addresses) which fails the job
+at once. ``StubEmailClient`` stands in for ``resend.Emails`` offline.
+"""
+
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+
+class QueueFullError(RuntimeError):
+    """The report queue is at capacity; the client should retry later"""
+
+
+class PermanentError(RuntimeError):
+    """A report failure that retrying cannot fix"""
+
+
+@dataclass
+class ReportJob:
+    id: str
+    payload: Any
+    status: str = "queued"  # queued, running, retrying, sent, failed
+    attempts: int = 0
+    error: Optional[str] = None
+    result: Any = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    def info(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+            "result": self.result,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ReportPipeline:
+    """Bounded job queue with a dedicated worker pool and retry/backoff"""
+
+    def __init__(self, handler: Callable[[Any], Any], workers: int = 2, max_queue: int = 100,
+                 max_attempts: int = 4, backoff_seconds: float = 2.0, max_backoff_seconds: float = 60.0,
+                 keep_finished: int = 10_000):
+        """
+        Args:
+            handler: Called with a job's payload on a worker thread; its return value is the job result
+            workers: Worker threads processing jobs
+            max_queue: Jobs waiting to start before submit() refuses new ones
+            max_attempts: Attempts per job, including the first
+            backoff_seconds: Delay before the first retry, doubled for each further one
+            max_backoff_seconds: Upper bound on the retry delay
+            keep_finished: Finished jobs kept for status lookups
+        """
+        self.handler = handler
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.keep_finished = keep_finished
+
+        self._queue: "queue.Queue[Optional[ReportJob]]" = queue.Queue(maxsize=max_queue)
+        self._jobs: "OrderedDict[str, ReportJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._threads = []
+        self._pending = 0
+        self._closed = False
+        self.submitted = 0
+        self.rejected = 0
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+
+    def _start(self) -> None:
+        # Workers start with the first job, so importing the app spawns no threads
+        if not self._threads:
+            self._threads = [
+                threading.Thread(target=self._work, name=f"report-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def submit(self, payload: Any) -> ReportJob:
+        """
+        Queue a job and return it immediately
+
+        Raises:
+            QueueFullError: The queue is full or the pipeline is shut down
+        """
+        job = ReportJob(id=uuid.uuid4().hex, payload=payload)
+        with self._lock:
+            if self._closed:
+                raise QueueFullError("Report pipeline is shutting down")
+            self._start()
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self.rejected += 1
+                raise QueueFullError(f"Report queue is full ({self.max_queue} jobs waiting)")
+            self._jobs[job.id] = job
+            self._pending += 1
+            self.submitted += 1
+            self._forget_finished()
+        return job
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _forget_finished(self) -> None:
+        # Oldest jobs first; only finished ones are dropped
+        excess = len(self._jobs) - self.keep_finished
+        for job_id in list(self._jobs)[:max(excess, 0)]:
+            if self._jobs[job_id].finished_at is not None:
+                del self._jobs[job_id]
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            self._run(job)
+
+    def _run(self, job: ReportJob) -> None:
+        job.status = "running"
+        job.attempts += 1
+        try:
+            result = self.handler(job.payload)
+        except Exception as e:
+            job.error = str(e)
+            if isinstance(e, PermanentError) or job.attempts >= self.max_attempts:
+                self._finish(job, "failed")
+                print(f"[REPORT] Job {job.id} failed after {job.attempts} attempt(s): {e}")
+            else:
+                self._retry_later(job)
+            return
+        job.result = result
+        job.error = None
+        self._finish(job, "sent")
+
+    def _retry_later(self, job: ReportJob) -> None:
+        # Exponential backoff with jitter, so a provider outage is not hammered in lockstep
+        delay = min(self.backoff_seconds * 2 ** (job.attempts - 1), self.max_backoff_seconds)
+        delay *= random.uniform(0.5, 1.0)
+        job.status = "retrying"
+        with self._lock:
+            self.retries += 1
+        print(f"[REPORT] Job {job.id} attempt {job.attempts} failed ({job.error}), retrying in {delay:.1f}s")
+
+        timer = threading.Timer(delay, self._requeue, args=(job,))
+        timer.daemon = True
+        timer.start()
+
+    def _requeue(self, job: ReportJob) -> None:
+        # Runs on the retry timer; never blocks it, and never queues behind shutdown()'s stop sentinels
+        with self._lock:
+            if self._closed:
+                reason = "report pipeline shut down"
+            else:
+                try:
+                    self._queue.put_nowait(job)
+                    return
+                except queue.Full:
+                    reason = f"report queue full ({self.max_queue} jobs waiting)"
+        job.error = f"{job.error}; not retried: {reason}"
+        self._finish(job, "failed")
+        print(f"[REPORT] Job {job.id} failed after {job.attempts} attempt(s): {job.error}")
+
+    def _finish(self, job: ReportJob, status: str) -> None:
+        with self._lock:
+            job.status = status
+            job.finished_at = time.time()
+            job.payload = None  # release the request and rendered PDF
+            if status == "sent":
+                self.sent += 1
+            else:
+                self.failed += 1
+            self._pending -= 1
+            self._idle.notify_all()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every submitted job is sent or failed; False on timeout"""
+        with self._lock:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        """Stop accepting jobs, let queued ones finish (up to ``timeout``) and stop the workers"""
+        with self._lock:
+            self._closed = True
+        drained = self.join(timeout)
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        return drained
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queued": self._queue.qsize(),
+                "pending": self._pending,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "sent": self.sent,
+                "failed": self.failed,
+                "retries": self.retries,
+            }
+
+
+class StubEmailClient:
+    """Offline stand-in for ``resend.Emails``: records messages instead of sending them"""
+
+    def __init__(self, latency_seconds: float = 0.0, failure_rate: float = 0.0, keep: int = 1000):
+        self.latency_seconds = latency_seconds
+        self.failure_rate = failure_rate
+        self.outbox = deque(maxlen=keep)
+        self.sent = 0
+        self._lock = threading.Lock()
+
+    def send(self, params: dict) -> dict:
+        # Simulated provider round trip; a failure here is retryable like a network error
+        time.sleep(self.latency_seconds)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ConnectionError("Email stub: simulated provider failure")
+
+        message_id = uuid.uuid4().hex
+        with self._lock:
+            self.outbox.append({"id": message_id, **params})
+            self.sent += 1
+        return {"id": message_id}
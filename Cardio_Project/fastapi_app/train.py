@@ -0,0 +1,420 @@
+"""
+Offline training pipeline for the serving artifacts.
+
+Rebuilds the five files the API loads (``MODEL_FILE_NAMES``) from the raw
+Kaggle extract, reproducibly (fixed seeds, stratified split) and without
+the notebooks:
+
+  load      the CSV is parsed and cleaned like Week2 (blood pressure, height
+            and weight ranges, duplicates) in chunks of ``--chunk-rows``
+            lines; only the cleaned rows are kept, as one float matrix
+            (about 100 bytes per patient), never as a DataFrame. This is
+            not out-of-core: the stratified split, the scalers, the grid
+            search folds and the forest (no ``partial_fit``) all need the
+            whole training split in memory
+  features  ``preprocess_batch`` itself, with scalers fit on the training split
+  search    cross-validated grid search for the Random Forest and for the
+            logistic model, folds and candidates spread over ``--jobs`` cores
+  logistic  ``MiniBatchLogistic``: the Week3 scratch model (class-weighted
+            log loss) trained with vectorized mini-batch gradient descent
+  write     the artifacts plus ``models_manifest.json`` with their SHA-256
+            and size, the test metrics, the chosen parameters and timings;
+            then loaded back through ``load_bundle`` and checked against
+            the in-memory models
+
+    python train.py ../Data/raw/cardio_train.csv -o trained/ [--jobs -1] [--quick]
+
+Serve the result with ``MODEL_BASE_URL=trained MODEL_MANIFEST=trained/models_manifest.json``
+or load it into a running server through ``POST /admin/models/reload``.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, train_test_split
+from sklearn.preprocessing import StandardScaler
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Data", "raw", "cardio_train.csv")
+MANIFEST_FILE = "models_manifest.json"
+# What the API loads with the default FOREST_ARTIFACT=pickle
+ARTIFACT_FILES = ("random_forest_model.pkl", "scaler_int.pkl", "scaler_num.pkl", "logistic_weights.npy",
+                  "logistic_bias.npy")
+LABEL = "cardio"
+SEED = 42
+TEST_SIZE = 0.2
+CHUNK_ROWS = 10_000
+
+# Week2 cleaning, applied chunk by chunk: name -> rows to drop, from {column: values}
+CLEANING_RULES = (
+    ("ap_hi < ap_lo", lambda c: c["ap_hi"] < c["ap_lo"]),
+    ("ap_hi outside 60-240", lambda c: (c["ap_hi"] < 60) | (c["ap_hi"] > 240)),
+    ("ap_lo outside 40-180", lambda c: (c["ap_lo"] < 40) | (c["ap_lo"] > 180)),
+    ("height outside 120-220", lambda c: (c["height"] <= 120) | (c["height"] >= 220)),
+    ("weight outside 30-200", lambda c: (c["weight"] <= 30) | (c["weight"] >= 200)),
+)
+
+# Week3 grids; the quick ones are for smoke tests
+RF_GRID = {
+    "n_estimators": [100, 200],
+    "max_depth": [None, 10, 20],
+    "min_samples_split": [2, 5],
+    "min_samples_leaf": [1, 2],
+}
+LR_GRID = {
+    "learning_rate": [0.01, 0.1, 0.5],
+    "batch_size": [256, 2048],
+    "l2": [0.0, 1e-3],
+}
+QUICK_RF_GRID = {"n_estimators": [50], "max_depth": [None, 10]}
+QUICK_LR_GRID = {"learning_rate": [0.1, 0.5], "batch_size": [512]}
+
+
+# --------------------------------------------------
+# DATA
+# --------------------------------------------------
+
+def read_chunks(path: str, columns: Sequence[str], chunk_rows: int = CHUNK_ROWS) -> Iterator[np.ndarray]:
+    """Yield ``columns`` of a ``;`` or ``,`` delimited CSV as float matrices of at most ``chunk_rows`` rows"""
+    with open(path) as f:
+        header = f.readline()
+        delimiter = ";" if header.count(";") > header.count(",") else ","
+        names = [name.strip() for name in header.split(delimiter)]
+        missing = [c for c in columns if c not in names]
+        if missing:
+            raise ValueError(f"{path} has no column(s) {', '.join(missing)}")
+        usecols = [names.index(c) for c in columns]
+        while True:
+            lines = list(islice(f, chunk_rows))
+            if not lines:
+                return
+            yield np.loadtxt(lines, delimiter=delimiter, usecols=usecols, ndmin=2)
+
+
+def load_dataset(path: str, fields: Sequence[str], chunk_rows: int = CHUNK_ROWS,
+                 age_unit: str = "days") -> Tuple[np.ndarray, np.ndarray, dict]:
+    """
+    Cleaned, de-duplicated patients from the raw extract
+
+    Only parsing is chunked: the kept rows and the duplicate check's key
+    for each of them stay in memory until the whole file is read.
+
+    Args:
+        path: CSV with the ``fields`` columns and ``cardio``
+        fields: Patient columns, in the order of the returned matrix
+        chunk_rows: Lines parsed at a time
+        age_unit: Unit of the age column; cardio_train.csv uses days
+
+    Returns:
+        tuple: (raw (N, len(fields)) matrix with age in years, labels, load stats)
+    """
+    columns = list(fields) + [LABEL]
+    dropped = dict.fromkeys([name for name, _ in CLEANING_RULES] + ["duplicate"], 0)
+    seen = set()
+    kept, rows = [], 0
+
+    for block in read_chunks(path, columns, chunk_rows):
+        rows += len(block)
+        values = {name: block[:, j] for j, name in enumerate(columns)}
+        keep = np.ones(len(block), dtype=bool)
+        for name, rule in CLEANING_RULES:
+            bad = rule(values) & keep
+            dropped[name] += int(bad.sum())
+            keep &= ~bad
+        block = block[keep]
+
+        # Exact duplicates (id aside) across the whole file, first one kept
+        unique = np.ones(len(block), dtype=bool)
+        for i, key in enumerate(map(bytes, block)):
+            if key in seen:
+                unique[i] = False
+            else:
+                seen.add(key)
+        dropped["duplicate"] += int((~unique).sum())
+        kept.append(block[unique])
+
+    data = np.concatenate(kept) if kept else np.empty((0, len(columns)))
+    raw, y = data[:, :-1], data[:, -1].astype(np.int64)
+    if age_unit == "days":
+        raw[:, 0] /= 365.25
+    return raw, y, {"rows_read": rows, "rows_kept": len(raw), "dropped": dropped}
+
+
+# --------------------------------------------------
+# LOGISTIC MODEL
+# --------------------------------------------------
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    # Same clipping as the API's sigmoid
+    return 1 / (1 + np.exp(-np.clip(z, -500, 500)))
+
+
+class MiniBatchLogistic(ClassifierMixin, BaseEstimator):
+    """
+    Week3's LogisticRegressionScratch with mini-batch updates
+
+    Positive rows weigh ``n_negative / n_positive`` in the gradient, as in the
+    notebook; each epoch visits the rows in a fresh random order, one
+    vectorized ``batch_size`` block per update.
+    """
+
+    def __init__(self, learning_rate: float = 0.1, batch_size: int = 512, epochs: int = 30,
+                 l2: float = 0.0, random_state: Optional[int] = SEED):
+        self.learning_rate = learning_rate
+        self.batch_size = batch_size
+        self.epochs = epochs
+        self.l2 = l2
+        self.random_state = random_state
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> "MiniBatchLogistic":
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        n, d = X.shape
+        rng = np.random.default_rng(self.random_state)
+        pos_weight = (y == 0).sum() / max((y == 1).sum(), 1)
+        sample_weight = np.where(y == 1, pos_weight, 1.0)
+
+        w = np.zeros(d)
+        b = 0.0
+        self.loss_history_ = []
+        for _ in range(self.epochs):
+            order = rng.permutation(n)
+            for start in range(0, n, self.batch_size):
+                idx = order[start:start + self.batch_size]
+                Xb = X[idx]
+                error = (_sigmoid(Xb @ w + b) - y[idx]) * sample_weight[idx]
+                w -= self.learning_rate * (Xb.T @ error / len(idx) + self.l2 * w)
+                b -= self.learning_rate * error.mean()
+            p = _sigmoid(X @ w + b)
+            self.loss_history_.append(float(-np.mean(y * np.log(p + 1e-8) + (1 - y) * np.log(1 - p + 1e-8))))
+
+        self.coef_ = w
+        self.intercept_ = np.array([b])
+        self.classes_ = np.array([0, 1])
+        return self
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        p = _sigmoid(np.asarray(X, dtype=np.float64) @ self.coef_ + self.intercept_[0])
+        return np.column_stack([1 - p, p])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return (self.predict_proba(X)[:, 1] >= 0.5).astype(int)
+
+
+# --------------------------------------------------
+# SEARCH
+# --------------------------------------------------
+
+def grid_search(estimator, grid: dict, X: np.ndarray, y: np.ndarray, folds: int, jobs: int,
+                search_rows: Optional[int] = None) -> GridSearchCV:
+    """
+    Stratified k-fold grid search, every (candidate, fold) fit a separate job
+
+    The search can run on a stratified sample of ``search_rows`` rows; the best
+    parameters are refit on all of ``X`` either way.
+    """
+    Xs, ys = X, y
+    if search_rows and search_rows < len(X):
+        Xs, _, ys, _ = train_test_split(X, y, train_size=search_rows, random_state=SEED, stratify=y)
+    search = GridSearchCV(
+        estimator, grid, cv=StratifiedKFold(n_splits=folds, shuffle=True, random_state=SEED),
+        scoring="accuracy", n_jobs=jobs, refit=False,
+    )
+    search.fit(Xs, ys)
+    return search
+
+
+def test_metrics(y: np.ndarray, proba: np.ndarray) -> dict:
+    pred = (proba >= 0.5).astype(int)
+    return {
+        "accuracy": round(accuracy_score(y, pred), 4),
+        "precision": round(precision_score(y, pred), 4),
+        "recall": round(recall_score(y, pred), 4),
+        "f1": round(f1_score(y, pred), 4),
+        "roc_auc": round(roc_auc_score(y, proba), 4),
+    }
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+# --------------------------------------------------
+# PIPELINE
+# --------------------------------------------------
+
+def train(data_path: str, output: str, jobs: int = -1, quick: bool = False, folds: int = 5,
+          search_rows: Optional[int] = 20_000, chunk_rows: int = CHUNK_ROWS, age_unit: str = "days") -> dict:
+    """
+    Train both models, write the serving artifacts to ``output`` and return the manifest
+
+    Args:
+        data_path: Raw patient CSV with the ``cardio`` label
+        output: Directory for the artifacts and models_manifest.json
+        jobs: Parallel search/fit jobs; -1 uses every core
+        quick: Small grids and 3 folds, for smoke tests
+        folds: Cross-validation folds
+        search_rows: Rows the search runs on (stratified sample); None for all
+        chunk_rows: CSV lines parsed at a time
+        age_unit: Unit of the age column
+    """
+    import joblib
+
+    # Imported here so search workers unpickling MiniBatchLogistic do not load the API
+    import main as app
+    from artifacts import sha256_file
+
+    timings = {}
+    start = time.perf_counter()
+    (raw, y, data_stats), timings["load"] = _timed(
+        lambda: load_dataset(data_path, app.PATIENT_FIELDS, chunk_rows, age_unit)
+    )
+    print(f"[DATA] {data_stats['rows_kept']:,} of {data_stats['rows_read']:,} rows kept "
+          f"({', '.join(f'{k} {v}' for k, v in data_stats['dropped'].items() if v)}) in {timings['load']:.2f}s")
+
+    raw_train, raw_test, y_train, y_test = train_test_split(
+        raw, y, test_size=TEST_SIZE, random_state=SEED, stratify=y
+    )
+    num_features, int_features = app.unscaled_features(raw_train)
+    scalers = app.ModelBundle(
+        version="training", rf_model=None, rf_engine=None,
+        scaler_num=StandardScaler().fit(num_features),
+        scaler_int=StandardScaler().fit(int_features),
+        lr_weights=None, lr_bias=None, lr_engine=None,
+    )
+    X_train = app.preprocess_batch(raw_train, scalers)
+    X_test = app.preprocess_batch(raw_test, scalers)
+
+    if quick:
+        folds = min(folds, 3)
+        search_rows = min(search_rows or len(X_train), 5000)
+    rf_grid, lr_grid = (QUICK_RF_GRID, QUICK_LR_GRID) if quick else (RF_GRID, LR_GRID)
+
+    searches = {}
+    for name, estimator, grid in (
+        ("random_forest", RandomForestClassifier(random_state=SEED), rf_grid),
+        ("logistic", MiniBatchLogistic(), lr_grid),
+    ):
+        searches[name], timings[f"search_{name}"] = _timed(
+            lambda: grid_search(estimator, grid, X_train, y_train, folds, jobs, search_rows)
+        )
+        s = searches[name]
+        print(f"[SEARCH] {name}: {len(s.cv_results_['params'])} candidates x {folds} folds in "
+              f"{timings[f'search_{name}']:.1f}s, best CV accuracy {s.best_score_:.4f} with {s.best_params_}")
+
+    # Final models on the whole training split; the forest's trees are built in parallel
+    rf_model, timings["fit_random_forest"] = _timed(lambda: RandomForestClassifier(
+        random_state=SEED, n_jobs=jobs, **searches["random_forest"].best_params_
+    ).fit(X_train, y_train))
+    # Served single-threaded, like the notebook model: per-request joblib dispatch costs more than it saves
+    rf_model.n_jobs = None
+    lr_model, timings["fit_logistic"] = _timed(
+        lambda: MiniBatchLogistic(**searches["logistic"].best_params_).fit(X_train, y_train)
+    )
+
+    metrics = {}
+    for name, model in (("random_forest", rf_model), ("logistic", lr_model)):
+        metrics[name] = {
+            "cv_accuracy": round(float(searches[name].best_score_), 4),
+            "params": searches[name].best_params_,
+            "test": test_metrics(y_test, model.predict_proba(X_test)[:, 1]),
+        }
+        print(f"[TEST] {name}: " + ", ".join(f"{k} {v:.4f}" for k, v in metrics[name]["test"].items()))
+
+    os.makedirs(output, exist_ok=True)
+    paths = {name: os.path.join(output, name) for name in ARTIFACT_FILES}
+    write_start = time.perf_counter()
+    joblib.dump(rf_model, paths["random_forest_model.pkl"])
+    joblib.dump(scalers.scaler_int, paths["scaler_int.pkl"])
+    joblib.dump(scalers.scaler_num, paths["scaler_num.pkl"])
+    np.save(paths["logistic_weights.npy"], lr_model.coef_)
+    np.save(paths["logistic_bias.npy"], lr_model.intercept_)
+    timings["write"] = time.perf_counter() - write_start
+    timings["total"] = time.perf_counter() - start
+
+    manifest = {
+        "files": {name: {"sha256": sha256_file(path), "size": os.path.getsize(path)} for name, path in paths.items()},
+        "metrics": metrics,
+        "training": {
+            "data": {"file": os.path.basename(data_path), "sha256": sha256_file(data_path), **data_stats},
+            "split": {"train": len(y_train), "test": len(y_test), "test_size": TEST_SIZE, "seed": SEED},
+            "search": {"folds": folds, "rows": min(search_rows or len(y_train), len(y_train)), "quick": quick},
+            "jobs": jobs,
+            "cpus": os.cpu_count(),
+            "seconds": {k: round(v, 3) for k, v in timings.items()},
+            "versions": {"python": platform.python_version(), "numpy": np.__version__,
+                         "sklearn": sys.modules["sklearn"].__version__},
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+    }
+    manifest_path = os.path.join(output, MANIFEST_FILE)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    verify_artifacts(app, output, manifest_path, raw_test, rf_model.predict_proba(X_test)[:, 1],
+                     lr_model.predict_proba(X_test)[:, 1])
+    return manifest
+
+
+def verify_artifacts(app, output: str, manifest_path: str, raw_test: np.ndarray,
+                     rf_expected: np.ndarray, lr_expected: np.ndarray) -> None:
+    """Load ``output`` the way the API does and check it scores the test split like the trained models"""
+    # The pickles as written, whatever MODEL_FORMAT, INFERENCE_BACKEND or FOREST_ARTIFACT say:
+    # no memory-mapped store in the output and no compact forest expected in it
+    pinned = {"MODEL_FORMAT": "pickle", "INFERENCE_BACKEND": "thread",
+              "FOREST_FILE": ARTIFACT_FILES[0], "MODEL_FILE_NAMES": ARTIFACT_FILES}
+    saved = {name: getattr(app, name) for name in pinned}
+    try:
+        for name, value in pinned.items():
+            setattr(app, name, value)
+        bundle = app.load_bundle(model_dir=output, base_url=output, manifest_path=manifest_path)
+    finally:
+        for name, value in saved.items():
+            setattr(app, name, value)
+    rf = app.score_random_forest(app.preprocess_batch(raw_test, bundle), bundle)
+    lr = app.score_logistic(raw_test, bundle)
+    rf_error = float(np.abs(rf - rf_expected).max())
+    lr_error = float(np.abs(lr - lr_expected).max())
+    if rf_error > 1e-6 or lr_error > 1e-6:
+        raise RuntimeError(f"Served artifacts disagree with the trained models (forest {rf_error:.2e}, "
+                           f"logistic {lr_error:.2e})")
+    print(f"[VERIFY] Loaded as version {bundle.version}; serves the {len(raw_test):,} test rows like the "
+          f"trained models (max |dp| forest {rf_error:.1e}, logistic {lr_error:.1e})")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Train the Random Forest and logistic serving artifacts")
+    parser.add_argument("data", nargs="?", default=DEFAULT_DATA, help="Raw patient CSV with the cardio label")
+    parser.add_argument("-o", "--output", required=True, help="Directory for the artifacts and manifest")
+    parser.add_argument("--jobs", type=int, default=-1, help="Parallel jobs (default -1: every core)")
+    parser.add_argument("--folds", type=int, default=5, help="Cross-validation folds")
+    parser.add_argument("--search-rows", type=int, default=20_000,
+                        help="Stratified sample the grid search runs on; 0 for the whole training split")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="CSV lines parsed at a time")
+    parser.add_argument("--age-unit", choices=("years", "days"), default="days",
+                        help="Unit of the age column; cardio_train.csv uses days")
+    parser.add_argument("--quick", action="store_true", help="Small grids and 3 folds (smoke test)")
+    args = parser.parse_args(argv)
+
+    manifest = train(args.data, args.output, args.jobs, args.quick, args.folds, args.search_rows or None,
+                     args.chunk_rows, args.age_unit)
+    seconds = manifest["training"]["seconds"]
+    print(f"\n[OK] Wrote {len(manifest['files'])} artifacts and {MANIFEST_FILE} to {args.output} in "
+          f"{seconds['total']:.1f}s (" + ", ".join(f"{k} {v:.1f}s" for k, v in seconds.items() if k != "total")
+          + f") with --jobs {args.jobs} on {os.cpu_count()} core(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -59,7 +59,7 @@ function ResultsCompare() {
       const patientData = location.state?.patientData || {};
       
       // Use Random Forest result as primary (typically more accurate)
-      await sendReportViaBackend(
+      const job = await sendReportViaBackend(
         personalDetails.email,
         personalDetails.name || 'Patient',
         'compare',
@@ -70,9 +70,12 @@ function ResultsCompare() {
         }
       );
 
-      setEmailStatus({
+      setEmailStatus(job.status === 'sent' ? {
         type: 'success',
         message: `Comparative report successfully sent to ${personalDetails.email} with PDF attachment!`
+      } : {
+        type: 'success',
+        message: `Comparative report is queued for ${personalDetails.email} and will arrive shortly.`
       });
       setShowEmailModal(true);
     } catch (error) {
@@ -168,7 +168,7 @@ function ResultsLogistic() {
       const patientData = location.state?.patientData || {};
       
       // Send email with PDF via backend
-      await sendReportViaBackend(
+      const job = await sendReportViaBackend(
         personalDetails.email,
         personalDetails.name || 'Patient',
         'logistic',
@@ -179,9 +179,12 @@ function ResultsLogistic() {
         }
       );
 
-      setEmailStatus({
+      setEmailStatus(job.status === 'sent' ? {
         type: 'success',
         message: `Report successfully sent to ${personalDetails.email} with PDF attachment!`
+      } : {
+        type: 'success',
+        message: `Report is queued for ${personalDetails.email} and will arrive shortly.`
       });
       setShowEmailModal(true);
     } catch (error) {
@@ -59,7 +59,7 @@ function ResultsRandomForest() {
     try {
       const patientData = location.state?.patientData || {};
       
-      await sendReportViaBackend(
+      const job = await sendReportViaBackend(
         personalDetails.email,
         personalDetails.name || 'Patient',
         'randomforest',
@@ -70,9 +70,12 @@ function ResultsRandomForest() {
         }
       );
 
-      setEmailStatus({
+      setEmailStatus(job.status === 'sent' ? {
         type: 'success',
         message: `Report successfully sent to ${personalDetails.email} with PDF attachment!`
+      } : {
+        type: 'success',
+        message: `Report is queued for ${personalDetails.email} and will arrive shortly.`
       });
       setShowEmailModal(true);
     } catch (error) {
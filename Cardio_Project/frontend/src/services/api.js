@@ -3,12 +3,16 @@ import axios from 'axios';
 const BASE_URL = import.meta.env.VITE_API_URL || 'https://cardio-fastapi-8ijy.onrender.com';
 
 // API instance with default config
+const TIMEOUT_MS = 120000; // 120 seconds (2 minutes) - Render free tier can take time to wake up
+
 const api = axios.create({
   baseURL: BASE_URL,
   headers: {
     'Content-Type': 'application/json',
+    // The server drops requests still queued when this budget runs out
+    'X-Request-Deadline-Ms': String(TIMEOUT_MS),
   },
-  timeout: 120000, // 120 seconds (2 minutes) - Render free tier can take time to wake up
+  timeout: TIMEOUT_MS,
 });
 
 // Health check endpoint
@@ -51,4 +55,15 @@ export const predictCompare = async (patientData) => {
   }
 };
 
+// What-if sweep: risk curve (one axis) or surface (two axes) around one patient
+// axes: [{ feature: 'ap_hi', start: 90, stop: 200, steps: 50 }, ...]
+export const predictSweep = async (patientData, axes, model = 'compare') => {
+  try {
+    const response = await api.post('/predict/sweep', { patient: patientData, axes, model });
+    return response.data;
+  } catch (error) {
+    throw error;
+  }
+};
+
 export default api;
@@ -9,6 +9,44 @@ const isDemoModeEmailError = (message = '') => {
   return normalized.includes('testing emails') || normalized.includes('demo mode');
 };
 
+// The backend queues reports and retries failed sends; poll the job until it is sent or failed
+const STATUS_POLL_MS = 2000;
+const STATUS_TIMEOUT_MS = 120000;
+
+const demoModeError = (detail) => {
+  const demoError = new Error('EMAIL_DEMO_MODE');
+  demoError.isDemoMode = true;
+  demoError.detail = detail;
+  return demoError;
+};
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+/**
+ * Wait for a queued report job to finish
+ * @param {string} statusUrl - Job status path returned by POST /send-report
+ * @returns {Promise<object>} Final job status ({ status: 'sent' }), or the last one seen if still pending
+ */
+const waitForReport = async (statusUrl) => {
+  const deadline = Date.now() + STATUS_TIMEOUT_MS;
+  let job = { status: 'queued' };
+
+  while (Date.now() < deadline) {
+    await sleep(STATUS_POLL_MS);
+    const response = await axios.get(`${BASE_URL}${statusUrl}`, { timeout: 30000 });
+    job = response.data;
+
+    if (job.status === 'sent') {
+      return job;
+    }
+    if (job.status === 'failed') {
+      const detail = job.error || 'Failed to send email via backend';
+      throw isDemoModeEmailError(detail) ? demoModeError(detail) : new Error(detail);
+    }
+  }
+  return job;
+};
+
 /**
  * Send PDF report via backend SMTP (with PDF attachment)
  * @param {string} toEmail - Recipient email address
@@ -16,13 +54,15 @@ const isDemoModeEmailError = (message = '') => {
  * @param {string} modelType - Type of model (randomforest, logistic, compare)
  * @param {object} patientData - Patient health data
  * @param {object} predictionResult - Prediction results from model
- * @returns {Promise} Backend response
+ * @returns {Promise<object>} Final job status: 'sent', or 'queued'/'running'/'retrying' if still pending
+ *   after two minutes; a failed job rejects with its error
  */
 export const sendReportViaBackend = async (toEmail, patientName, modelType, patientData, predictionResult) => {
   if (!toEmail || !patientName) {
     throw new Error('Email address and patient name are required');
   }
 
+  let queued;
   try {
     const response = await axios.post(
       `${BASE_URL}/send-report`,
@@ -40,26 +80,22 @@ export const sendReportViaBackend = async (toEmail, patientName, modelType, pati
         timeout: 30000, // 30 seconds
       }
     );
-
-    return response.data;
+    queued = response.data;
   } catch (error) {
     if (error.response) {
       const detail = error.response.data?.detail || '';
       if (isDemoModeEmailError(detail)) {
-        const demoError = new Error('EMAIL_DEMO_MODE');
-        demoError.isDemoMode = true;
-        demoError.detail = detail;
-        throw demoError;
+        throw demoModeError(detail);
       }
       throw new Error(detail || 'Failed to send email via backend');
     }
     if (error.message && isDemoModeEmailError(error.message)) {
-      const demoError = new Error('EMAIL_DEMO_MODE');
-      demoError.isDemoMode = true;
-      throw demoError;
+      throw demoModeError(error.message);
     }
     throw error;
   }
+
+  return waitForReport(queued.status_url);
 };
 
 /**